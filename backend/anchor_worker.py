@@ -0,0 +1,27 @@
+"""Standalone anchoring worker
+
+Drains the MongoDB anchoring queue outside the web processes, which only
+enqueue credential hashes (ANCHOR_WORKER_ENABLED is off by default). Run
+one per signing key; ANCHOR_SUBMITTERS threads share its queue.
+"""
+from app.utils import blockchain, anchor_worker
+import os
+import json
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+if __name__ == '__main__':
+    abi_path = os.path.join(os.path.dirname(__file__), '..', 'smart-contracts', 'IdentityVerification.abi.json')
+    with open(abi_path, 'r') as f:
+        abi = json.load(f)
+    blockchain.initialize_contract(abi)
+    print(f"Anchoring credentials to contract at {blockchain.contract_address}")
+    
+    anchor_worker.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        anchor_worker.stop()
@@ -0,0 +1,12 @@
+# bcrypt calls run by the password hashing pool. Kept out of app.utils, whose
+# import builds the blockchain, encryption and cache singletons, so that a
+# pool worker unpickling these functions only loads bcrypt.
+import bcrypt
+
+
+def hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def check_password(password, password_hash):
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
@@ -16,16 +16,115 @@ class Config:
     # MongoDB
     MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
     DB_NAME = os.getenv('DB_NAME', 'identity_verification')
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))  # connections per server per process
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', 0))  # connections kept open while idle
+    MONGO_WAIT_QUEUE_TIMEOUT = float(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT', 10))  # seconds to wait for a free connection, 0 waits forever
+    MONGO_MAX_IDLE_TIME = float(os.getenv('MONGO_MAX_IDLE_TIME', 0))  # seconds before an idle connection is closed, 0 keeps it
+    MONGO_COMPRESSORS = os.getenv('MONGO_COMPRESSORS', '')  # e.g. zstd,snappy,zlib (zstd and snappy need pip install 'pymongo[zstd,snappy]')
+    MONGO_READ_PREFERENCE = os.getenv('MONGO_READ_PREFERENCE', 'primary')  # primaryPreferred, secondaryPreferred, nearest, ...
     
     # JWT
     JWT_SECRET = os.getenv('JWT_SECRET', 'jwt-secret-key')
     JWT_EXPIRATION = int(os.getenv('JWT_EXPIRATION', 86400))  # 24 hours
+    JWT_KEYS = json.loads(os.getenv('JWT_KEYS', '{}'))  # {"kid": "secret"}, keep retired keys until their tokens expire
+    JWT_ACTIVE_KID = os.getenv('JWT_ACTIVE_KID', '')  # key that signs new tokens (JWT_SECRET when empty)
+    JWT_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', 10000))  # verified tokens kept in memory
+    JWT_CACHE_TTL = int(os.getenv('JWT_CACHE_TTL', 300))  # seconds, bounds how long a removed key keeps working
+    
+    # Credential data encryption
+    MASTER_KEYS = json.loads(os.getenv('MASTER_KEYS', '{}'))  # {"id": "base64 32-byte key"}, keep retired keys until re-wrapped
+    MASTER_KEY_ID = os.getenv('MASTER_KEY_ID', '')  # master key that wraps new data keys
+    ALLOW_DEV_MASTER_KEY = os.getenv('ALLOW_DEV_MASTER_KEY', 'false').lower() == 'true'  # publicly known key when MASTER_KEYS is empty, implied by FLASK_ENV=development
+    DATA_KEY_CACHE_SIZE = int(os.getenv('DATA_KEY_CACHE_SIZE', 10000))  # unwrapped data keys kept in memory
+    DATA_KEY_CACHE_TTL = int(os.getenv('DATA_KEY_CACHE_TTL', 3600))  # seconds
+    
+    # Password hashing
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))  # existing hashes are upgraded on login
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))  # 0 hashes inline
+    PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv('PASSWORD_HASH_QUEUE_DEPTH', 32))  # waiting hashes before 503
+    PASSWORD_HASH_ADMISSION_TIMEOUT = float(os.getenv('PASSWORD_HASH_ADMISSION_TIMEOUT', 0.5))  # seconds
     
     # Blockchain
-    WEB3_PROVIDER_URI = os.getenv('WEB3_PROVIDER_URI', 'http://127.0.0.1:8545')
+    WEB3_PROVIDER_URI = os.getenv('WEB3_PROVIDER_URI', 'http://127.0.0.1:8545')  # inproc:// runs the contract on an in-process chain
     CONTRACT_ADDRESS = os.getenv('CONTRACT_ADDRESS', '0x0000000000000000000000000000000000000000')
     PRIVATE_KEY = os.getenv('PRIVATE_KEY', '')
+    CONTRACT_BYTECODE_PATH = os.getenv('CONTRACT_BYTECODE_PATH', '')  # deployed by inproc://, default smart-contracts/IdentityVerification.bin
+    SOLC_VERSION = os.getenv('SOLC_VERSION', '0.8.19')  # compiler release of IdentityVerification.bin (compile_contract.py)
     GAS_LIMIT = int(os.getenv('GAS_LIMIT', 3000000))
+    GAS_PRICE_CACHE_TTL = float(os.getenv('GAS_PRICE_CACHE_TTL', 15))  # seconds
+    GAS_ESTIMATE_MARGIN = float(os.getenv('GAS_ESTIMATE_MARGIN', 0.2))  # added to cached gas estimates, capped at GAS_LIMIT
+    FEE_HISTORY_BLOCKS = int(os.getenv('FEE_HISTORY_BLOCKS', 10))  # blocks of eth_feeHistory behind each fee estimate
+    FEE_PRIORITY_PERCENTILE = float(os.getenv('FEE_PRIORITY_PERCENTILE', 50))  # of the priority fees paid in those blocks
+    FEE_MIN_PRIORITY_FEE = int(os.getenv('FEE_MIN_PRIORITY_FEE', 1000000000))  # wei
+    FEE_BUMP_PERCENT = float(os.getenv('FEE_BUMP_PERCENT', 12.5))  # minimum fee raise of a replacement transaction
+    NONCE_RESYNC_GRACE = float(os.getenv('NONCE_RESYNC_GRACE', 30))  # seconds before an unsettled nonce allocation stops blocking a resync
+    RPC_POOL_SIZE = int(os.getenv('RPC_POOL_SIZE', 20))  # keep-alive connections to the node
+    RPC_TIMEOUT = float(os.getenv('RPC_TIMEOUT', 10))  # seconds per call
+    RPC_RETRIES = int(os.getenv('RPC_RETRIES', 3))  # on connection errors and 502/503/504, transactions only on connection errors
+    RPC_RETRY_BACKOFF = float(os.getenv('RPC_RETRY_BACKOFF', 0.2))  # seconds, doubled per retry
+    RPC_BATCH_SIZE = int(os.getenv('RPC_BATCH_SIZE', 100))  # calls per JSON-RPC batch request
+    ASYNC_RPC_POOL_SIZE = int(os.getenv('ASYNC_RPC_POOL_SIZE', 100))  # pooled connections and concurrent calls
+    ASYNC_RPC_TIMEOUT = float(os.getenv('ASYNC_RPC_TIMEOUT', 10))  # seconds
+    
+    # Anchoring queue
+    ANCHOR_WORKER_ENABLED = os.getenv('ANCHOR_WORKER_ENABLED', 'false').lower() == 'true'  # in the web process; anchor_worker.py runs it on its own
+    ANCHOR_POLL_INTERVAL = float(os.getenv('ANCHOR_POLL_INTERVAL', 2))  # seconds
+    ANCHOR_MAX_ATTEMPTS = int(os.getenv('ANCHOR_MAX_ATTEMPTS', 5))
+    ANCHOR_RETRY_BACKOFF = int(os.getenv('ANCHOR_RETRY_BACKOFF', 10))  # seconds, doubled per attempt
+    ANCHOR_STALE_TIMEOUT = int(os.getenv('ANCHOR_STALE_TIMEOUT', 120))  # seconds
+    ANCHOR_DROP_TIMEOUT = int(os.getenv('ANCHOR_DROP_TIMEOUT', 300))  # seconds before an unmined tx is checked for a drop
+    ANCHOR_BUMP_AFTER = int(os.getenv('ANCHOR_BUMP_AFTER', 60))  # seconds before an unmined tx is replaced with higher fees
+    ANCHOR_MAX_BUMPS = int(os.getenv('ANCHOR_MAX_BUMPS', 3))  # fee bumps per transaction before waiting for a drop
+    ANCHOR_SUBMITTERS = int(os.getenv('ANCHOR_SUBMITTERS', 4))  # concurrent submitter threads
+    ANCHOR_MODE = os.getenv('ANCHOR_MODE', 'single')  # single: one tx per credential, merkle: one tx per batch
+    ANCHOR_BATCH_SIZE = int(os.getenv('ANCHOR_BATCH_SIZE', 256))
+    ANCHOR_BATCH_WINDOW = int(os.getenv('ANCHOR_BATCH_WINDOW', 30))  # seconds the oldest queued hash may wait
+    
+    # Bulk credential creation
+    BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 10000))
+    BULK_WORKERS = int(os.getenv('BULK_WORKERS', 4))
+    
+    # Streaming credential file uploads
+    UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 100 * 1024 * 1024))
+    UPLOAD_SEGMENT_SIZE = int(os.getenv('UPLOAD_SEGMENT_SIZE', 1024 * 1024))  # bytes read, hashed and encrypted at a time
+    
+    # Credential lists and access logs
+    LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', 100))
+    LIST_MAX_PAGE_SIZE = int(os.getenv('LIST_MAX_PAGE_SIZE', 1000))
+    
+    # Credential access counts
+    ACCESS_COUNT_FLUSH_INTERVAL = float(os.getenv('ACCESS_COUNT_FLUSH_INTERVAL', 5))  # seconds between coalesced writes
+    ACCESS_COUNT_FLUSH_KEYS = int(os.getenv('ACCESS_COUNT_FLUSH_KEYS', 1000))  # pending credentials that trigger an early write
+    
+    # Access audit log
+    AUDIT_ENABLED = os.getenv('AUDIT_ENABLED', 'true').lower() == 'true'
+    AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', 500))  # entries per insert_many
+    AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', 1))  # seconds an entry may wait in memory
+    AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', 10000))  # queued entries before AUDIT_OVERFLOW applies
+    AUDIT_OVERFLOW = os.getenv('AUDIT_OVERFLOW', 'drop')  # drop or spill (append to AUDIT_SPILL_PATH, replayed later)
+    AUDIT_SPILL_PATH = os.getenv('AUDIT_SPILL_PATH', 'audit_spill.ndjson')
+    AUDIT_WRITE_CONCERN = os.getenv('AUDIT_WRITE_CONCERN', '1')  # w for audit inserts: 0, 1, majority; empty uses the client's
+    
+    # Batch verification
+    VERIFY_BATCH_MAX_ITEMS = int(os.getenv('VERIFY_BATCH_MAX_ITEMS', 5000))
+    
+    # Verification result cache
+    VERIFICATION_CACHE_SIZE = int(os.getenv('VERIFICATION_CACHE_SIZE', 10000))
+    VERIFICATION_CACHE_TTL = int(os.getenv('VERIFICATION_CACHE_TTL', 300))  # seconds
+    VERIFICATION_CACHE_SHARED = os.getenv('VERIFICATION_CACHE_SHARED', 'false').lower() == 'true'  # MongoDB tier shared by all processes
+    VERIFICATION_CACHE_WATCH_INTERVAL = float(os.getenv('VERIFICATION_CACHE_WATCH_INTERVAL', 5))  # seconds between invalidation polls
+    VERIFICATION_CACHE_WATCH_OVERLAP = float(os.getenv('VERIFICATION_CACHE_WATCH_OVERLAP', 10))  # seconds each poll re-reads, covers clock skew between processes
+    
+    # Contract event indexer
+    INDEXER_START_BLOCK = int(os.getenv('INDEXER_START_BLOCK', 0))  # contract deployment block
+    INDEXER_CONFIRMATIONS = int(os.getenv('INDEXER_CONFIRMATIONS', 12))  # blocks behind the head
+    INDEXER_PAGE_SIZE = int(os.getenv('INDEXER_PAGE_SIZE', 2000))  # blocks per eth_getLogs call
+    INDEXER_POLL_INTERVAL = float(os.getenv('INDEXER_POLL_INTERVAL', 5))  # seconds
+    INDEXER_REORG_REWIND = int(os.getenv('INDEXER_REORG_REWIND', 64))  # blocks re-indexed after a reorg
+    VERIFY_FROM_INDEX = os.getenv('VERIFY_FROM_INDEX', 'false').lower() == 'true'
+    
+    # Metrics
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'  # /metrics and the timings behind it
     
     # Server
     PORT = int(os.getenv('PORT', 5000))
@@ -0,0 +1,216 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+from app.config import Config
+
+# Seconds; from a cached read to a slow chain call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label values"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, _labels(self.labelnames, key), value) for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """Latency histogram per label values, with cumulative buckets as Prometheus expects"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labelvalues)
+            if counts is None:
+                counts = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {key: list(counts) for key, counts in self._values.items()}
+        samples = []
+        for key, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", _labels(self.labelnames, key, f'le="{_number(bound)}"'), cumulative))
+            samples.append((f"{self.name}_sum", _labels(self.labelnames, key), counts[-1]))
+            samples.append((f"{self.name}_count", _labels(self.labelnames, key), cumulative))
+        return samples
+
+
+class Gauge:
+    """Value read from the application when scraped, so nothing is tracked per request
+
+    collect() returns a number, or {label values: number} for labelled
+    gauges. With kind='counter' it exposes a counter the application
+    already keeps.
+    """
+
+    def __init__(self, name, documentation, collect, labelnames=(), kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def samples(self):
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [
+            (self.name, _labels(self.labelnames, key if isinstance(key, tuple) else (key,)), value)
+            for key, value in values.items() if value is not None
+        ]
+
+
+class MetricsRegistry:
+    """Metrics of this process, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        """Add a metric, replacing one registered earlier under the same name"""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                print(f"Warning: Could not collect metric {metric.name}: {str(e)}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in samples)
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time to handle a request, by route template', ('method', 'route', 'status')
+))
+db_operation_duration = registry.register(Histogram(
+    'db_operation_duration_seconds', 'Duration of model methods', ('model', 'operation')
+))
+db_operation_errors = registry.register(Counter(
+    'db_operation_errors_total', 'Model methods that raised', ('model', 'operation')
+))
+rpc_request_duration = registry.register(Histogram(
+    'rpc_request_duration_seconds', 'Duration of JSON-RPC calls to the node', ('method',)
+))
+rpc_errors = registry.register(Counter(
+    'rpc_errors_total', 'JSON-RPC calls that failed or returned an error', ('method',)
+))
+
+
+def instrumented(cls):
+    """Class decorator timing every static method of a model in db_operation_duration_seconds"""
+    if not Config.METRICS_ENABLED:
+        return cls
+    for name, attribute in list(vars(cls).items()):
+        if not isinstance(attribute, staticmethod) or name.startswith('_'):
+            continue
+        function = attribute.__func__
+        # A generator's work happens after the call returns
+        if inspect.isgeneratorfunction(function):
+            continue
+        setattr(cls, name, staticmethod(_timed(function, cls.__name__, name)))
+    return cls
+
+
+def _timed(function, model, operation):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            db_operation_errors.inc(model, operation)
+            raise
+        finally:
+            db_operation_duration.observe(time.perf_counter() - start, model, operation)
+    return wrapper
+
+
+def rpc_metrics_middleware(make_request, w3):
+    """web3 middleware recording the latency and errors of each JSON-RPC method"""
+    def middleware(method, params):
+        start = time.perf_counter()
+        try:
+            response = make_request(method, params)
+        except Exception:
+            rpc_errors.inc(method)
+            raise
+        finally:
+            rpc_request_duration.observe(time.perf_counter() - start, method)
+        if 'error' in response:
+            rpc_errors.inc(method)
+        return response
+    return middleware
+
+
+async def async_rpc_metrics_middleware(make_request, w3):
+    """Async variant of rpc_metrics_middleware"""
+    async def middleware(method, params):
+        start = time.perf_counter()
+        try:
+            response = await make_request(method, params)
+        except Exception:
+            rpc_errors.inc(method)
+            raise
+        finally:
+            rpc_request_duration.observe(time.perf_counter() - start, method)
+        if 'error' in response:
+            rpc_errors.inc(method)
+        return response
+    return middleware
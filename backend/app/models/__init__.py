@@ -2,7 +2,16 @@ from datetime import datetime
 from .database import users_collection, credentials_collection
 import hashlib
 from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.metrics import instrumented
 
+# Field projections, so queries only ship the fields a caller reads
+USER_PUBLIC_FIELDS = {"password_hash": 0, "credentials": 0}
+CREDENTIAL_WITHOUT_DATA = {"data": 0}
+CREDENTIAL_SUMMARY_FIELDS = {"credential_type": 1, "blockchain_hash": 1, "created_at": 1, "access_count": 1}
+
+@instrumented
 class User:
     """User model for identity verification system"""
     
@@ -24,19 +33,38 @@ class User:
         return result.inserted_id
     
     @staticmethod
-    def get_user_by_email(email):
+    def get_user_by_email(email, projection=None):
         """Get user by email"""
-        return users_collection.find_one({"email": email})
+        return users_collection.find_one({"email": email}, projection)
     
     @staticmethod
-    def get_user_by_wallet(wallet_address):
+    def get_user_by_wallet(wallet_address, projection=None):
         """Get user by wallet address"""
-        return users_collection.find_one({"wallet_address": wallet_address})
+        return users_collection.find_one({"wallet_address": wallet_address}, projection)
     
     @staticmethod
-    def get_user_by_id(user_id):
+    def get_user_by_id(user_id, projection=None):
         """Get user by ID"""
-        return users_collection.find_one({"_id": ObjectId(user_id)})
+        return users_collection.find_one({"_id": ObjectId(user_id)}, projection)
+    
+    @staticmethod
+    def email_exists(email):
+        """Check whether an email is registered (answered from the unique index)"""
+        return users_collection.count_documents({"email": email}, limit=1) > 0
+    
+    @staticmethod
+    def wallet_exists(wallet_address):
+        """Check whether a wallet address is registered (answered from the unique index)"""
+        return users_collection.count_documents({"wallet_address": wallet_address}, limit=1) > 0
+    
+    @staticmethod
+    def get_wallet_addresses(user_ids):
+        """Get {user_id: wallet_address} for many users in one query"""
+        users = users_collection.find(
+            {"_id": {"$in": [ObjectId(user_id) for user_id in user_ids]}},
+            {"wallet_address": 1}
+        )
+        return {str(user["_id"]): user["wallet_address"] for user in users}
     
     @staticmethod
     def update_user(user_id, update_data):
@@ -54,42 +82,94 @@ class User:
         return User.update_user(user_id, {"is_verified": True})
 
 
+@instrumented
 class Credential:
     """Credential model for storing identity credentials"""
     
     @staticmethod
-    def create_credential(user_id, credential_type, data, blockchain_hash):
-        """Create a new credential"""
+    def build_credential(user_id, credential_type, data, blockchain_hash, anchor_status="pending", hash_scheme="jcs-sha256"):
+        """Build a credential document without inserting it"""
         credential_data = {
             "user_id": ObjectId(user_id),
             "credential_type": credential_type,  # passport, aadhar, drivers_license, etc.
             "data": data,  # Encrypted credential data
             "blockchain_hash": blockchain_hash,
+            "hash_scheme": hash_scheme,  # jcs-sha256, sha256 (files); missing on older repr-sha256 credentials
             "blockchain_timestamp": datetime.utcnow(),
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
             "is_active": True,
-            "access_count": 0
+            "access_count": 0,
+            "anchor_status": anchor_status,  # pending, submitted, anchored, failed, unanchored
+            "blockchain_tx": None
         }
+        return credential_data
+    
+    @staticmethod
+    def create_credential(user_id, credential_type, data, blockchain_hash, anchor_status="pending", hash_scheme="jcs-sha256"):
+        """Create a new credential"""
+        credential_data = Credential.build_credential(user_id, credential_type, data, blockchain_hash, anchor_status, hash_scheme)
         result = credentials_collection.insert_one(credential_data)
         return result.inserted_id
     
     @staticmethod
-    def get_credential_by_id(credential_id):
+    def create_credentials(credential_docs):
+        """Insert many credential documents in one round-trip
+        
+        Returns a dict of {position: error message} for the documents that
+        could not be inserted; the others are stored even if some fail.
+        """
+        if not credential_docs:
+            return {}
+        try:
+            credentials_collection.insert_many(credential_docs, ordered=False)
+        except BulkWriteError as e:
+            return {error["index"]: error.get("errmsg", "Insert failed") for error in e.details.get("writeErrors", [])}
+        return {}
+    
+    @staticmethod
+    def get_credential_by_id(credential_id, projection=None):
         """Get credential by ID"""
-        return credentials_collection.find_one({"_id": ObjectId(credential_id)})
+        return credentials_collection.find_one({"_id": ObjectId(credential_id)}, projection)
     
     @staticmethod
-    def get_user_credentials(user_id):
+    def get_user_credentials(user_id, projection=None):
         """Get all credentials of a user"""
         return list(credentials_collection.find(
-            {"user_id": ObjectId(user_id), "is_active": True}
+            {"user_id": ObjectId(user_id), "is_active": True},
+            projection
         ))
     
     @staticmethod
-    def get_credential_by_blockchain_hash(blockchain_hash):
+    def get_user_credentials_page(user_id, after_id=None, limit=100, projection=None):
+        """Get one page of a user's active credentials in _id order, starting after after_id"""
+        query = {"user_id": ObjectId(user_id), "is_active": True}
+        if after_id is not None:
+            query["_id"] = {"$gt": ObjectId(after_id)}
+        return list(credentials_collection.find(query, projection).sort("_id", 1).limit(limit))
+    
+    @staticmethod
+    def iter_user_credentials(user_id, projection=None, batch_size=1000):
+        """Iterate over all active credentials of a user without loading them at once"""
+        return credentials_collection.find(
+            {"user_id": ObjectId(user_id), "is_active": True},
+            projection
+        ).sort("_id", 1).batch_size(batch_size)
+    
+    @staticmethod
+    def count_user_credentials(user_id):
+        """Count the active credentials of a user (answered from the (user_id, is_active) index)"""
+        return credentials_collection.count_documents({"user_id": ObjectId(user_id), "is_active": True})
+    
+    @staticmethod
+    def get_credential_by_blockchain_hash(blockchain_hash, projection=None):
         """Get credential by blockchain hash"""
-        return credentials_collection.find_one({"blockchain_hash": blockchain_hash})
+        return credentials_collection.find_one({"blockchain_hash": blockchain_hash}, projection)
+    
+    @staticmethod
+    def get_credentials_by_blockchain_hashes(blockchain_hashes, projection=None):
+        """Get the credentials matching any of the given blockchain hashes"""
+        return list(credentials_collection.find({"blockchain_hash": {"$in": list(blockchain_hashes)}}, projection))
     
     @staticmethod
     def increment_access_count(credential_id):
@@ -99,10 +179,87 @@ class Credential:
             {"$inc": {"access_count": 1}, "$set": {"updated_at": datetime.utcnow()}}
         )
     
+    @staticmethod
+    def increment_access_counts(counts):
+        """Apply coalesced access counts, given as {credential_id: accesses}, in one bulk write"""
+        if not counts:
+            return
+        now = datetime.utcnow()
+        credentials_collection.bulk_write([
+            UpdateOne(
+                {"_id": ObjectId(credential_id)},
+                {"$inc": {"access_count": count}, "$set": {"updated_at": now}}
+            )
+            for credential_id, count in counts.items()
+        ], ordered=False)
+    
     @staticmethod
     def revoke_credential(credential_id):
         """Revoke a credential"""
-        credentials_collection.update_one(
+        credential = credentials_collection.find_one_and_update(
             {"_id": ObjectId(credential_id)},
-            {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
+            {"$set": {"is_active": False, "updated_at": datetime.utcnow()}},
+            projection={"blockchain_hash": 1}
+        )
+        if credential:
+            # Imported here to avoid a circular import with app.utils
+            from app.utils.cache import verification_cache
+            verification_cache.invalidate(credential["blockchain_hash"])
+    
+    @staticmethod
+    def update_anchor_status(credential_ids, anchor_status, blockchain_tx=None, error=None):
+        """Record the on-chain anchoring state of one or more credentials"""
+        update_data = {
+            "anchor_status": anchor_status,
+            "anchor_error": error,
+            "updated_at": datetime.utcnow()
+        }
+        if blockchain_tx is not None:
+            update_data["blockchain_tx"] = blockchain_tx
+        if anchor_status == "anchored":
+            update_data["blockchain_timestamp"] = datetime.utcnow()
+        credentials_collection.update_many(
+            {"_id": {"$in": [ObjectId(credential_id) for credential_id in credential_ids]}},
+            {"$set": update_data}
         )
+    
+    @staticmethod
+    def set_merkle_proofs(merkle_proofs):
+        """Store the batch inclusion proof of each credential
+        
+        merkle_proofs is a list of (credential_id, proof) pairs where proof
+        holds the batch root, the leaf position, the sibling hashes and the
+        hashing scheme.
+        """
+        if not merkle_proofs:
+            return
+        now = datetime.utcnow()
+        credentials_collection.bulk_write([
+            UpdateOne(
+                {"_id": ObjectId(credential_id)},
+                {"$set": {"merkle_proof": proof, "updated_at": now}}
+            )
+            for credential_id, proof in merkle_proofs
+        ], ordered=False)
+    
+    @staticmethod
+    def get_credentials_with_embedded_keys(limit):
+        """Get credentials whose data still carries its own Fernet key"""
+        return list(credentials_collection.find(
+            {"data.encryption_key": {"$exists": True}},
+            {"user_id": 1, "data": 1}
+        ).limit(limit))
+    
+    @staticmethod
+    def set_encrypted_data(encrypted_data):
+        """Replace the encrypted data of credentials, given as [(credential_id, data)]"""
+        if not encrypted_data:
+            return
+        now = datetime.utcnow()
+        credentials_collection.bulk_write([
+            UpdateOne(
+                {"_id": ObjectId(credential_id)},
+                {"$set": {"data": data, "updated_at": now}}
+            )
+            for credential_id, data in encrypted_data
+        ], ordered=False)
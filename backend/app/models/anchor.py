@@ -0,0 +1,249 @@
+from app.models.database import anchor_jobs_collection
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from app.metrics import instrumented
+
+
+# Per-credential jobs carry no kind (or "credential"); pre-built batches are "merkle_root"
+CREDENTIAL_JOBS = {"kind": {"$ne": "merkle_root"}}
+MERKLE_ROOT_JOBS = {"kind": "merkle_root"}
+
+
+@instrumented
+class AnchorJob:
+    """Queue of credential hashes waiting to be anchored on the blockchain"""
+
+    @staticmethod
+    def enqueue(credential_id, user_address, credential_hash, credential_type):
+        """Queue a credential hash for anchoring"""
+        job_data = {
+            "kind": "credential",
+            "credential_id": ObjectId(credential_id),
+            "user_address": user_address,
+            "credential_hash": credential_hash,
+            "credential_type": credential_type,
+            "status": "pending",  # pending, submitting, submitted, anchored, failed
+            "attempts": 0,
+            "tx_hash": None,
+            "error": None,
+            "next_attempt_at": datetime.utcnow(),
+            "locked_at": None,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+        result = anchor_jobs_collection.insert_one(job_data)
+        return result.inserted_id
+
+    @staticmethod
+    def enqueue_merkle_root(merkle_root, leaf_count, credential_ids):
+        """Queue the Merkle root of an already built batch of credentials"""
+        job_data = {
+            "kind": "merkle_root",
+            "merkle_root": merkle_root,
+            "leaf_count": leaf_count,
+            "credential_ids": [ObjectId(credential_id) for credential_id in credential_ids],
+            "status": "pending",
+            "attempts": 0,
+            "tx_hash": None,
+            "error": None,
+            "next_attempt_at": datetime.utcnow(),
+            "locked_at": None,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+        result = anchor_jobs_collection.insert_one(job_data)
+        return result.inserted_id
+
+    @staticmethod
+    def get_job_by_credential(credential_id):
+        """Get the anchoring job of a credential"""
+        return anchor_jobs_collection.find_one({"credential_id": ObjectId(credential_id)})
+
+    @staticmethod
+    def count_open_jobs():
+        """Count jobs that are neither anchored nor failed yet"""
+        return anchor_jobs_collection.count_documents({"status": {"$in": ["pending", "submitting", "submitted"]}})
+
+    @staticmethod
+    def count_by_status():
+        """Count jobs per status ({status: count})"""
+        return {
+            group["_id"]: group["count"]
+            for group in anchor_jobs_collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+        }
+
+    @staticmethod
+    def claim_next(merkle_roots=False):
+        """Atomically take the oldest due pending credential (or Merkle root) job for submission"""
+        now = datetime.utcnow()
+        return anchor_jobs_collection.find_one_and_update(
+            dict(MERKLE_ROOT_JOBS if merkle_roots else CREDENTIAL_JOBS, status="pending", next_attempt_at={"$lte": now}),
+            {
+                "$set": {"status": "submitting", "locked_at": now, "updated_at": now},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    def batch_ready(batch_size, window_seconds):
+        """Check whether enough jobs are due, or the oldest one has waited long enough, to anchor a batch"""
+        now = datetime.utcnow()
+        due = dict(CREDENTIAL_JOBS, status="pending", next_attempt_at={"$lte": now})
+        if anchor_jobs_collection.count_documents(due, limit=batch_size) >= batch_size:
+            return True
+        oldest = anchor_jobs_collection.find_one(due, sort=[("created_at", 1)])
+        return oldest is not None and oldest["created_at"] <= now - timedelta(seconds=window_seconds)
+
+    @staticmethod
+    def claim_batch(batch_size):
+        """Atomically take up to batch_size due pending jobs for one batch"""
+        now = datetime.utcnow()
+        job_ids = [job["_id"] for job in anchor_jobs_collection.find(
+            dict(CREDENTIAL_JOBS, status="pending", next_attempt_at={"$lte": now}),
+            {"_id": 1}
+        ).sort("next_attempt_at", 1).limit(batch_size)]
+        if not job_ids:
+            return []
+
+        # Jobs grabbed by a concurrent worker in between are no longer pending
+        batch_id = ObjectId()
+        anchor_jobs_collection.update_many(
+            {"_id": {"$in": job_ids}, "status": "pending"},
+            {
+                "$set": {"status": "submitting", "batch_id": batch_id, "locked_at": now, "updated_at": now},
+                "$inc": {"attempts": 1}
+            }
+        )
+        return list(anchor_jobs_collection.find(
+            {"batch_id": batch_id, "status": "submitting"}
+        ).sort("next_attempt_at", 1))
+
+    @staticmethod
+    def record_signed(job_ids, tx_hash, nonce, merkle_root=None):
+        """Remember the signed transaction of submitting jobs before it is broadcast"""
+        now = datetime.utcnow()
+        update = {"signed_tx_hash": tx_hash, "nonce": nonce, "signed_at": now, "updated_at": now}
+        if merkle_root:
+            update["merkle_root"] = merkle_root
+        anchor_jobs_collection.update_many(
+            {"_id": {"$in": [ObjectId(job_id) for job_id in job_ids]}, "status": "submitting"},
+            {"$set": update}
+        )
+
+    @staticmethod
+    def get_submitted_transactions():
+        """Get the hashes of broadcast transactions waiting to be mined"""
+        return anchor_jobs_collection.distinct("tx_hash", {"status": "submitted"})
+
+    @staticmethod
+    def get_lowest_submitted_nonce(min_nonce):
+        """Get the submitted job holding the lowest nonce at or above min_nonce"""
+        return anchor_jobs_collection.find_one(
+            {"status": "submitted", "nonce": {"$gte": min_nonce}},
+            sort=[("nonce", 1)]
+        )
+
+    @staticmethod
+    def get_jobs_by_transaction(tx_hash):
+        """Get the jobs anchored by a transaction"""
+        return list(anchor_jobs_collection.find({"tx_hash": tx_hash, "status": "submitted"}))
+
+    @staticmethod
+    def mark_submitted(job_ids, tx_hash, nonce=None):
+        """Record the broadcast transaction of one or more jobs"""
+        now = datetime.utcnow()
+        anchor_jobs_collection.update_many(
+            {"_id": {"$in": [ObjectId(job_id) for job_id in job_ids]}},
+            {"$set": {
+                "status": "submitted",
+                "tx_hash": tx_hash,
+                "nonce": nonce,
+                "error": None,
+                "submitted_at": now,
+                "updated_at": now
+            }}
+        )
+
+    @staticmethod
+    def record_replacement(job_ids, old_tx_hash, new_tx_hash):
+        """Point jobs at the fee-bumped transaction replacing their stuck one"""
+        now = datetime.utcnow()
+        anchor_jobs_collection.update_many(
+            {"_id": {"$in": [ObjectId(job_id) for job_id in job_ids]}, "tx_hash": old_tx_hash},
+            {
+                "$set": {"tx_hash": new_tx_hash, "submitted_at": now, "updated_at": now},
+                "$push": {"replaced_tx_hashes": old_tx_hash},
+                "$inc": {"bumps": 1}
+            }
+        )
+
+    @staticmethod
+    def get_replaced_transactions():
+        """Map each submitted transaction to the earlier transactions it replaced"""
+        replaced = {}
+        for job in anchor_jobs_collection.find(
+            {"status": "submitted", "replaced_tx_hashes.0": {"$exists": True}},
+            {"tx_hash": 1, "replaced_tx_hashes": 1}
+        ):
+            replaced[job["tx_hash"]] = job["replaced_tx_hashes"]
+        return replaced
+
+    @staticmethod
+    def mark_anchored(job_ids):
+        """Mark jobs as confirmed on-chain"""
+        anchor_jobs_collection.update_many(
+            {"_id": {"$in": [ObjectId(job_id) for job_id in job_ids]}},
+            {"$set": {"status": "anchored", "updated_at": datetime.utcnow()}}
+        )
+
+    @staticmethod
+    def mark_failed(job_ids, error):
+        """Mark jobs as permanently failed"""
+        anchor_jobs_collection.update_many(
+            {"_id": {"$in": [ObjectId(job_id) for job_id in job_ids]}},
+            {"$set": {"status": "failed", "error": error, "updated_at": datetime.utcnow()}}
+        )
+
+    @staticmethod
+    def retry_later(job_id, error, delay_seconds):
+        """Put a job back in the queue after a failed attempt"""
+        now = datetime.utcnow()
+        anchor_jobs_collection.update_one(
+            {"_id": ObjectId(job_id)},
+            {"$set": {
+                "status": "pending",
+                "error": error,
+                "locked_at": None,
+                "next_attempt_at": now + timedelta(seconds=delay_seconds),
+                "updated_at": now
+            }}
+        )
+
+    @staticmethod
+    def requeue_stale(timeout_seconds):
+        """Release jobs left in submitting by a worker that died mid-submission
+
+        Jobs whose transaction was signed during this claim may have been
+        broadcast, so they wait for it as submitted jobs (and are requeued
+        by the drop check if the node never got it); the others go back to
+        pending.
+        """
+        now = datetime.utcnow()
+        released = 0
+        for job in anchor_jobs_collection.find(
+            {"status": "submitting", "locked_at": {"$lt": now - timedelta(seconds=timeout_seconds)}},
+            {"locked_at": 1, "signed_tx_hash": 1, "signed_at": 1}
+        ):
+            if job.get("signed_at") and job["signed_at"] >= job["locked_at"]:
+                update = {"status": "submitted", "tx_hash": job["signed_tx_hash"], "submitted_at": job["signed_at"]}
+            else:
+                update = {"status": "pending", "locked_at": None, "next_attempt_at": now}
+            result = anchor_jobs_collection.update_one(
+                {"_id": job["_id"], "status": "submitting", "locked_at": job["locked_at"]},
+                {"$set": dict(update, updated_at=now)}
+            )
+            released += result.modified_count
+        return released
@@ -1,16 +1,17 @@
-from pymongo import MongoClient
 from app.models.database import access_logs_collection
 from datetime import datetime
 from bson.objectid import ObjectId
+from app.metrics import instrumented
 
 
+@instrumented
 class AuditLog:
     """Audit logging for credential access"""
     
     @staticmethod
-    def log_access(user_id, credential_id, action, ip_address=None, status="success"):
-        """Log credential access or verification"""
-        log_data = {
+    def build_log(user_id, credential_id, action, ip_address=None, status="success"):
+        """Build an access log document without inserting it"""
+        return {
             "user_id": ObjectId(user_id) if user_id else None,
             "credential_id": ObjectId(credential_id) if credential_id else None,
             "action": action,  # "view", "revoke", "verify", "share", etc.
@@ -18,19 +19,52 @@ class AuditLog:
             "status": status,
             "timestamp": datetime.utcnow()
         }
+    
+    @staticmethod
+    def log_access(user_id, credential_id, action, ip_address=None, status="success"):
+        """Log credential access or verification"""
+        log_data = AuditLog.build_log(user_id, credential_id, action, ip_address, status)
         result = access_logs_collection.insert_one(log_data)
         return result.inserted_id
     
     @staticmethod
-    def get_user_access_logs(user_id, limit=100):
-        """Get access logs for a user"""
+    def log_many(log_docs, write_concern=None):
+        """Insert many access log documents in one unordered round-trip"""
+        if not log_docs:
+            return 0
+        collection = access_logs_collection
+        if write_concern is not None:
+            collection = access_logs_collection.with_options(write_concern=write_concern)
+        return len(collection.insert_many(log_docs, ordered=False).inserted_ids)
+    
+    @staticmethod
+    def _page_query(query, before=None):
+        """Add a keyset condition for entries older than before = (timestamp, _id)"""
+        if before is not None:
+            timestamp, log_id = before
+            query["$or"] = [
+                {"timestamp": {"$lt": timestamp}},
+                {"timestamp": timestamp, "_id": {"$lt": log_id}}
+            ]
+        return query
+    
+    @staticmethod
+    def get_user_access_logs(user_id, limit=100, before=None):
+        """Get access logs for a user, newest first, optionally older than a (timestamp, _id) position"""
         return list(access_logs_collection.find(
-            {"user_id": ObjectId(user_id)}
-        ).sort("timestamp", -1).limit(limit))
+            AuditLog._page_query({"user_id": ObjectId(user_id)}, before)
+        ).sort([("timestamp", -1), ("_id", -1)]).limit(limit))
     
     @staticmethod
-    def get_credential_access_logs(credential_id):
-        """Get access logs for a credential"""
+    def get_credential_access_logs(credential_id, limit=100, before=None):
+        """Get access logs for a credential, newest first, optionally older than a (timestamp, _id) position"""
         return list(access_logs_collection.find(
+            AuditLog._page_query({"credential_id": ObjectId(credential_id)}, before)
+        ).sort([("timestamp", -1), ("_id", -1)]).limit(limit))
+    
+    @staticmethod
+    def iter_credential_access_logs(credential_id, batch_size=1000):
+        """Iterate over all access logs of a credential, newest first, without loading them at once"""
+        return access_logs_collection.find(
             {"credential_id": ObjectId(credential_id)}
-        ).sort("timestamp", -1))
+        ).sort([("timestamp", -1), ("_id", -1)]).batch_size(batch_size)
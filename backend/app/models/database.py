@@ -1,29 +1,285 @@
 from pymongo import MongoClient
+from pymongo.monitoring import ConnectionPoolListener
+from gridfs import GridFSBucket
 from datetime import datetime
+import importlib.util
 import os
-from dotenv import load_dotenv
+import threading
+import time
+from app.config import Config
 
-load_dotenv()
+# Module each wire compressor needs, and the pymongo extra that installs it
+COMPRESSOR_MODULES = {
+    'zstd': ('zstandard', 'pymongo[zstd]'),
+    'snappy': ('snappy', 'pymongo[snappy]'),
+    'zlib': ('zlib', None)
+}
 
-MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-DB_NAME = os.getenv("DB_NAME", "identity_verification")
 
-client = MongoClient(MONGODB_URI)
-db = client[DB_NAME]
+def _compressors(setting):
+    """Parse MONGO_COMPRESSORS, refusing compressors pymongo would silently drop"""
+    compressors = [name.strip() for name in setting.split(',') if name.strip()]
+    for name in compressors:
+        if name not in COMPRESSOR_MODULES:
+            raise Exception(f"Unknown compressor {name} in MONGO_COMPRESSORS (choose from {', '.join(COMPRESSOR_MODULES)})")
+        module, extra = COMPRESSOR_MODULES[name]
+        if importlib.util.find_spec(module) is None:
+            raise Exception(f"MONGO_COMPRESSORS includes {name}, which needs the {module} module: pip install '{extra}'")
+    return compressors
+
+
+class PoolStatsListener(ConnectionPoolListener):
+    """Connection pool counters per server, for capacity planning
+    
+    Tracks open and checked-out connections, checkouts that had to wait or
+    failed (e.g. waitQueueTimeout), and how long checkouts waited.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._servers = {}
+    
+    def reset(self):
+        with self._lock:
+            self._servers = {}
+        self._local = threading.local()
+    
+    def _server(self, address):
+        key = f"{address[0]}:{address[1]}"
+        server = self._servers.get(key)
+        if server is None:
+            server = self._servers[key] = {
+                'open': 0,
+                'in_use': 0,
+                'created': 0,
+                'closed': 0,
+                'checkouts': 0,
+                'checkout_failures': 0,
+                'checkout_timeouts': 0,
+                'checkout_wait_total': 0.0,
+                'checkout_wait_max': 0.0,
+                'pool_clears': 0
+            }
+        return server
+    
+    def stats(self):
+        """Get a snapshot of the counters as {server: counters}"""
+        with self._lock:
+            return {address: dict(server) for address, server in self._servers.items()}
+    
+    def pool_created(self, event):
+        with self._lock:
+            self._server(event.address)
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        with self._lock:
+            self._server(event.address)['pool_clears'] += 1
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_created(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server['created'] += 1
+            server['open'] += 1
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        with self._lock:
+            server = self._server(event.address)
+            server['closed'] += 1
+            server['open'] -= 1
+    
+    def connection_check_out_started(self, event):
+        self._local.started = time.monotonic()
+    
+    def _waited(self):
+        started = getattr(self._local, 'started', None)
+        self._local.started = None
+        return time.monotonic() - started if started is not None else 0.0
+    
+    def connection_check_out_failed(self, event):
+        waited = self._waited()
+        with self._lock:
+            server = self._server(event.address)
+            server['checkout_failures'] += 1
+            if event.reason == 'timeout':
+                server['checkout_timeouts'] += 1
+            server['checkout_wait_total'] += waited
+    
+    def connection_checked_out(self, event):
+        waited = self._waited()
+        with self._lock:
+            server = self._server(event.address)
+            server['checkouts'] += 1
+            server['in_use'] += 1
+            server['checkout_wait_total'] += waited
+            server['checkout_wait_max'] = max(server['checkout_wait_max'], waited)
+    
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._server(event.address)['in_use'] -= 1
+
+
+class MongoClientFactory:
+    """Lazily created, per-process MongoDB client
+    
+    Nothing connects until the first query. A client is never shared with a
+    forked child (gunicorn workers, the password hashing pool): the child
+    drops the inherited client and creates its own on first use.
+    """
+    
+    def __init__(self, uri=None, db_name=None):
+        self.uri = uri or Config.MONGODB_URI
+        self.db_name = db_name or Config.DB_NAME
+        self.pool_listener = PoolStatsListener()
+        self.generation = 0
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def _client_options(self):
+        options = {
+            'maxPoolSize': Config.MONGO_MAX_POOL_SIZE,
+            'minPoolSize': Config.MONGO_MIN_POOL_SIZE,
+            'readPreference': Config.MONGO_READ_PREFERENCE,
+            'event_listeners': [self.pool_listener]
+        }
+        if Config.MONGO_WAIT_QUEUE_TIMEOUT > 0:
+            options['waitQueueTimeoutMS'] = int(Config.MONGO_WAIT_QUEUE_TIMEOUT * 1000)
+        if Config.MONGO_MAX_IDLE_TIME > 0:
+            options['maxIdleTimeMS'] = int(Config.MONGO_MAX_IDLE_TIME * 1000)
+        if Config.MONGO_COMPRESSORS:
+            options['compressors'] = _compressors(Config.MONGO_COMPRESSORS)
+        return options
+    
+    def get_client(self):
+        """Get this process's client, creating it on first use"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._client = MongoClient(self.uri, **self._client_options())
+                    self._pid = os.getpid()
+                    self.generation += 1
+        return self._client
+    
+    def get_database(self):
+        """Get the application database"""
+        return self.get_client()[self.db_name]
+    
+    def reset(self):
+        """Forget the client inherited from the parent process (runs after fork)"""
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pool_listener.reset()
+    
+    def close(self):
+        """Close this process's client"""
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+    
+    def pool_stats(self):
+        """Get pool settings and per-server connection counters"""
+        return {
+            'max_pool_size': Config.MONGO_MAX_POOL_SIZE,
+            'min_pool_size': Config.MONGO_MIN_POOL_SIZE,
+            'wait_queue_timeout': Config.MONGO_WAIT_QUEUE_TIMEOUT,
+            'compressors': Config.MONGO_COMPRESSORS,
+            'read_preference': Config.MONGO_READ_PREFERENCE,
+            'connected': self._client is not None and self._pid == os.getpid(),
+            'servers': self.pool_listener.stats()
+        }
+
+
+class LazyHandle:
+    """Stand-in for a database, collection or GridFS bucket of the current process's client
+    
+    Resolved on first use and again whenever the client is recreated, so
+    module-level handles can be imported without connecting.
+    """
+    
+    def __init__(self, resolve):
+        self._resolve = resolve
+        self._target = None
+        self._generation = None
+    
+    def _get(self):
+        database = mongo.get_database()
+        if self._generation != mongo.generation:
+            self._target = self._resolve(database)
+            self._generation = mongo.generation
+        return self._target
+    
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+    
+    def __getitem__(self, name):
+        return self._get()[name]
+
+
+mongo = MongoClientFactory()
+os.register_at_fork(after_in_child=mongo.reset)
+
+
+def _collection(name):
+    return LazyHandle(lambda database: database[name])
+
+
+db = LazyHandle(lambda database: database)
 
 # Collections
-users_collection = db["users"]
-credentials_collection = db["credentials"]
-verifications_collection = db["verifications"]
-access_logs_collection = db["access_logs"]
+users_collection = _collection("users")
+credentials_collection = _collection("credentials")
+verifications_collection = _collection("verifications")
+access_logs_collection = _collection("access_logs")
+anchor_jobs_collection = _collection("anchor_jobs")
+nonces_collection = _collection("nonces")
+verification_cache_collection = _collection("verification_cache")
+cache_invalidations_collection = _collection("cache_invalidations")
+onchain_credentials_collection = _collection("onchain_credentials")
+onchain_merkle_roots_collection = _collection("onchain_merkle_roots")
+onchain_verifications_collection = _collection("onchain_verifications")
+indexer_state_collection = _collection("indexer_state")
+data_keys_collection = _collection("data_keys")
+
+# Large encrypted credential files
+credential_files_bucket = LazyHandle(lambda database: GridFSBucket(database, bucket_name="credential_files"))
 
 # Create indexes for better query performance
 def create_indexes():
     users_collection.create_index("email", unique=True)
     users_collection.create_index("wallet_address", unique=True)
     credentials_collection.create_index("user_id")
+    credentials_collection.create_index([("user_id", 1), ("is_active", 1), ("_id", 1)])
     credentials_collection.create_index("blockchain_hash")
     verifications_collection.create_index("user_id")
     verifications_collection.create_index("verifier_address")
     access_logs_collection.create_index("user_id")
     access_logs_collection.create_index("timestamp")
+    access_logs_collection.create_index([("user_id", 1), ("timestamp", -1), ("_id", -1)])
+    access_logs_collection.create_index([("credential_id", 1), ("timestamp", -1), ("_id", -1)])
+    anchor_jobs_collection.create_index("credential_id", unique=True, sparse=True)
+    anchor_jobs_collection.create_index([("status", 1), ("next_attempt_at", 1)])
+    anchor_jobs_collection.create_index("tx_hash")
+    verification_cache_collection.create_index("expires_at", expireAfterSeconds=0)
+    cache_invalidations_collection.create_index("created_at", expireAfterSeconds=3600)
+    cache_invalidations_collection.create_index([("credential_hash", 1), ("created_at", 1)])
+    onchain_credentials_collection.create_index("user_address")
+    onchain_credentials_collection.create_index("stored_block")
+    onchain_credentials_collection.create_index("revoked_block")
+    onchain_merkle_roots_collection.create_index("block_number")
+    onchain_verifications_collection.create_index("credential_hash")
+    onchain_verifications_collection.create_index("block_number")
+    data_keys_collection.create_index("user_id", unique=True)
+    data_keys_collection.create_index("master_key_id")
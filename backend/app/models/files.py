@@ -0,0 +1,23 @@
+from app.models.database import credential_files_bucket
+from bson.objectid import ObjectId
+from app.metrics import instrumented
+
+
+@instrumented
+class CredentialFile:
+    """Encrypted credential attachments stored in GridFS"""
+
+    @staticmethod
+    def open_upload(filename, metadata):
+        """Open a GridFS upload stream; chunks are written as they arrive"""
+        return credential_files_bucket.open_upload_stream(filename, metadata=metadata)
+
+    @staticmethod
+    def open_download(file_id):
+        """Open a GridFS download stream"""
+        return credential_files_bucket.open_download_stream(ObjectId(file_id))
+
+    @staticmethod
+    def delete_file(file_id):
+        """Delete a stored file and its chunks"""
+        credential_files_bucket.delete(ObjectId(file_id))
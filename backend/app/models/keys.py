@@ -0,0 +1,60 @@
+from app.models.database import data_keys_collection
+from datetime import datetime
+from bson.binary import Binary
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.metrics import instrumented
+
+
+@instrumented
+class DataKey:
+    """Per-user data encryption keys, stored only wrapped by a master key"""
+
+    @staticmethod
+    def get_user_key(user_id):
+        """Get the data key of a user"""
+        return data_keys_collection.find_one({"user_id": ObjectId(user_id)})
+
+    @staticmethod
+    def get_key(key_id):
+        """Get a data key by ID"""
+        return data_keys_collection.find_one({"_id": ObjectId(key_id)})
+
+    @staticmethod
+    def create_user_key(user_id, key_id, wrapped_key, master_key_id):
+        """Store a user's wrapped data key; returns the one already stored if another request won the race"""
+        key_data = {
+            "_id": ObjectId(key_id),
+            "user_id": ObjectId(user_id),
+            "wrapped_key": Binary(wrapped_key),
+            "master_key_id": master_key_id,
+            "created_at": datetime.utcnow(),
+            "rewrapped_at": None
+        }
+        try:
+            data_keys_collection.insert_one(key_data)
+            return key_data
+        except DuplicateKeyError:
+            return DataKey.get_user_key(user_id)
+
+    @staticmethod
+    def get_keys_not_wrapped_by(master_key_id, limit):
+        """Get data keys still wrapped by another master key than the given one"""
+        return list(data_keys_collection.find({"master_key_id": {"$ne": master_key_id}}).limit(limit))
+
+    @staticmethod
+    def set_wrapped_keys(rewrapped, master_key_id):
+        """Store re-wrapped data keys, given as [(key_id, previous master key id, wrapped_key)]"""
+        if not rewrapped:
+            return 0
+        now = datetime.utcnow()
+        # Matching on the previous master key skips keys another run already re-wrapped
+        result = data_keys_collection.bulk_write([
+            UpdateOne(
+                {"_id": ObjectId(key_id), "master_key_id": previous_master_key_id},
+                {"$set": {"wrapped_key": Binary(wrapped_key), "master_key_id": master_key_id, "rewrapped_at": now}}
+            )
+            for key_id, previous_master_key_id, wrapped_key in rewrapped
+        ], ordered=False)
+        return result.modified_count
@@ -0,0 +1,131 @@
+from app.models.database import (
+    onchain_credentials_collection,
+    onchain_merkle_roots_collection,
+    onchain_verifications_collection,
+    indexer_state_collection
+)
+from datetime import datetime
+from pymongo import UpdateOne
+from app.metrics import instrumented
+
+
+@instrumented
+class OnchainIndex:
+    """Local mirror of the contract state, rebuilt from its event logs
+
+    Credentials and Merkle roots are keyed by their hex hash (no 0x prefix,
+    the same form as Credential.blockchain_hash) and every event records the
+    block it came from, so the effects of a reorganized range can be undone.
+    """
+
+    @staticmethod
+    def get_checkpoint(contract_address):
+        """Get the last fully indexed block of a contract"""
+        return indexer_state_collection.find_one({"_id": contract_address})
+
+    @staticmethod
+    def set_checkpoint(contract_address, block_number, block_hash):
+        """Record the last fully indexed block of a contract"""
+        indexer_state_collection.update_one(
+            {"_id": contract_address},
+            {"$set": {
+                "last_block": block_number,
+                "last_block_hash": block_hash,
+                "updated_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+    @staticmethod
+    def apply_events(events):
+        """Apply decoded contract events, in chain order, with one bulk write per collection
+
+        Every write is an idempotent upsert, so re-applying a range after a
+        crash (before its checkpoint was saved) leaves the index unchanged.
+        """
+        credential_ops, root_ops, verification_ops = [], [], []
+        for event in events:
+            name = event['event']
+            args = event['args']
+            if name == 'CredentialStored':
+                credential_ops.append(UpdateOne(
+                    {"_id": args['credential_hash']},
+                    {"$set": {
+                        "user_address": args['user_address'],
+                        "credential_type": args['credential_type'],
+                        "stored_at": args['timestamp'],
+                        "stored_block": event['block_number'],
+                        "tx_hash": event['tx_hash'],
+                        "is_active": True,
+                        "revoked_at": None,
+                        "revoked_block": None
+                    }},
+                    upsert=True
+                ))
+            elif name == 'CredentialRevoked':
+                credential_ops.append(UpdateOne(
+                    {"_id": args['credential_hash']},
+                    {"$set": {
+                        "is_active": False,
+                        "revoked_at": args['timestamp'],
+                        "revoked_block": event['block_number']
+                    }}
+                ))
+            elif name == 'MerkleRootAnchored':
+                root_ops.append(UpdateOne(
+                    {"_id": args['merkle_root']},
+                    {"$set": {
+                        "leaf_count": args['leaf_count'],
+                        "timestamp": args['timestamp'],
+                        "block_number": event['block_number'],
+                        "tx_hash": event['tx_hash']
+                    }},
+                    upsert=True
+                ))
+            elif name == 'CredentialVerified':
+                verification_ops.append(UpdateOne(
+                    {"_id": f"{event['tx_hash']}:{event['log_index']}"},
+                    {"$set": {
+                        "credential_hash": args['credential_hash'],
+                        "user_address": args['user_address'],
+                        "is_valid": args['is_valid'],
+                        "block_number": event['block_number']
+                    }},
+                    upsert=True
+                ))
+
+        # Ordered, so a credential stored and revoked in the same range ends up revoked
+        if credential_ops:
+            onchain_credentials_collection.bulk_write(credential_ops, ordered=True)
+        if root_ops:
+            onchain_merkle_roots_collection.bulk_write(root_ops, ordered=False)
+        if verification_ops:
+            onchain_verifications_collection.bulk_write(verification_ops, ordered=False)
+
+    @staticmethod
+    def rollback(after_block):
+        """Undo the effects of every event mined after a block"""
+        onchain_credentials_collection.delete_many({"stored_block": {"$gt": after_block}})
+        onchain_credentials_collection.update_many(
+            {"revoked_block": {"$gt": after_block}},
+            {"$set": {"is_active": True, "revoked_at": None, "revoked_block": None}}
+        )
+        onchain_merkle_roots_collection.delete_many({"block_number": {"$gt": after_block}})
+        onchain_verifications_collection.delete_many({"block_number": {"$gt": after_block}})
+
+    @staticmethod
+    def get_credentials(credential_hashes):
+        """Get {credential_hash: record} for the indexed credentials among many hashes"""
+        records = onchain_credentials_collection.find({"_id": {"$in": list(credential_hashes)}})
+        return {record["_id"]: record for record in records}
+
+    @staticmethod
+    def get_merkle_roots(merkle_roots):
+        """Get {merkle_root: record} for the indexed roots among many roots"""
+        records = onchain_merkle_roots_collection.find({"_id": {"$in": list(merkle_roots)}})
+        return {record["_id"]: record for record in records}
+
+    @staticmethod
+    def get_verification_count(credential_hash):
+        """Count the on-chain verifications of a credential"""
+        return onchain_verifications_collection.count_documents({"credential_hash": credential_hash})
@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from app.models import User
-from app.utils import AuthUtil, EncryptionUtil, HashUtil
+from app.utils import AuthUtil, EncryptionUtil, HashUtil, HashingBusy, hashing_busy_response
 from bson.objectid import ObjectId
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -22,10 +22,10 @@ def register():
         full_name = data['full_name']
         
         # Check if user already exists
-        if User.get_user_by_email(email):
+        if User.email_exists(email):
             return jsonify({'error': 'User with this email already exists'}), 409
         
-        if User.get_user_by_wallet(wallet_address):
+        if User.wallet_exists(wallet_address):
             return jsonify({'error': 'User with this wallet address already exists'}), 409
         
         # Hash password
@@ -48,6 +48,8 @@ def register():
             }
         }), 201
     
+    except HashingBusy as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -66,7 +68,7 @@ def login():
         password = data['password']
         
         # Get user
-        user = User.get_user_by_email(email)
+        user = User.get_user_by_email(email, {"credentials": 0})
         if not user:
             return jsonify({'error': 'Invalid email or password'}), 401
         
@@ -74,6 +76,13 @@ def login():
         if not AuthUtil.verify_password(password, user['password_hash']):
             return jsonify({'error': 'Invalid email or password'}), 401
         
+        # Upgrade hashes made with an older cost factor while the plaintext is at hand
+        if AuthUtil.password_needs_rehash(user['password_hash']):
+            try:
+                User.update_user(user['_id'], {'password_hash': AuthUtil.hash_password(password)})
+            except HashingBusy:
+                pass
+        
         # Generate JWT token
         token = AuthUtil.generate_jwt_token(user['_id'], email, user['wallet_address'])
         
@@ -89,6 +98,8 @@ def login():
             }
         }), 200
     
+    except HashingBusy as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
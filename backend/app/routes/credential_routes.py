@@ -1,11 +1,94 @@
-from flask import Blueprint, request, jsonify
-from app.models import User, Credential
-from app.utils import require_auth, EncryptionUtil, HashUtil, blockchain
+from flask import Blueprint, request, jsonify, url_for, g, Response, stream_with_context
+from app.models import User, Credential, CREDENTIAL_WITHOUT_DATA, CREDENTIAL_SUMMARY_FIELDS
+from app.models.onchain import OnchainIndex
+from app.models.audit import AuditLog
+from app.utils import require_auth, envelope, HashUtil, blockchain, async_blockchain, anchor_worker, verification_cache
+from app.utils import store_encrypted_stream, open_decrypted_stream, UploadTooLarge
+from app.utils import canonicalize, LEGACY_HASH_SCHEME, FILE_HASH_SCHEME, encode_cursor, decode_cursor, audit_buffer, access_counter
+from app.utils import MERKLE_SCHEME, LEGACY_MERKLE_SCHEME
+from app.config import Config
 from bson.objectid import ObjectId
+from werkzeug.utils import secure_filename
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import json
+import re
 
 credential_bp = Blueprint('credentials', __name__, url_prefix='/api/credentials')
 
+# Shared pool for hashing and encrypting bulk uploads
+_bulk_pool = ThreadPoolExecutor(max_workers=Config.BULK_WORKERS, thread_name_prefix='bulk-credentials')
+
+# Anchoring states after which a verification result only changes on revocation
+FINAL_ANCHOR_STATES = ('anchored', 'failed', 'unanchored')
+
+CREDENTIAL_HASH_PATTERN = re.compile(r'[0-9a-fA-F]{64}')
+
+
+def _audit(credential_id, action, user_id=None):
+    """Record a credential access in the buffered audit log"""
+    audit_buffer.record(user_id, credential_id, action, request.remote_addr)
+
+
+def _from_cache(cached, action):
+    """Audit a cache hit and strip the credential id cached alongside the response"""
+    response = dict(cached)
+    _audit(response.pop('_credential_id', None), action)
+    return response
+
+
+def _normalize_credential_hash(value):
+    """Get a credential hash as lowercase hex without 0x, or None if it is not a SHA-256 hex digest"""
+    if not isinstance(value, str):
+        return None
+    if value[:2].lower() == '0x':
+        value = value[2:]
+    return value.lower() if CREDENTIAL_HASH_PATTERN.fullmatch(value) else None
+
+
+def _is_cacheable(credential):
+    """Check whether a credential's verification result can be cached"""
+    return credential.get('anchor_status', 'anchored') in FINAL_ANCHOR_STATES
+
+
+def _indexed_credentials(credential_hashes):
+    """Get the indexed on-chain records of credentials when VERIFY_FROM_INDEX is on"""
+    if not Config.VERIFY_FROM_INDEX:
+        return {}
+    return OnchainIndex.get_credentials(credential_hashes)
+
+
+def _indexed_merkle_roots(merkle_roots):
+    """Get the indexed anchored Merkle roots when VERIFY_FROM_INDEX is on"""
+    if not Config.VERIFY_FROM_INDEX:
+        return {}
+    return {
+        root: {'leaf_count': record['leaf_count'], 'timestamp': record['timestamp'], 'anchored': True}
+        for root, record in OnchainIndex.get_merkle_roots(merkle_roots).items()
+    }
+
+
+def _is_valid_in_index(record, wallet_address):
+    """Apply the contract's verifyCredential rule to an indexed record"""
+    return record['is_active'] and record['user_address'].lower() == wallet_address.lower()
+
+
+async def _verify_merkle_inclusion(credential):
+    """Check a batch-anchored credential's proof and that its root is anchored on-chain"""
+    merkle_proof = credential['merkle_proof']
+    # Roots missing from the index may just not be confirmed yet; ask the node
+    root_info = _indexed_merkle_roots([merkle_proof['root']]).get(merkle_proof['root'])
+    if root_info is None:
+        root_info = await async_blockchain.get_merkle_root(merkle_proof['root'])
+    is_included = root_info['anchored'] and HashUtil.verify_merkle_proof(
+        credential['blockchain_hash'],
+        merkle_proof['proof'],
+        merkle_proof['root'],
+        merkle_proof.get('scheme', LEGACY_MERKLE_SCHEME)
+    )
+    return root_info, is_included
+
+
 @credential_bp.route('/create', methods=['POST'])
 @require_auth
 def create_credential():
@@ -18,85 +101,358 @@ def create_credential():
         if not all(field in data for field in required_fields):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        user_id = request.user_id
+        user_id = g.user_id
         credential_type = data['credential_type']
         credential_data = data['credential_data']
         
         # Get user
-        user = User.get_user_by_id(user_id)
+        user = User.get_user_by_id(user_id, {"wallet_address": 1})
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
+        # Serialize once; the same canonical bytes are hashed and encrypted
+        try:
+            canonical_data = canonicalize(credential_data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Hash credential data for blockchain
-        credential_hash = HashUtil.hash_credential(credential_data)
+        credential_hash = HashUtil.hash_canonical(canonical_data)
+        
+        # Encrypt sensitive data under the user's data key
+        encrypted_data = envelope.encrypt(user_id, canonical_data)
         
-        # Encrypt sensitive data
-        encryption_key = EncryptionUtil.generate_encryption_key()
-        encrypted_data = EncryptionUtil.encrypt_data(json.dumps(credential_data), encryption_key)
+        # Queue the hash for anchoring instead of waiting for the block to be mined
+        anchor_status = 'pending' if blockchain.contract else 'unanchored'
         
         # Create credential in MongoDB
         credential_id = Credential.create_credential(
             user_id,
             credential_type,
-            {
-                'encrypted_data': encrypted_data,
-                'encryption_key': encryption_key.decode() if isinstance(encryption_key, bytes) else encryption_key
-            },
-            credential_hash
+            encrypted_data,
+            credential_hash,
+            anchor_status=anchor_status
         )
+        _audit(credential_id, 'create', user_id)
         
-        # Try to store on blockchain if contract is available
-        blockchain_tx = None
-        if blockchain.contract:
+        response = {
+            'message': 'Credential created successfully',
+            'credential_id': str(credential_id),
+            'credential_hash': credential_hash,
+            'anchor_status': anchor_status,
+            'blockchain_tx': None
+        }
+        
+        if anchor_status == 'unanchored':
+            return jsonify(response), 201
+        
+        anchor_worker.enqueue(credential_id, user['wallet_address'], credential_hash, credential_type)
+        response['status_url'] = url_for('credentials.get_anchor_status', credential_id=str(credential_id))
+        
+        return jsonify(response), 202
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _read_bulk_items():
+    """Yield raw credential items from an NDJSON request stream or a JSON body"""
+    if request.mimetype == 'application/x-ndjson':
+        for line in request.stream:
+            if line.strip():
+                yield line
+    else:
+        data = request.get_json(silent=True) or {}
+        for item in data.get('credentials', []):
+            yield item
+
+
+def _prepare_bulk_item(item, user_id):
+    """Parse, hash and encrypt one bulk item (runs on the bulk pool)"""
+    if isinstance(item, (bytes, str)):
+        item = json.loads(item)
+    if not isinstance(item, dict) or not all(field in item for field in ['credential_type', 'credential_data']):
+        raise ValueError('Missing required fields')
+    
+    canonical_data = canonicalize(item['credential_data'])
+    credential_hash = HashUtil.hash_canonical(canonical_data)
+    encrypted_data = envelope.encrypt(user_id, canonical_data)
+    return item['credential_type'], credential_hash, encrypted_data
+
+
+@credential_bp.route('/bulk', methods=['POST'])
+@require_auth
+def bulk_create_credentials():
+    """Create many credentials in one request
+    
+    Accepts an NDJSON stream (one {"credential_type", "credential_data"}
+    object per line) or a JSON body {"credentials": [...]}. Items are
+    processed independently and reported in input order.
+    """
+    try:
+        user_id = g.user_id
+        user = User.get_user_by_id(user_id, {"wallet_address": 1})
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        # Hash and encrypt on the pool while the rest of the body is still being read
+        futures = []
+        for item in _read_bulk_items():
+            if len(futures) >= Config.BULK_MAX_ITEMS:
+                for future in futures:
+                    future.cancel()
+                return jsonify({'error': f'At most {Config.BULK_MAX_ITEMS} credentials per request'}), 413
+            futures.append(_bulk_pool.submit(_prepare_bulk_item, item, user_id))
+        
+        if not futures:
+            return jsonify({'error': 'No credentials provided'}), 400
+        
+        anchor_status = 'pending' if blockchain.contract else 'unanchored'
+        results = [None] * len(futures)
+        docs, positions = [], []
+        for index, future in enumerate(futures):
             try:
-                # Convert hash string to bytes32
-                hash_bytes = bytes.fromhex(credential_hash.replace('0x', ''))
-                if len(hash_bytes) < 32:
-                    hash_bytes = hash_bytes + b'\x00' * (32 - len(hash_bytes))
-                hash_bytes32 = hash_bytes[:32]
-                
-                blockchain_tx = blockchain.store_credential_hash(
-                    user['wallet_address'],
-                    hash_bytes32,
-                    credential_type
-                )
+                credential_type, credential_hash, data = future.result()
             except Exception as e:
-                print(f"Warning: Could not store on blockchain: {str(e)}")
+                results[index] = {'index': index, 'status': 'error', 'error': str(e)}
+                continue
+            doc = Credential.build_credential(user_id, credential_type, data, credential_hash, anchor_status)
+            doc['_id'] = ObjectId()
+            docs.append(doc)
+            positions.append(index)
         
-        return jsonify({
+        # The whole request is anchored as one Merkle batch
+        merkle_root = None
+        if anchor_status == 'pending' and docs:
+            merkle_root, proofs = HashUtil.create_merkle_proofs([doc['blockchain_hash'] for doc in docs])
+            for leaf_index, doc in enumerate(docs):
+                doc['merkle_proof'] = {
+                    'root': merkle_root,
+                    'leaf_index': leaf_index,
+                    'leaf_count': len(docs),
+                    'proof': proofs[leaf_index],
+                    'scheme': MERKLE_SCHEME
+                }
+        
+        failed = Credential.create_credentials(docs)
+        
+        created_ids = []
+        for position, (doc, index) in enumerate(zip(docs, positions)):
+            if position in failed:
+                results[index] = {'index': index, 'status': 'error', 'error': failed[position]}
+                continue
+            created_ids.append(doc['_id'])
+            _audit(doc['_id'], 'create', user_id)
+            results[index] = {
+                'index': index,
+                'status': 'created',
+                'credential_id': str(doc['_id']),
+                'credential_hash': doc['blockchain_hash']
+            }
+        
+        if merkle_root and created_ids:
+            anchor_worker.enqueue_merkle_root(merkle_root, len(docs), created_ids)
+        
+        response = {
+            'total': len(results),
+            'created': len(created_ids),
+            'failed': len(results) - len(created_ids),
+            'anchor_status': anchor_status,
+            'merkle_root': merkle_root,
+            'results': results
+        }
+        
+        if not created_ids:
+            return jsonify(response), 400
+        return jsonify(response), 202 if anchor_status == 'pending' else 201
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@credential_bp.route('/upload', methods=['POST'])
+@require_auth
+def upload_credential_file():
+    """Create a credential from a large file (scanned passport, PDF, ...)
+    
+    The raw request body is the file; credential_type and filename are
+    query parameters. The body is hashed and encrypted segment by segment
+    while it is read and the ciphertext is stored in GridFS, so memory use
+    does not grow with the file size.
+    """
+    try:
+        credential_type = request.args.get('credential_type')
+        if not credential_type:
+            return jsonify({'error': 'Missing required fields'}), 400
+        
+        if request.content_length is not None and request.content_length > Config.UPLOAD_MAX_BYTES:
+            return jsonify({'error': f'Files are limited to {Config.UPLOAD_MAX_BYTES} bytes'}), 413
+        
+        user_id = g.user_id
+        user = User.get_user_by_id(user_id, {"wallet_address": 1})
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+        
+        try:
+            file_info, credential_hash = store_encrypted_stream(
+                user_id,
+                request.stream,
+                secure_filename(request.args.get('filename', '')) or 'credential',
+                request.mimetype or 'application/octet-stream'
+            )
+        except UploadTooLarge:
+            return jsonify({'error': f'Files are limited to {Config.UPLOAD_MAX_BYTES} bytes'}), 413
+        
+        anchor_status = 'pending' if blockchain.contract else 'unanchored'
+        
+        credential_id = Credential.create_credential(
+            user_id,
+            credential_type,
+            file_info,
+            credential_hash,
+            anchor_status=anchor_status,
+            hash_scheme=FILE_HASH_SCHEME
+        )
+        _audit(credential_id, 'create', user_id)
+        
+        response = {
             'message': 'Credential created successfully',
             'credential_id': str(credential_id),
             'credential_hash': credential_hash,
-            'blockchain_tx': blockchain_tx
-        }), 201
+            'size': file_info['size'],
+            'anchor_status': anchor_status,
+            'blockchain_tx': None
+        }
+        
+        if anchor_status == 'unanchored':
+            return jsonify(response), 201
+        
+        anchor_worker.enqueue(credential_id, user['wallet_address'], credential_hash, credential_type)
+        response['status_url'] = url_for('credentials.get_anchor_status', credential_id=str(credential_id))
+        
+        return jsonify(response), 202
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def _page_size():
+    """Get the requested page size, bounded by LIST_MAX_PAGE_SIZE"""
+    limit = request.args.get('limit', Config.LIST_PAGE_SIZE, type=int)
+    return max(1, min(limit, Config.LIST_MAX_PAGE_SIZE))
+
+
+def _wants_ndjson():
+    """Check whether the client asked for a streamed NDJSON export"""
+    return request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson'
+
+
+def _ndjson_response(documents, serialize):
+    """Stream documents as NDJSON, one line per document, as the cursor yields them"""
+    return Response(
+        stream_with_context(json.dumps(serialize(document)) + '\n' for document in documents),
+        mimetype='application/x-ndjson'
+    )
+
+
+def _credential_summary(cred):
+    """Serialize a credential for lists, without its encrypted data"""
+    return {
+        'credential_id': str(cred['_id']),
+        'credential_type': cred['credential_type'],
+        'blockchain_hash': cred['blockchain_hash'],
+        'created_at': cred['created_at'].isoformat(),
+        'access_count': cred['access_count'] + access_counter.pending(cred['_id'])
+    }
+
+
+def _access_log_entry(log):
+    """Serialize an access log entry"""
+    return {
+        'log_id': str(log['_id']),
+        'action': log['action'],
+        'status': log['status'],
+        'ip_address': log.get('ip_address'),
+        'timestamp': log['timestamp'].isoformat()
+    }
+
+
 @credential_bp.route('/list', methods=['GET'])
 @require_auth
 def list_credentials():
-    """List all credentials of a user"""
+    """List the credentials of a user
+    
+    Returns up to `limit` credentials per page; pass the returned
+    next_cursor as `cursor` for the following page. With ?format=ndjson
+    (or Accept: application/x-ndjson) all credentials are streamed instead.
+    """
     try:
-        user_id = request.user_id
-        
-        credentials = Credential.get_user_credentials(user_id)
-        
-        # Sanitize response (don't expose encryption keys)
-        credentials_list = []
-        for cred in credentials:
-            credentials_list.append({
-                'credential_id': str(cred['_id']),
-                'credential_type': cred['credential_type'],
-                'blockchain_hash': cred['blockchain_hash'],
-                'created_at': cred['created_at'].isoformat(),
-                'access_count': cred['access_count']
-            })
+        user_id = g.user_id
+        
+        if _wants_ndjson():
+            return _ndjson_response(
+                Credential.iter_user_credentials(user_id, CREDENTIAL_SUMMARY_FIELDS),
+                _credential_summary
+            )
+        
+        cursor = request.args.get('cursor')
+        try:
+            after_id = decode_cursor(cursor)[0] if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        limit = _page_size()
+        credentials = Credential.get_user_credentials_page(user_id, after_id, limit, CREDENTIAL_SUMMARY_FIELDS)
+        credentials_list = [_credential_summary(cred) for cred in credentials]
         
         return jsonify({
             'credentials': credentials_list,
-            'total': len(credentials_list)
+            'total': Credential.count_user_credentials(user_id),
+            'next_cursor': encode_cursor(credentials[-1]) if len(credentials) == limit else None
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@credential_bp.route('/<credential_id>/access-logs', methods=['GET'])
+@require_auth
+def get_credential_access_logs(credential_id):
+    """Get the access history of a credential, newest first
+    
+    Paginated with `limit` and `cursor` like /list; ?format=ndjson streams
+    the whole history.
+    """
+    try:
+        credential = Credential.get_credential_by_id(credential_id, {"user_id": 1})
+        
+        if not credential:
+            return jsonify({'error': 'Credential not found'}), 404
+        
+        # Check ownership
+        if str(credential['user_id']) != g.user_id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        if _wants_ndjson():
+            return _ndjson_response(AuditLog.iter_credential_access_logs(credential_id), _access_log_entry)
+        
+        cursor = request.args.get('cursor')
+        try:
+            before = None
+            if cursor:
+                log_id, timestamp = decode_cursor(cursor)
+                if timestamp is None:
+                    raise ValueError('Invalid cursor')
+                before = (timestamp, log_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        limit = _page_size()
+        logs = AuditLog.get_credential_access_logs(credential_id, limit, before)
+        
+        return jsonify({
+            'access_logs': [_access_log_entry(log) for log in logs],
+            'next_cursor': encode_cursor(logs[-1], 'timestamp') if len(logs) == limit else None
         }), 200
     
     except Exception as e:
@@ -108,24 +464,99 @@ def list_credentials():
 def get_credential(credential_id):
     """Get a specific credential"""
     try:
-        credential = Credential.get_credential_by_id(credential_id)
+        credential = Credential.get_credential_by_id(credential_id, {"data.encrypted_data": 0, "data.encryption_key": 0, "merkle_proof": 0})
         
         if not credential:
             return jsonify({'error': 'Credential not found'}), 404
         
         # Check ownership
-        if str(credential['user_id']) != request.user_id:
+        if str(credential['user_id']) != g.user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
-        # Increment access count
-        Credential.increment_access_count(credential_id)
+        # Count the access; it is written with the next coalesced flush
+        access_counter.increment(credential_id)
+        _audit(credential_id, 'view', g.user_id)
         
-        return jsonify({
+        response = {
             'credential_id': str(credential['_id']),
             'credential_type': credential['credential_type'],
             'blockchain_hash': credential['blockchain_hash'],
+            'hash_scheme': credential.get('hash_scheme', LEGACY_HASH_SCHEME),
             'created_at': credential['created_at'].isoformat(),
-            'access_count': credential['access_count']
+            'access_count': credential['access_count'] + access_counter.pending(credential_id),
+            'anchor_status': credential.get('anchor_status', 'unanchored')
+        }
+        
+        data = credential['data']
+        if data.get('storage') == 'gridfs':
+            response['file'] = {
+                'filename': data['filename'],
+                'content_type': data['content_type'],
+                'size': data['size'],
+                'download_url': url_for('credentials.download_credential_file', credential_id=credential_id)
+            }
+        
+        return jsonify(response), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@credential_bp.route('/<credential_id>/file', methods=['GET'])
+@require_auth
+def download_credential_file(credential_id):
+    """Stream the decrypted file of a credential created through /upload"""
+    try:
+        credential = Credential.get_credential_by_id(credential_id, {"user_id": 1, "data": 1})
+        
+        if not credential:
+            return jsonify({'error': 'Credential not found'}), 404
+        
+        # Check ownership
+        if str(credential['user_id']) != g.user_id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        data = credential['data']
+        if data.get('storage') != 'gridfs':
+            return jsonify({'error': 'Credential has no file'}), 404
+        
+        segments = open_decrypted_stream(g.user_id, data)
+        access_counter.increment(credential_id)
+        _audit(credential_id, 'download', g.user_id)
+        
+        return Response(
+            stream_with_context(segments),
+            mimetype=data['content_type'],
+            headers={
+                'Content-Length': str(data['size']),
+                'Content-Disposition': f'attachment; filename="{data["filename"]}"'
+            }
+        )
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@credential_bp.route('/<credential_id>/anchor-status', methods=['GET'])
+@require_auth
+def get_anchor_status(credential_id):
+    """Get the blockchain anchoring status of a credential"""
+    try:
+        credential = Credential.get_credential_by_id(credential_id, {"user_id": 1, "blockchain_hash": 1, "anchor_status": 1, "anchor_error": 1, "blockchain_tx": 1})
+        
+        if not credential:
+            return jsonify({'error': 'Credential not found'}), 404
+        
+        # Check ownership
+        if str(credential['user_id']) != g.user_id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        return jsonify({
+            'credential_id': str(credential['_id']),
+            'credential_hash': credential['blockchain_hash'],
+            'anchor_status': credential.get('anchor_status', 'unanchored'),
+            'anchor_error': credential.get('anchor_error'),
+            'blockchain_tx': credential.get('blockchain_tx')
         }), 200
     
     except Exception as e:
@@ -133,16 +564,22 @@ def get_credential(credential_id):
 
 
 @credential_bp.route('/<credential_hash>/blockchain-proof', methods=['GET'])
-def get_blockchain_proof(credential_hash):
+async def get_blockchain_proof(credential_hash):
     """Get proof that credential exists on blockchain"""
     try:
-        credential = Credential.get_credential_by_blockchain_hash(credential_hash)
+        cached = verification_cache.get('proof', credential_hash)
+        if cached is not None:
+            return jsonify(_from_cache(cached, 'proof')), 200
+        
+        read_at = verification_cache.read_started()
+        credential = Credential.get_credential_by_blockchain_hash(credential_hash, CREDENTIAL_WITHOUT_DATA)
         
         if not credential:
             return jsonify({'error': 'Credential not found'}), 404
         
         proof = {
             'credential_hash': credential['blockchain_hash'],
+            'hash_scheme': credential.get('hash_scheme', LEGACY_HASH_SCHEME),
             'credential_type': credential['credential_type'],
             'created_at': credential['created_at'].isoformat(),
             'is_active': credential['is_active'],
@@ -152,21 +589,35 @@ def get_blockchain_proof(credential_hash):
         # Try to get proof from blockchain contract
         if blockchain.contract:
             try:
-                # Convert hash string to bytes32
-                hash_bytes = bytes.fromhex(credential_hash.replace('0x', ''))
-                if len(hash_bytes) < 32:
-                    hash_bytes = hash_bytes + b'\x00' * (32 - len(hash_bytes))
-                hash_bytes32 = hash_bytes[:32]
-                
-                # Get owner from contract
-                owner = blockchain.contract.functions.getCredentialOwner(hash_bytes32).call()
-                
-                proof['blockchain_proof'] = {
-                    'owner_address': owner,
-                    'contract_address': str(blockchain.contract.address),
-                    'network': 'Ethereum (Remix VM)',
-                    'verified_on_chain': owner != '0x0000000000000000000000000000000000000000'
-                }
+                merkle_proof = credential.get('merkle_proof')
+                if merkle_proof:
+                    # Batch-anchored credential: prove inclusion under the anchored root
+                    root_info, is_included = await _verify_merkle_inclusion(credential)
+                    proof['blockchain_proof'] = {
+                        'merkle_root': merkle_proof['root'],
+                        'leaf_index': merkle_proof['leaf_index'],
+                        'leaf_count': merkle_proof['leaf_count'],
+                        'merkle_proof': merkle_proof['proof'],
+                        'merkle_scheme': merkle_proof.get('scheme', LEGACY_MERKLE_SCHEME),
+                        'anchored_at': root_info['timestamp'],
+                        'contract_address': str(blockchain.contract.address),
+                        'network': 'Ethereum (Remix VM)',
+                        'verified_on_chain': is_included
+                    }
+                else:
+                    record = _indexed_credentials([credential_hash]).get(credential_hash)
+                    if record:
+                        owner = record['user_address']
+                    else:
+                        # Get owner from contract
+                        owner = await async_blockchain.get_credential_owner(credential_hash)
+                    
+                    proof['blockchain_proof'] = {
+                        'owner_address': owner,
+                        'contract_address': str(blockchain.contract.address),
+                        'network': 'Ethereum (Remix VM)',
+                        'verified_on_chain': owner != '0x0000000000000000000000000000000000000000'
+                    }
             except Exception as e:
                 print(f"Warning: Could not get blockchain proof: {str(e)}")
                 proof['blockchain_proof'] = {
@@ -174,23 +625,35 @@ def get_blockchain_proof(credential_hash):
                     'contract_address': str(blockchain.contract_address) if blockchain.contract_address else None
                 }
         
+        # Node errors are not cached so the next request retries the chain
+        blockchain_proof = proof['blockchain_proof']
+        if _is_cacheable(credential) and not (blockchain_proof and 'error' in blockchain_proof):
+            verification_cache.set('proof', credential_hash, dict(proof, _credential_id=str(credential['_id'])), read_at)
+        _audit(credential['_id'], 'proof')
+        
         return jsonify(proof), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+@credential_bp.route('/<credential_id>/revoke', methods=['POST'])
+@require_auth
+def revoke_credential(credential_id):
     """Revoke a credential"""
     try:
-        credential = Credential.get_credential_by_id(credential_id)
+        credential = Credential.get_credential_by_id(credential_id, {"user_id": 1})
         
         if not credential:
             return jsonify({'error': 'Credential not found'}), 404
         
         # Check ownership
-        if str(credential['user_id']) != request.user_id:
+        if str(credential['user_id']) != g.user_id:
             return jsonify({'error': 'Unauthorized'}), 403
         
         # Revoke credential
         Credential.revoke_credential(credential_id)
+        _audit(credential_id, 'revoke', g.user_id)
         
         return jsonify({
             'message': 'Credential revoked successfully',
@@ -202,10 +665,15 @@ def get_blockchain_proof(credential_hash):
 
 
 @credential_bp.route('/verify/<credential_hash>', methods=['GET'])
-def verify_credential(credential_hash):
+async def verify_credential(credential_hash):
     """Verify a credential by its hash"""
     try:
-        credential = Credential.get_credential_by_blockchain_hash(credential_hash)
+        cached = verification_cache.get('verify', credential_hash)
+        if cached is not None:
+            return jsonify(_from_cache(cached, 'verify')), 200
+        
+        read_at = verification_cache.read_started()
+        credential = Credential.get_credential_by_blockchain_hash(credential_hash, CREDENTIAL_WITHOUT_DATA)
         
         if not credential:
             return jsonify({'error': 'Credential not found'}), 404
@@ -214,27 +682,140 @@ def verify_credential(credential_hash):
         blockchain_result = None
         if blockchain.contract:
             try:
-                # Convert hash string to bytes32
-                hash_bytes = bytes.fromhex(credential_hash.replace('0x', ''))
-                if len(hash_bytes) < 32:
-                    hash_bytes = hash_bytes + b'\x00' * (32 - len(hash_bytes))
-                hash_bytes32 = hash_bytes[:32]
-                
-                # Get the owner from the credential record
-                user = User.get_user_by_id(credential['user_id'])
-                if user:
-                    is_valid = blockchain.verify_credential(user['wallet_address'], hash_bytes32)
-                    blockchain_result = {'valid': is_valid, 'source': 'blockchain'}
+                if credential.get('merkle_proof'):
+                    # Batch-anchored credential: check the proof against the anchored root
+                    _, is_valid = await _verify_merkle_inclusion(credential)
+                    blockchain_result = {
+                        'valid': is_valid,
+                        'source': 'merkle_root',
+                        'merkle_root': credential['merkle_proof']['root']
+                    }
+                else:
+                    # Convert hash string to bytes32
+                    hash_bytes32 = blockchain.to_bytes32(credential_hash)
+                    
+                    # Get the owner from the credential record
+                    user = User.get_user_by_id(credential['user_id'], {"wallet_address": 1})
+                    record = _indexed_credentials([credential_hash]).get(credential_hash)
+                    if user and record:
+                        is_valid = _is_valid_in_index(record, user['wallet_address'])
+                        blockchain_result = {'valid': is_valid, 'source': 'index'}
+                    elif user:
+                        is_valid = await async_blockchain.verify_credential(user['wallet_address'], hash_bytes32)
+                        blockchain_result = {'valid': is_valid, 'source': 'blockchain'}
             except Exception as e:
                 print(f"Warning: Could not verify on blockchain: {str(e)}")
         
-        return jsonify({
+        result = {
             'valid': credential['is_active'],
             'credential_type': credential['credential_type'],
             'blockchain_hash': credential['blockchain_hash'],
             'created_at': credential['created_at'].isoformat(),
             'blockchain_verification': blockchain_result
-        }), 200
+        }
+        
+        # A missing on-chain result means the node could not be reached; retry next time
+        if _is_cacheable(credential) and (blockchain_result is not None or not blockchain.contract):
+            verification_cache.set('verify', credential_hash, dict(result, _credential_id=str(credential['_id'])), read_at)
+        _audit(credential['_id'], 'verify')
+        
+        return jsonify(result), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@credential_bp.route('/verify/batch', methods=['POST'])
+async def verify_credentials_batch():
+    """Verify many credentials by their hashes
+    
+    Resolves all hashes with one query, all owners with one query and the
+    on-chain state with one aggregated contract call. Results follow the
+    order of the submitted hashes.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        credential_hashes = data.get('credential_hashes')
+        
+        if not isinstance(credential_hashes, list) or not credential_hashes:
+            return jsonify({'error': 'credential_hashes must be a non-empty list'}), 400
+        if len(credential_hashes) > Config.VERIFY_BATCH_MAX_ITEMS:
+            return jsonify({'error': f'At most {Config.VERIFY_BATCH_MAX_ITEMS} hashes per request'}), 413
+        credential_hashes = [_normalize_credential_hash(credential_hash) for credential_hash in credential_hashes]
+        if None in credential_hashes:
+            return jsonify({'error': 'credential_hashes must be 64-character hex strings'}), 400
+        
+        credentials = {}
+        for credential in Credential.get_credentials_by_blockchain_hashes(set(credential_hashes), CREDENTIAL_WITHOUT_DATA):
+            credentials.setdefault(credential['blockchain_hash'], credential)
+        
+        # On-chain state for everything found, in two aggregated calls awaited together
+        onchain_valid = {}
+        indexed_valid = {}
+        merkle_roots = {}
+        if blockchain.contract and credentials:
+            try:
+                direct = [c for c in credentials.values() if not c.get('merkle_proof')]
+                wallets = User.get_wallet_addresses({str(c['user_id']) for c in direct})
+                direct = [c for c in direct if str(c['user_id']) in wallets]
+                
+                # Answer what the event index already holds; only the rest goes to the node
+                indexed = _indexed_credentials([c['blockchain_hash'] for c in direct])
+                indexed_valid = {
+                    c['blockchain_hash']: _is_valid_in_index(indexed[c['blockchain_hash']], wallets[str(c['user_id'])])
+                    for c in direct if c['blockchain_hash'] in indexed
+                }
+                direct = [c for c in direct if c['blockchain_hash'] not in indexed]
+                
+                roots = {c['merkle_proof']['root'] for c in credentials.values() if c.get('merkle_proof')}
+                merkle_roots = _indexed_merkle_roots(roots)
+                
+                validity, onchain_roots = await asyncio.gather(
+                    async_blockchain.verify_credentials(
+                        [wallets[str(c['user_id'])] for c in direct],
+                        [c['blockchain_hash'] for c in direct]
+                    ),
+                    async_blockchain.get_merkle_roots(roots - set(merkle_roots))
+                )
+                onchain_valid = {c['blockchain_hash']: valid for c, valid in zip(direct, validity)}
+                merkle_roots.update(onchain_roots)
+            except Exception as e:
+                print(f"Warning: Could not verify on blockchain: {str(e)}")
+        
+        results = []
+        for credential_hash in credential_hashes:
+            credential = credentials.get(credential_hash)
+            if not credential:
+                results.append({'credential_hash': credential_hash, 'found': False, 'valid': False})
+                continue
+            
+            blockchain_result = None
+            merkle_proof = credential.get('merkle_proof')
+            if merkle_proof and merkle_proof['root'] in merkle_roots:
+                blockchain_result = {
+                    'valid': merkle_roots[merkle_proof['root']]['anchored'] and HashUtil.verify_merkle_proof(
+                        credential_hash, merkle_proof['proof'], merkle_proof['root'],
+                        merkle_proof.get('scheme', LEGACY_MERKLE_SCHEME)
+                    ),
+                    'source': 'merkle_root',
+                    'merkle_root': merkle_proof['root']
+                }
+            elif credential_hash in indexed_valid:
+                blockchain_result = {'valid': indexed_valid[credential_hash], 'source': 'index'}
+            elif credential_hash in onchain_valid:
+                blockchain_result = {'valid': onchain_valid[credential_hash], 'source': 'blockchain'}
+            
+            _audit(credential['_id'], 'verify')
+            results.append({
+                'credential_hash': credential_hash,
+                'found': True,
+                'valid': credential['is_active'],
+                'credential_type': credential['credential_type'],
+                'created_at': credential['created_at'].isoformat(),
+                'blockchain_verification': blockchain_result
+            })
+        
+        return jsonify({'results': results, 'total': len(results)}), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,6 +1,6 @@
-from flask import Blueprint, request, jsonify
-from app.models import User, Credential
-from app.utils import require_auth
+from flask import Blueprint, request, jsonify, g
+from app.models import User, Credential, USER_PUBLIC_FIELDS
+from app.utils import require_auth, HashingBusy, hashing_busy_response
 
 user_bp = Blueprint('users', __name__, url_prefix='/api/users')
 
@@ -9,13 +9,13 @@ user_bp = Blueprint('users', __name__, url_prefix='/api/users')
 def get_profile():
     """Get user profile"""
     try:
-        user = User.get_user_by_id(request.user_id)
+        user = User.get_user_by_id(g.user_id, USER_PUBLIC_FIELDS)
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Get credential count
-        credentials = Credential.get_user_credentials(request.user_id)
+        # Count credentials without fetching them
+        credential_count = Credential.count_user_credentials(g.user_id)
         
         return jsonify({
             'user_id': str(user['_id']),
@@ -23,7 +23,7 @@ def get_profile():
             'full_name': user['full_name'],
             'wallet_address': user['wallet_address'],
             'is_verified': user.get('is_verified', False),
-            'credential_count': len(credentials),
+            'credential_count': credential_count,
             'verification_count': user.get('verification_count', 0),
             'created_at': user['created_at'].isoformat(),
             'updated_at': user['updated_at'].isoformat()
@@ -40,7 +40,7 @@ def update_profile():
     try:
         data = request.get_json()
         
-        user = User.get_user_by_id(request.user_id)
+        user = User.get_user_by_id(g.user_id, {"_id": 1})
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -51,9 +51,9 @@ def update_profile():
         
         # Update user
         if update_data:
-            User.update_user(request.user_id, update_data)
+            User.update_user(g.user_id, update_data)
         
-        updated_user = User.get_user_by_id(request.user_id)
+        updated_user = User.get_user_by_id(g.user_id, USER_PUBLIC_FIELDS)
         
         return jsonify({
             'message': 'Profile updated successfully',
@@ -75,7 +75,7 @@ def verify_user(user_id):
     """Verify a user (admin operation)"""
     try:
         # In production, this should require admin privileges
-        user = User.get_user_by_id(user_id)
+        user = User.get_user_by_id(user_id, {"_id": 1})
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -103,7 +103,7 @@ def change_password():
         old_password = data['old_password']
         new_password = data['new_password']
 
-        user = User.get_user_by_id(request.user_id)
+        user = User.get_user_by_id(g.user_id, {"password_hash": 1})
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
@@ -114,9 +114,11 @@ def change_password():
 
         # Hash new password and update
         new_hash = AuthUtil.hash_password(new_password)
-        User.update_user(request.user_id, {'password_hash': new_hash})
+        User.update_user(g.user_id, {'password_hash': new_hash})
 
         return jsonify({'message': 'Password changed successfully'}), 200
 
+    except HashingBusy as e:
+        return hashing_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,13 +1,61 @@
 # Utils package init
-from .auth import AuthUtil, require_auth
+from .auth import AuthUtil, require_auth, hashing_busy_response
+from .passwords import password_hasher, PasswordHasher, HashingBusy
 from .encryption import EncryptionUtil, HashUtil
+from .canonical import canonicalize, HASH_SCHEME, LEGACY_HASH_SCHEME, FILE_HASH_SCHEME
+from .envelope import envelope, EnvelopeEncryption
+from .streaming import store_encrypted_stream, open_decrypted_stream, UploadTooLarge
+from .pagination import encode_cursor, decode_cursor
+from .merkle import MerkleTree, MERKLE_SCHEME, LEGACY_MERKLE_SCHEME
+from .fees import FeeOracle
+from .inproc_chain import inproc_chain, InProcessChain
 from .blockchain import blockchain, BlockchainUtil
+from .async_blockchain import async_blockchain, AsyncBlockchainUtil
+from .anchoring import anchor_worker, AnchorWorker
+from .audit_buffer import audit_buffer, AuditBuffer
+from .access_counter import access_counter, AccessCounter
+from .cache import verification_cache, VerificationCache, LRUCache
+from .indexer import contract_indexer, ContractIndexer
 
 __all__ = [
     'AuthUtil',
     'require_auth',
+    'hashing_busy_response',
+    'password_hasher',
+    'PasswordHasher',
+    'HashingBusy',
     'EncryptionUtil',
     'HashUtil',
+    'canonicalize',
+    'HASH_SCHEME',
+    'LEGACY_HASH_SCHEME',
+    'FILE_HASH_SCHEME',
+    'envelope',
+    'EnvelopeEncryption',
+    'store_encrypted_stream',
+    'open_decrypted_stream',
+    'UploadTooLarge',
+    'encode_cursor',
+    'decode_cursor',
+    'MerkleTree',
+    'MERKLE_SCHEME',
+    'LEGACY_MERKLE_SCHEME',
+    'FeeOracle',
+    'inproc_chain',
+    'InProcessChain',
     'blockchain',
-    'BlockchainUtil'
+    'BlockchainUtil',
+    'async_blockchain',
+    'AsyncBlockchainUtil',
+    'anchor_worker',
+    'AnchorWorker',
+    'audit_buffer',
+    'AuditBuffer',
+    'access_counter',
+    'AccessCounter',
+    'verification_cache',
+    'VerificationCache',
+    'LRUCache',
+    'contract_indexer',
+    'ContractIndexer'
 ]
@@ -0,0 +1,90 @@
+import atexit
+import threading
+from collections import Counter
+from app.config import Config
+from app.models import Credential
+
+
+class AccessCounter:
+    """Coalesces credential access count increments in memory
+
+    Views only bump an in-process counter; a background thread writes all
+    pending counts every ACCESS_COUNT_FLUSH_INTERVAL seconds (or once
+    ACCESS_COUNT_FLUSH_KEYS credentials are pending) as one bulk_write of
+    $inc operations, so a popular credential costs one update per interval
+    instead of one per view. Counts that fail to flush are kept for the
+    next attempt and pending counts are flushed on shutdown.
+    """
+
+    def __init__(self, flush_interval=None, flush_keys=None):
+        self.flush_interval = flush_interval or Config.ACCESS_COUNT_FLUSH_INTERVAL
+        self.flush_keys = flush_keys or Config.ACCESS_COUNT_FLUSH_KEYS
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_now = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the flusher thread; pending counts are also flushed at interpreter exit"""
+        if self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True, name='access-counter')
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=None):
+        """Stop the flusher thread and write out the pending counts"""
+        self._stop_event.set()
+        self._flush_now.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def increment(self, credential_id):
+        """Count one access to a credential"""
+        if self._thread is None:
+            # No flusher (scripts, tests): write through
+            Credential.increment_access_counts({str(credential_id): 1})
+            return
+        with self._lock:
+            self._pending[str(credential_id)] += 1
+            pending_keys = len(self._pending)
+        if pending_keys >= self.flush_keys:
+            self._flush_now.set()
+
+    def pending(self, credential_id):
+        """Get the accesses to a credential not written to MongoDB yet"""
+        with self._lock:
+            return self._pending.get(str(credential_id), 0)
+
+    def flush(self):
+        """Write all pending counts; returns how many credentials were updated"""
+        with self._flush_lock:
+            with self._lock:
+                counts, self._pending = self._pending, Counter()
+            if not counts:
+                return 0
+            try:
+                Credential.increment_access_counts(counts)
+            except Exception:
+                with self._lock:
+                    self._pending.update(counts)
+                raise
+            return len(counts)
+
+    def _flush_loop(self):
+        while not self._stop_event.is_set():
+            self._flush_now.wait(self.flush_interval)
+            self._flush_now.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Warning: Access count flush failed: {str(e)}")
+
+
+# Create singleton instance
+access_counter = AccessCounter()
@@ -0,0 +1,357 @@
+import threading
+from datetime import datetime, timedelta
+from app.config import Config
+from app.models import Credential
+from app.models.anchor import AnchorJob
+from .blockchain import blockchain
+from .encryption import HashUtil
+from .merkle import MERKLE_SCHEME
+
+
+def _credential_ids(jobs):
+    """Collect the credentials covered by a list of jobs"""
+    credential_ids = []
+    for job in jobs:
+        credential_ids.extend(job.get('credential_ids') or [job['credential_id']])
+    return credential_ids
+
+
+def _pending_transaction(tx_hash, nonce):
+    """Describe a broadcast transaction the way submit_transaction does"""
+    return {'tx_hash': tx_hash, 'nonce': nonce, 'block_number': None, 'gas_used': None, 'status': None}
+
+
+class AnchorWorker:
+    """Background submitter and receipt poller for the anchoring queue
+
+    Credential hashes are queued in MongoDB by the request handlers, so
+    several workers (one per gunicorn process or a dedicated process) can
+    drain the same queue; jobs are claimed atomically. With ANCHOR_MODE=merkle
+    the queued hashes are collected into batches and only the Merkle root of
+    each batch is anchored.
+    """
+
+    def __init__(self, poll_interval=None, submitters=None):
+        self.poll_interval = poll_interval or Config.ANCHOR_POLL_INTERVAL
+        self.submitters = submitters or Config.ANCHOR_SUBMITTERS
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Start the submitter and poller threads"""
+        if self._threads:
+            return
+        self._stop_event.clear()
+        # Nonces are allocated locally, so several submitters can keep
+        # transactions from the same account in flight at once
+        targets = [self._submit_loop] * self.submitters + [self._poll_loop]
+        for i, target in enumerate(targets):
+            thread = threading.Thread(target=target, daemon=True, name=f"anchor-{target.__name__.strip('_')}-{i}")
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Stop the background threads"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def enqueue(self, credential_id, user_address, credential_hash, credential_type):
+        """Queue a credential hash for anchoring"""
+        return AnchorJob.enqueue(credential_id, user_address, credential_hash, credential_type)
+
+    def enqueue_merkle_root(self, merkle_root, leaf_count, credential_ids):
+        """Queue the root of a batch whose inclusion proofs are already stored"""
+        return AnchorJob.enqueue_merkle_root(merkle_root, leaf_count, credential_ids)
+
+    def _submit_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                AnchorJob.requeue_stale(Config.ANCHOR_STALE_TIMEOUT)
+                # Drain everything that is due before sleeping again
+                while not self._stop_event.is_set() and self.submit_next():
+                    pass
+            except Exception as e:
+                print(f"Warning: Anchor submitter error: {str(e)}")
+            self._stop_event.wait(self.poll_interval)
+
+    def _poll_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll_receipts()
+            except Exception as e:
+                print(f"Warning: Anchor receipt poller error: {str(e)}")
+            self._stop_event.wait(self.poll_interval)
+
+    def submit_next(self):
+        """Broadcast the next due job or batch; returns False when nothing is due"""
+        # Batches built up front (bulk creation) are anchored as they are
+        if self.submit_next_merkle_root():
+            return True
+        if Config.ANCHOR_MODE == 'merkle':
+            return self.submit_next_batch()
+
+        job = AnchorJob.claim_next()
+        if not job:
+            return False
+
+        self._submit([job], lambda on_signed: blockchain.store_credential_hash(
+            job['user_address'],
+            job['credential_hash'],
+            job['credential_type'],
+            wait=False,
+            on_signed=on_signed
+        ))
+        return True
+
+    def submit_next_merkle_root(self):
+        """Anchor the next queued pre-built Merkle root"""
+        job = AnchorJob.claim_next(merkle_roots=True)
+        if not job:
+            return False
+
+        self._submit([job], lambda on_signed: blockchain.anchor_merkle_root(
+            job['merkle_root'],
+            job['leaf_count'],
+            wait=False,
+            on_signed=on_signed
+        ))
+        return True
+
+    def submit_next_batch(self):
+        """Anchor the Merkle root of the next batch of due jobs in one transaction"""
+        if not AnchorJob.batch_ready(Config.ANCHOR_BATCH_SIZE, Config.ANCHOR_BATCH_WINDOW):
+            return False
+
+        jobs = AnchorJob.claim_batch(Config.ANCHOR_BATCH_SIZE)
+        if not jobs:
+            return False
+
+        try:
+            # Retried jobs may already be anchored by the root of an earlier batch
+            jobs = [job for job in jobs if not self._settle_previous_attempt([job])]
+        except Exception as e:
+            for job in jobs:
+                self._handle_failure(job, str(e))
+            return True
+        if not jobs:
+            return True
+
+        merkle_root, proofs = HashUtil.create_merkle_proofs([job['credential_hash'] for job in jobs])
+        merkle_proofs = [
+            (job['credential_id'], {
+                'root': merkle_root,
+                'leaf_index': i,
+                'leaf_count': len(jobs),
+                'proof': proofs[i],
+                'scheme': MERKLE_SCHEME
+            })
+            for i, job in enumerate(jobs)
+        ]
+        self._submit(
+            jobs,
+            lambda on_signed: blockchain.anchor_merkle_root(merkle_root, len(jobs), wait=False, on_signed=on_signed),
+            merkle_root=merkle_root,
+            merkle_proofs=merkle_proofs
+        )
+        return True
+
+    def _submit(self, jobs, send, merkle_root=None, merkle_proofs=None):
+        """Broadcast the transaction of claimed jobs
+
+        send(on_signed) submits it. on_signed stores the signed hash and
+        nonce on the jobs (and a batch's inclusion proofs) before the
+        broadcast, so an error or a crash after the node may have accepted
+        the transaction is resolved from the chain instead of sending the
+        jobs again.
+        """
+        job_ids = [job['_id'] for job in jobs]
+        signed = {}
+
+        def on_signed(tx_hash, nonce):
+            AnchorJob.record_signed(job_ids, tx_hash, nonce, merkle_root)
+            if merkle_proofs:
+                Credential.set_merkle_proofs(merkle_proofs)
+            signed.update(tx_hash=tx_hash, nonce=nonce)
+
+        try:
+            if not blockchain.contract:
+                raise Exception("Smart contract not initialized")
+            if not merkle_proofs and self._settle_previous_attempt(jobs):
+                return
+            result = send(on_signed)
+        except Exception as e:
+            if signed and self._track_signed(jobs, signed['tx_hash'], signed['nonce']):
+                return
+            # The eth_call pre-check reverts on a credential stored earlier
+            if not signed and 'reverted' in str(e).lower() and self._settle_if_anchored(jobs):
+                return
+            for job in jobs:
+                self._handle_failure(job, str(e))
+            return
+
+        if merkle_proofs and not signed:
+            # Simulated transactions are never signed
+            Credential.set_merkle_proofs(merkle_proofs)
+        self._record_submission(jobs, result)
+
+    def _track_signed(self, jobs, tx_hash, nonce):
+        """Wait for a signed transaction whose broadcast raised but that the node may have anyway"""
+        try:
+            known = blockchain.is_transaction_known(tx_hash)
+        except Exception:
+            # Cannot tell yet; the drop check requeues the jobs if the node never got it
+            known = True
+        if known:
+            self._record_submission(jobs, _pending_transaction(tx_hash, nonce))
+        return known
+
+    def _settle_previous_attempt(self, jobs):
+        """Resolve retried jobs whose earlier transaction may have gone through
+
+        Returns True when the jobs need no new transaction: the earlier one
+        was mined or is still pending, or the chain already holds what they
+        anchor (for instance through a fee-bump replacement).
+        """
+        job = jobs[0]
+        if job['attempts'] <= 1:
+            return False
+        tx_hash = job.get('signed_tx_hash')
+        if tx_hash:
+            receipt = blockchain.get_transaction_receipt(tx_hash)
+            if receipt is not None:
+                self._finalize(jobs, receipt)
+                return True
+            if blockchain.is_transaction_known(tx_hash):
+                self._record_submission(jobs, _pending_transaction(tx_hash, job.get('nonce')))
+                return True
+        if self._anchored_on_chain(jobs):
+            self._mark_anchored(jobs)
+            return True
+        return False
+
+    @staticmethod
+    def _anchored_on_chain(jobs):
+        """Check whether the credential or Merkle root that jobs anchor is already on-chain"""
+        # Jobs sharing a transaction share its Merkle root
+        if jobs[0].get('merkle_root'):
+            return blockchain.get_merkle_root(jobs[0]['merkle_root'])['anchored']
+        return all(
+            blockchain.get_credential_owner(job['credential_hash']).lower() == job['user_address'].lower()
+            for job in jobs
+        )
+
+    def _settle_if_anchored(self, jobs):
+        """Mark jobs anchored when the chain already holds what they anchor"""
+        try:
+            if not self._anchored_on_chain(jobs):
+                return False
+        except Exception as e:
+            print(f"Warning: Could not check anchoring on-chain: {str(e)}")
+            return False
+        self._mark_anchored(jobs)
+        return True
+
+    def _mark_anchored(self, jobs, receipt=None):
+        AnchorJob.mark_anchored([job['_id'] for job in jobs])
+        Credential.update_anchor_status(_credential_ids(jobs), 'anchored', blockchain_tx=receipt)
+
+    def _record_submission(self, jobs, result):
+        if result['status'] is None:
+            AnchorJob.mark_submitted([job['_id'] for job in jobs], result['tx_hash'], result.get('nonce'))
+            Credential.update_anchor_status(_credential_ids(jobs), 'submitted', blockchain_tx=result)
+        else:
+            # Simulated transactions come back already "mined"
+            self._finalize(jobs, result)
+
+    def poll_receipts(self):
+        """Check submitted transactions and record the mined receipts"""
+        now = datetime.utcnow()
+        drop_cutoff = now - timedelta(seconds=Config.ANCHOR_DROP_TIMEOUT)
+        bump_cutoff = now - timedelta(seconds=Config.ANCHOR_BUMP_AFTER)
+        tx_hashes = AnchorJob.get_submitted_transactions()
+        # A transaction that was replaced by a fee bump may still be the one that gets mined
+        replaced = AnchorJob.get_replaced_transactions() if tx_hashes else {}
+        lookups = tx_hashes + [old_hash for old_hashes in replaced.values() for old_hash in old_hashes]
+        receipts = blockchain.get_transaction_receipts(lookups) if lookups else {}
+        for tx_hash in tx_hashes:
+            jobs = AnchorJob.get_jobs_by_transaction(tx_hash)
+            if not jobs:
+                continue
+            receipt = receipts.get(tx_hash)
+            for old_hash in replaced.get(tx_hash, []):
+                receipt = receipt or receipts.get(old_hash)
+            submitted_at = jobs[0].get('submitted_at')
+            if receipt is not None:
+                self._finalize(jobs, receipt)
+            elif submitted_at and submitted_at < bump_cutoff and jobs[0].get('bumps', 0) < Config.ANCHOR_MAX_BUMPS and self._bump(jobs):
+                continue
+            elif submitted_at and submitted_at < drop_cutoff:
+                self._check_dropped(jobs)
+        if tx_hashes and blockchain.account:
+            self._fill_nonce_gaps(bump_cutoff)
+
+    def _fill_nonce_gaps(self, cutoff):
+        """Fill nonces below our lowest outstanding one that were never broadcast
+
+        The node's pending count covers every nonce it has mined or can mine
+        next, so when it is behind the lowest nonce of our submitted jobs the
+        nonces in between were allocated but never broadcast and every later
+        transaction waits in the node's queue. Such a gap only counts once
+        the job above it was submitted before cutoff, which leaves time for
+        transactions still on their way to the node.
+        """
+        pending_nonce = blockchain.get_pending_nonce()
+        job = AnchorJob.get_lowest_submitted_nonce(pending_nonce)
+        if not job or job['nonce'] == pending_nonce or job['submitted_at'] >= cutoff:
+            return
+        for nonce in range(pending_nonce, job['nonce']):
+            try:
+                blockchain.fill_nonce(nonce)
+            except Exception as e:
+                print(f"Warning: {str(e)}")
+
+    def _bump(self, jobs):
+        """Replace a transaction still pending after ANCHOR_BUMP_AFTER with a higher-fee copy"""
+        tx_hash = jobs[0]['tx_hash']
+        try:
+            result = blockchain.bump_transaction(tx_hash)
+        except Exception as e:
+            print(f"Warning: Could not bump transaction {tx_hash}: {str(e)}")
+            return False
+        AnchorJob.record_replacement([job['_id'] for job in jobs], tx_hash, result['tx_hash'])
+        return True
+
+    def _check_dropped(self, jobs):
+        """Requeue the jobs of a transaction the node has forgotten about"""
+        if blockchain.is_transaction_known(jobs[0]['tx_hash']):
+            return
+        # The nonce it held is free again (or was taken by another transaction)
+        blockchain.resync_nonce()
+        for job in jobs:
+            self._handle_failure(job, 'Transaction dropped from mempool')
+
+    def _finalize(self, jobs, receipt):
+        if receipt['status'] == 1:
+            self._mark_anchored(jobs, receipt)
+        elif self._anchored_on_chain(jobs):
+            # A duplicate of a transaction that already anchored the same jobs
+            self._mark_anchored(jobs)
+        else:
+            error = 'Transaction reverted'
+            AnchorJob.mark_failed([job['_id'] for job in jobs], error)
+            Credential.update_anchor_status(_credential_ids(jobs), 'failed', blockchain_tx=receipt, error=error)
+
+    def _handle_failure(self, job, error):
+        if job['attempts'] >= Config.ANCHOR_MAX_ATTEMPTS:
+            AnchorJob.mark_failed([job['_id']], error)
+            Credential.update_anchor_status(_credential_ids([job]), 'failed', error=error)
+        else:
+            delay = Config.ANCHOR_RETRY_BACKOFF * (2 ** (job['attempts'] - 1))
+            AnchorJob.retry_later(job['_id'], error, delay)
+            Credential.update_anchor_status(_credential_ids([job]), 'pending', error=error)
+
+
+# Create singleton instance
+anchor_worker = AnchorWorker()
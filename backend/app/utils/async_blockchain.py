@@ -0,0 +1,194 @@
+import asyncio
+import threading
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from web3 import AsyncWeb3, Web3
+from web3.middleware import async_construct_simple_cache_middleware
+from app.config import Config
+from .blockchain import BlockchainUtil, WEB3_PROVIDER_URI, CONTRACT_ADDRESS
+from .inproc_chain import inproc_chain, is_inproc
+from app.metrics import async_rpc_metrics_middleware
+
+
+class AsyncBlockchainUtil:
+    """Asyncio client for the read-only contract calls of the verification endpoints
+
+    Owns one event loop on a background thread, with a single pooled aiohttp
+    session, so coroutines awaited from any thread or event loop (Flask runs
+    each async view in a fresh loop) share the same keep-alive connections
+    and many RPCs can be in flight at once.
+    """
+
+    def __init__(self, provider_uri=None, pool_size=None, timeout=None):
+        self.provider_uri = provider_uri or WEB3_PROVIDER_URI
+        self.pool_size = pool_size or Config.ASYNC_RPC_POOL_SIZE
+        self.timeout = timeout or Config.ASYNC_RPC_TIMEOUT
+        self.contract_address = Web3.to_checksum_address(CONTRACT_ADDRESS) if CONTRACT_ADDRESS != "0x0000000000000000000000000000000000000000" else None
+        self.contract_abi = None
+        self.w3 = None
+        self.contract = None
+        self._loop = None
+        self._session = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def initialize_contract(self, contract_abi):
+        """Set the ABI used for contract calls"""
+        self.contract_abi = contract_abi
+        self.contract = None
+
+    def _ensure_started(self):
+        """Start the client loop and its session on first use"""
+        if self._loop is not None:
+            return self._loop
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, daemon=True, name='async-blockchain').start()
+                asyncio.run_coroutine_threadsafe(self._connect(), loop).result()
+                self._loop = loop
+        return self._loop
+
+    async def _connect(self):
+        if is_inproc(self.provider_uri):
+            # Same in-process chain as BlockchainUtil; no connections to pool
+            provider = inproc_chain.async_provider()
+            self.contract_address = inproc_chain.contract_address
+        else:
+            provider = AsyncWeb3.AsyncHTTPProvider(
+                self.provider_uri,
+                request_kwargs={'timeout': ClientTimeout(total=self.timeout)}
+            )
+            # web3 reuses a cached session per thread and URI; this thread only runs the client loop
+            self._session = ClientSession(connector=TCPConnector(limit=self.pool_size), raise_for_status=True)
+            await provider.cache_async_session(self._session)
+        self.w3 = AsyncWeb3(provider)
+        if Config.METRICS_ENABLED:
+            self.w3.middleware_onion.add(async_rpc_metrics_middleware, 'metrics')
+        # Call validation checks the chain id, which never changes; fetch it once
+        self.w3.middleware_onion.add(
+            await async_construct_simple_cache_middleware(rpc_whitelist=('eth_chainId',)),
+            'chain_id_cache'
+        )
+        self._semaphore = asyncio.Semaphore(self.pool_size)
+
+    def _get_contract(self):
+        self._ensure_started()
+        if self.contract is None:
+            if not self.contract_abi or not self.contract_address:
+                raise Exception("Smart contract not initialized")
+            self.contract = self.w3.eth.contract(address=self.contract_address, abi=self.contract_abi)
+        return self.contract
+
+    def run(self, coroutine):
+        """Schedule a coroutine on the client loop and return an awaitable for the caller's loop"""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._ensure_started())
+        return asyncio.wrap_future(future)
+
+    def run_sync(self, coroutine):
+        """Run a coroutine on the client loop from synchronous code"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_started()).result()
+
+    async def _call(self, function_call):
+        async with self._semaphore:
+            return await function_call.call()
+
+    async def _gather(self, function_calls):
+        return await asyncio.gather(*(self._call(function_call) for function_call in function_calls))
+
+    async def is_connected(self):
+        """Check if connected to blockchain network"""
+        return await self.run(self._is_connected())
+
+    async def _is_connected(self):
+        return await self.w3.is_connected()
+
+    async def verify_credential(self, user_address, credential_hash):
+        """Verify a credential on the blockchain"""
+        try:
+            return await self.run(self._call(self._get_contract().functions.verifyCredential(
+                Web3.to_checksum_address(user_address),
+                self._as_bytes32(credential_hash)
+            )))
+        except Exception as e:
+            raise Exception(f"Error verifying credential: {str(e)}")
+
+    async def get_credential_owner(self, credential_hash):
+        """Get the address that owns a credential on-chain"""
+        try:
+            return await self.run(self._call(
+                self._get_contract().functions.getCredentialOwner(self._as_bytes32(credential_hash))
+            ))
+        except Exception as e:
+            raise Exception(f"Error getting credential owner: {str(e)}")
+
+    async def get_merkle_root(self, merkle_root):
+        """Get the leaf count and anchoring timestamp of a Merkle root (timestamp 0 if not anchored)"""
+        try:
+            leaf_count, timestamp = await self.run(self._call(
+                self._get_contract().functions.getMerkleRoot(self._as_bytes32(merkle_root))
+            ))
+            return {'leaf_count': leaf_count, 'timestamp': timestamp, 'anchored': timestamp > 0}
+        except Exception as e:
+            raise Exception(f"Error getting merkle root: {str(e)}")
+
+    async def verify_credentials(self, user_addresses, credential_hashes):
+        """Verify many credentials with one aggregated call, or concurrent single calls on older contracts"""
+        try:
+            if not credential_hashes:
+                return []
+            contract = self._get_contract()
+            addresses = [Web3.to_checksum_address(address) for address in user_addresses]
+            hashes = [self._as_bytes32(h) for h in credential_hashes]
+            try:
+                return list(await self.run(self._call(contract.functions.verifyCredentials(addresses, hashes))))
+            except Exception as e:
+                print(f"Warning: Aggregated verification unavailable, verifying concurrently: {str(e)}")
+                return list(await self.run(self._gather(
+                    contract.functions.verifyCredential(address, credential_hash)
+                    for address, credential_hash in zip(addresses, hashes)
+                )))
+        except Exception as e:
+            raise Exception(f"Error verifying credentials: {str(e)}")
+
+    async def get_merkle_roots(self, merkle_roots):
+        """Get many anchored Merkle roots with one aggregated call, or concurrent single calls"""
+        try:
+            merkle_roots = list(merkle_roots)
+            if not merkle_roots:
+                return {}
+            contract = self._get_contract()
+            roots = [self._as_bytes32(root) for root in merkle_roots]
+            try:
+                leaf_counts, timestamps = await self.run(self._call(contract.functions.getMerkleRoots(roots)))
+            except Exception as e:
+                print(f"Warning: Aggregated root lookup unavailable, reading concurrently: {str(e)}")
+                results = await self.run(self._gather(contract.functions.getMerkleRoot(root) for root in roots))
+                leaf_counts = [leaf_count for leaf_count, _ in results]
+                timestamps = [timestamp for _, timestamp in results]
+
+            return {
+                root: {'leaf_count': leaf_count, 'timestamp': timestamp, 'anchored': timestamp > 0}
+                for root, leaf_count, timestamp in zip(merkle_roots, leaf_counts, timestamps)
+            }
+        except Exception as e:
+            raise Exception(f"Error getting merkle roots: {str(e)}")
+
+    @staticmethod
+    def _as_bytes32(value):
+        return BlockchainUtil.to_bytes32(value) if isinstance(value, str) else value
+
+    def close(self):
+        """Close the pooled session and stop the client loop"""
+        if self._loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+            self._session = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+        self.w3 = None
+        self.contract = None
+
+
+# Create singleton instance
+async_blockchain = AsyncBlockchainUtil()
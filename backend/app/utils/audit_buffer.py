@@ -0,0 +1,172 @@
+import atexit
+import os
+import queue
+import threading
+from bson import json_util
+from pymongo.write_concern import WriteConcern
+from app.config import Config
+from app.models.audit import AuditLog
+
+
+def _write_concern(w):
+    """Build the write concern for audit inserts from AUDIT_WRITE_CONCERN ('0', '1', 'majority', ...)"""
+    if w == '':
+        return None
+    return WriteConcern(w=int(w) if w.isdigit() else w)
+
+
+class AuditBuffer:
+    """In-process buffer that batches access log writes
+
+    Request handlers only put a document on a bounded queue; a background
+    thread inserts the queued documents with one unordered insert_many
+    whenever AUDIT_BATCH_SIZE are waiting or AUDIT_FLUSH_INTERVAL has
+    passed. When the queue is full (MongoDB slow or down), new entries are
+    dropped or, with AUDIT_OVERFLOW=spill, appended to AUDIT_SPILL_PATH and
+    replayed once writes succeed again. Whatever is queued is flushed on
+    shutdown.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None, queue_size=None, overflow=None, spill_path=None, write_concern=None, enabled=None):
+        self.enabled = Config.AUDIT_ENABLED if enabled is None else enabled
+        self.batch_size = batch_size or Config.AUDIT_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.AUDIT_FLUSH_INTERVAL
+        self.overflow = overflow or Config.AUDIT_OVERFLOW
+        self.spill_path = spill_path or Config.AUDIT_SPILL_PATH
+        self.write_concern = write_concern if write_concern is not None else _write_concern(Config.AUDIT_WRITE_CONCERN)
+        self._queue = queue.Queue(maxsize=queue_size or Config.AUDIT_QUEUE_SIZE)
+        self._spill_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._batch_ready = threading.Event()
+        self._thread = None
+        self._counters = {'written': 0, 'dropped': 0, 'spilled': 0, 'replayed': 0, 'failed_flushes': 0}
+
+    def start(self):
+        """Start the flusher thread; queued entries are also flushed at interpreter exit"""
+        if self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True, name='audit-flusher')
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout=None):
+        """Stop the flusher thread and write out everything still queued"""
+        self._stop_event.set()
+        self._batch_ready.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def record(self, user_id, credential_id, action, ip_address=None, status="success"):
+        """Queue an access log entry; never blocks or fails the request"""
+        if not self.enabled:
+            return
+        log_doc = AuditLog.build_log(user_id, credential_id, action, ip_address, status)
+        if self._thread is None:
+            # No flusher (scripts, tests): write through
+            try:
+                self._counters['written'] += AuditLog.log_many([log_doc], self.write_concern)
+            except Exception as e:
+                print(f"Warning: Could not write audit log: {str(e)}")
+                self._overflow([log_doc])
+            return
+        try:
+            self._queue.put_nowait(log_doc)
+        except queue.Full:
+            self._overflow([log_doc])
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+
+    def _overflow(self, log_docs):
+        if self.overflow == 'spill':
+            try:
+                with self._spill_lock, open(self.spill_path, 'a') as spill:
+                    spill.writelines(json_util.dumps(log_doc) + '\n' for log_doc in log_docs)
+                self._counters['spilled'] += len(log_docs)
+                return
+            except Exception as e:
+                print(f"Warning: Could not spill audit logs: {str(e)}")
+        self._counters['dropped'] += len(log_docs)
+
+    def _drain(self, limit):
+        log_docs = []
+        while len(log_docs) < limit:
+            try:
+                log_docs.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return log_docs
+
+    def flush(self):
+        """Write out everything queued now; returns how many entries were written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                log_docs = self._drain(self.batch_size)
+                if not log_docs:
+                    break
+                try:
+                    written += AuditLog.log_many(log_docs, self.write_concern)
+                except Exception as e:
+                    print(f"Warning: Audit log flush failed: {str(e)}")
+                    self._counters['failed_flushes'] += 1
+                    self._overflow(log_docs)
+                    break
+            self._counters['written'] += written
+        if written:
+            self.replay_spill()
+        return written
+
+    def replay_spill(self):
+        """Insert entries spilled to disk while MongoDB was unavailable"""
+        if self.overflow != 'spill' or not os.path.exists(self.spill_path):
+            return 0
+        with self._spill_lock:
+            replaying = f"{self.spill_path}.{os.getpid()}.replay"
+            try:
+                os.replace(self.spill_path, replaying)
+            except FileNotFoundError:
+                return 0
+        replayed = 0
+        try:
+            with open(replaying) as spill:
+                batch = []
+                for line in spill:
+                    batch.append(json_util.loads(line))
+                    if len(batch) >= self.batch_size:
+                        replayed += AuditLog.log_many(batch, self.write_concern)
+                        batch = []
+                replayed += AuditLog.log_many(batch, self.write_concern)
+            os.remove(replaying)
+        except Exception as e:
+            # Put back what was not inserted, for the next attempt
+            print(f"Warning: Could not replay spilled audit logs: {str(e)}")
+            with self._spill_lock, open(replaying) as spill, open(self.spill_path, 'a') as target:
+                for index, line in enumerate(spill):
+                    if index >= replayed:
+                        target.write(line)
+            os.remove(replaying)
+        self._counters['replayed'] += replayed
+        return replayed
+
+    def _flush_loop(self):
+        self.replay_spill()
+        while not self._stop_event.is_set():
+            # Wake up on a full batch or after the flush interval, whichever comes first
+            self._batch_ready.wait(self.flush_interval)
+            self._batch_ready.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Warning: Audit flusher error: {str(e)}")
+
+    def stats(self):
+        """Get queue depth and write/drop/spill counters"""
+        return dict(self._counters, queued=self._queue.qsize(), overflow=self.overflow)
+
+
+# Create singleton instance
+audit_buffer = AuditBuffer()
@@ -1,29 +1,40 @@
-import bcrypt
 import jwt
 import os
+import hashlib
+import time
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from functools import wraps
-from flask import request, jsonify
+from flask import request, jsonify, g
+from app.config import Config
+from .cache import LRUCache
+from .passwords import password_hasher, HashingBusy
 
 load_dotenv()
 
 JWT_SECRET = os.getenv("JWT_SECRET", "your-secret-key")
 JWT_EXPIRATION = int(os.getenv("JWT_EXPIRATION", "86400"))  # 24 hours
 
+# Verified tokens by SHA-256 digest, each kept until its exp (at most JWT_CACHE_TTL)
+_token_cache = LRUCache(Config.JWT_CACHE_SIZE, Config.JWT_CACHE_TTL)
+
 class AuthUtil:
     """Utilities for authentication and authorization"""
     
     @staticmethod
     def hash_password(password):
-        """Hash password using bcrypt"""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Hash password using bcrypt (on the hashing pool; raises HashingBusy when saturated)"""
+        return password_hasher.hash_password(password)
     
     @staticmethod
     def verify_password(password, password_hash):
-        """Verify password against hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+        """Verify password against hash (on the hashing pool; raises HashingBusy when saturated)"""
+        return password_hasher.verify_password(password, password_hash)
+    
+    @staticmethod
+    def password_needs_rehash(password_hash):
+        """Check whether a hash predates the configured bcrypt cost"""
+        return password_hasher.needs_rehash(password_hash)
     
     @staticmethod
     def generate_jwt_token(user_id, email, wallet_address):
@@ -35,20 +46,52 @@ class AuthUtil:
             'iat': datetime.utcnow(),
             'exp': datetime.utcnow() + timedelta(seconds=JWT_EXPIRATION)
         }
+        # New tokens are signed with the active key; tokens without a kid use JWT_SECRET
+        if Config.JWT_ACTIVE_KID:
+            return jwt.encode(
+                payload,
+                Config.JWT_KEYS[Config.JWT_ACTIVE_KID],
+                algorithm='HS256',
+                headers={'kid': Config.JWT_ACTIVE_KID}
+            )
         token = jwt.encode(payload, JWT_SECRET, algorithm='HS256')
         return token
     
+    @staticmethod
+    def _signing_key(token):
+        """Get the key a token was signed with, from its kid header"""
+        kid = jwt.get_unverified_header(token).get('kid')
+        if kid is None:
+            return JWT_SECRET
+        if kid not in Config.JWT_KEYS:
+            raise jwt.InvalidTokenError(f"Unknown key id {kid}")
+        return Config.JWT_KEYS[kid]
+    
     @staticmethod
     def verify_jwt_token(token):
         """Verify and decode JWT token"""
         try:
-            payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+            payload = jwt.decode(token, AuthUtil._signing_key(token), algorithms=['HS256'])
             return payload
         except jwt.ExpiredSignatureError:
             raise Exception("Token expired")
         except jwt.InvalidTokenError:
             raise Exception("Invalid token")
     
+    @staticmethod
+    def verify_jwt_token_cached(token):
+        """Verify a token, reusing the result of an earlier verification until the token expires"""
+        digest = hashlib.sha256(token.encode('utf-8')).digest()
+        payload = _token_cache.get(digest)
+        if payload is not None:
+            return payload
+        
+        payload = AuthUtil.verify_jwt_token(token)
+        ttl = min(payload['exp'] - time.time(), Config.JWT_CACHE_TTL) if 'exp' in payload else Config.JWT_CACHE_TTL
+        if ttl > 0:
+            _token_cache.set(digest, payload, ttl)
+        return payload
+    
     @staticmethod
     def extract_token_from_request(req):
         """Extract JWT token from request headers"""
@@ -56,6 +99,18 @@ class AuthUtil:
         if not auth_header.startswith('Bearer '):
             return None
         return auth_header[7:]  # Remove 'Bearer ' prefix
+    
+    @staticmethod
+    def token_cache_stats():
+        """Get the verified token cache statistics"""
+        return _token_cache.stats()
+
+
+def hashing_busy_response(error):
+    """Build the 503 response for a saturated password hashing pool"""
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
 
 
 def require_auth(f):
@@ -67,10 +122,11 @@ def require_auth(f):
             return jsonify({'error': 'Missing authentication token'}), 401
         
         try:
-            payload = AuthUtil.verify_jwt_token(token)
-            request.user_id = payload['user_id']
-            request.email = payload['email']
-            request.wallet_address = payload['wallet_address']
+            payload = AuthUtil.verify_jwt_token_cached(token)
+            g.jwt_claims = payload
+            g.user_id = payload['user_id']
+            g.email = payload['email']
+            g.wallet_address = payload['wallet_address']
         except Exception as e:
             return jsonify({'error': str(e)}), 401
         
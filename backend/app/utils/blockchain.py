@@ -1,7 +1,17 @@
 from web3 import Web3
+from web3.exceptions import TransactionNotFound
 import os
+import math
+import threading
+import time
 from dotenv import load_dotenv
 import json
+from app.config import Config
+from .nonce import NonceManager, is_nonce_error
+from .provider import PooledHTTPProvider
+from .fees import FeeOracle
+from .inproc_chain import inproc_chain, is_inproc
+from app.metrics import rpc_metrics_middleware, rpc_request_duration, rpc_errors
 
 load_dotenv()
 
@@ -9,17 +19,41 @@ WEB3_PROVIDER_URI = os.getenv("WEB3_PROVIDER_URI", "http://127.0.0.1:8545")
 CONTRACT_ADDRESS = os.getenv("CONTRACT_ADDRESS", "0x0000000000000000000000000000000000000000")
 PRIVATE_KEY = os.getenv("PRIVATE_KEY", "")
 
+# Node error messages that mean it already has this exact signed transaction
+KNOWN_TRANSACTION_MARKERS = ('already known', 'known transaction')
+
 class BlockchainUtil:
     """Utilities for blockchain interactions"""
     
     def __init__(self):
-        self.w3 = Web3(Web3.HTTPProvider(WEB3_PROVIDER_URI))
-        self.contract_address = Web3.to_checksum_address(CONTRACT_ADDRESS) if CONTRACT_ADDRESS != "0x0000000000000000000000000000000000000000" else None
+        private_key = PRIVATE_KEY
+        if is_inproc(WEB3_PROVIDER_URI):
+            # Real contract on an in-process chain, signed by its pre-funded deployer
+            self.w3 = Web3(inproc_chain.provider())
+            self.contract_address = inproc_chain.contract_address
+            private_key = inproc_chain.private_key
+        else:
+            self.w3 = Web3(PooledHTTPProvider(WEB3_PROVIDER_URI))
+            self.contract_address = Web3.to_checksum_address(CONTRACT_ADDRESS) if CONTRACT_ADDRESS != "0x0000000000000000000000000000000000000000" else None
         self.account = None
         self.contract = None
+        self.nonce_manager = None
+        if Config.METRICS_ENABLED:
+            self.w3.middleware_onion.add(rpc_metrics_middleware, 'metrics')
+        self.fee_oracle = FeeOracle(self.w3)
+        self._gas_estimates = {}
+        self._gas_estimates_lock = threading.Lock()
+        self._chain_id = None
         
-        if PRIVATE_KEY:
-            self.account = self.w3.eth.account.from_key(PRIVATE_KEY)
+        if private_key:
+            self.account = self.w3.eth.account.from_key(private_key)
+            # A fresh in-process chain makes any stored nonce counter stale
+            self.nonce_manager = NonceManager(
+                self.w3,
+                self.account.address,
+                reset=is_inproc(WEB3_PROVIDER_URI),
+                resync_grace=Config.NONCE_RESYNC_GRACE
+            )
     
     def is_connected(self):
         """Check if connected to blockchain network"""
@@ -29,6 +63,37 @@ class BlockchainUtil:
         """Get current gas price"""
         return self.w3.eth.gas_price
     
+    def get_chain_id(self):
+        """Get the chain id, asked from the node once"""
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+    
+    @staticmethod
+    def _gas_key(function_call):
+        """Key gas estimates by function and by the 32-byte words of its dynamic arguments"""
+        return (function_call.fn_name,) + tuple(
+            -(-len(arg.encode() if isinstance(arg, str) else arg) // 32)
+            for arg in function_call.args if isinstance(arg, (str, bytes))
+        )
+    
+    def estimate_gas(self, function_call):
+        """Get the gas limit of a contract call, estimated once per function and argument size
+        
+        The node's estimate is raised by GAS_ESTIMATE_MARGIN and capped at
+        GAS_LIMIT. Only the first call per key is estimated, so this does
+        not catch later calls that would revert; callers that can revert
+        check with eth_call first.
+        """
+        key = self._gas_key(function_call)
+        gas_limit = self._gas_estimates.get(key)
+        if gas_limit is None:
+            estimate = function_call.estimate_gas({'from': self.account.address})
+            gas_limit = min(math.ceil(estimate * (1 + Config.GAS_ESTIMATE_MARGIN)), Config.GAS_LIMIT)
+            with self._gas_estimates_lock:
+                self._gas_estimates[key] = gas_limit
+        return gas_limit
+    
     def get_account_balance(self, address):
         """Get account balance in Wei"""
         try:
@@ -39,44 +104,235 @@ class BlockchainUtil:
         except Exception as e:
             raise Exception(f"Error getting balance: {str(e)}")
     
-    def send_transaction(self, function_call, gas_limit=3000000):
-        """Send a signed transaction"""
+    def _send_raw_transaction(self, signed_txn):
+        """Broadcast a signed transaction and return its hash
+        
+        A node that already has this exact transaction (a repeated
+        broadcast) rejects it as known, but it is pending all the same.
+        """
+        try:
+            return self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+        except Exception as e:
+            message = str(e).lower()
+            if any(marker in message for marker in KNOWN_TRANSACTION_MARKERS):
+                return Web3.keccak(signed_txn.rawTransaction)
+            raise
+    
+    def _sign_and_send(self, function_call, gas_limit=None, on_signed=None):
+        """Build, sign and broadcast a transaction, returning (tx_hash, nonce)
+        
+        on_signed(tx_hash, nonce) is called between signing and the
+        broadcast, so callers can record the transaction before the node
+        may have it.
+        """
+        if not self.account:
+            raise Exception("No account available for signing")
+        
+        gas_limit = gas_limit or self.estimate_gas(function_call)
+        # One retry after resyncing the nonce if the node rejected ours
+        for attempt in range(2):
+            nonce = self.nonce_manager.allocate()
+            try:
+                tx_dict = function_call.build_transaction({
+                    'from': self.account.address,
+                    'nonce': nonce,
+                    'gas': gas_limit,
+                    'chainId': self.get_chain_id(),
+                    **self.fee_oracle.tx_fields()
+                })
+                
+                signed_txn = self.w3.eth.account.sign_transaction(tx_dict, self.account.key)
+                if on_signed:
+                    on_signed(Web3.keccak(signed_txn.rawTransaction).hex(), nonce)
+            except Exception:
+                # Nothing was broadcast, so the nonce must not stay unused
+                self._release_nonce(nonce)
+                raise
+            try:
+                tx_hash = self._send_raw_transaction(signed_txn)
+            except Exception as e:
+                # Otherwise the node may have the transaction despite the
+                # error, so the nonce stays taken
+                self.nonce_manager.settle()
+                if is_nonce_error(e):
+                    self.nonce_manager.resync()
+                    if attempt == 0:
+                        continue
+                raise
+            self.nonce_manager.settle()
+            return tx_hash, nonce
+    
+    def _release_nonce(self, nonce):
+        """Give back a nonce that was never broadcast, filling it when later ones are already taken"""
+        if self.nonce_manager.release(nonce):
+            return
+        try:
+            self.fill_nonce(nonce)
+        except Exception as e:
+            # The anchor worker's receipt poller fills the gap later
+            print(f"Warning: {str(e)}")
+    
+    def fill_nonce(self, nonce):
+        """Use up a nonce with a zero-value transfer to our own account
+        
+        A nonce that was allocated but never broadcast holds back every
+        later transaction of the account until something is mined with it.
+        """
         try:
             if not self.account:
                 raise Exception("No account available for signing")
-            
-            tx_dict = function_call.build_transaction({
-                'from': self.account.address,
-                'nonce': self.w3.eth.get_transaction_count(self.account.address),
-                'gas': gas_limit,
-                'gasPrice': self.w3.eth.gas_price,
-            })
-            
-            signed_txn = self.w3.eth.account.sign_transaction(tx_dict, PRIVATE_KEY)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
+            signed_txn = self.w3.eth.account.sign_transaction({
+                'to': self.account.address,
+                'value': 0,
+                'gas': 21000,
+                'nonce': nonce,
+                'chainId': self.get_chain_id(),
+                **self.fee_oracle.tx_fields()
+            }, self.account.key)
+            return self._send_raw_transaction(signed_txn).hex()
+        except Exception as e:
+            raise Exception(f"Error filling nonce {nonce}: {str(e)}")
+    
+    def get_pending_nonce(self):
+        """Get the account's next nonce counting the transactions the node can mine next"""
+        return self.w3.eth.get_transaction_count(self.account.address, 'pending')
+    
+    @staticmethod
+    def _format_receipt(receipt):
+        """Reduce a transaction receipt to the fields stored by the backend"""
+        return {
+            'tx_hash': receipt['transactionHash'].hex(),
+            'block_number': receipt['blockNumber'],
+            'gas_used': receipt['gasUsed'],
+            'status': receipt['status']
+        }
+    
+    def send_transaction(self, function_call, gas_limit=None):
+        """Send a signed transaction"""
+        try:
+            tx_hash, _ = self._sign_and_send(function_call, gas_limit)
             receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-            
+            return self._format_receipt(receipt)
+        except Exception as e:
+            raise Exception(f"Error sending transaction: {str(e)}")
+    
+    def submit_transaction(self, function_call, gas_limit=None, on_signed=None):
+        """Send a signed transaction without waiting for it to be mined"""
+        try:
+            tx_hash, nonce = self._sign_and_send(function_call, gas_limit, on_signed)
             return {
-                'tx_hash': receipt['transactionHash'].hex(),
-                'block_number': receipt['blockNumber'],
-                'gas_used': receipt['gasUsed'],
-                'status': receipt['status']
+                'tx_hash': tx_hash.hex(),
+                'nonce': nonce,
+                'block_number': None,
+                'gas_used': None,
+                'status': None
             }
         except Exception as e:
             raise Exception(f"Error sending transaction: {str(e)}")
     
-    def store_credential_hash(self, user_address, credential_hash, credential_type):
-        """Store credential hash on blockchain (requires deployed contract)"""
+    def get_transaction_receipt(self, tx_hash):
+        """Get the receipt of a mined transaction, or None while it is pending"""
+        try:
+            receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+        except Exception as e:
+            raise Exception(f"Error getting transaction receipt: {str(e)}")
+        return self._format_receipt(receipt)
+    
+    def get_transaction_receipts(self, tx_hashes):
+        """Get the receipts of many transactions in JSON-RPC batches ({tx_hash: receipt or None})"""
+        if not hasattr(self.w3.provider, 'make_batch_request'):
+            return {tx_hash: self.get_transaction_receipt(tx_hash) for tx_hash in tx_hashes}
+        try:
+            # Batches bypass the middleware stack, so they are timed here
+            start = time.perf_counter()
+            try:
+                responses = self.w3.provider.make_batch_request(
+                    [('eth_getTransactionReceipt', [tx_hash]) for tx_hash in tx_hashes]
+                )
+            finally:
+                rpc_request_duration.observe(time.perf_counter() - start, 'batch:eth_getTransactionReceipt')
+        except Exception as e:
+            rpc_errors.inc('batch:eth_getTransactionReceipt')
+            print(f"Warning: Batch receipt lookup unavailable, fetching one by one: {str(e)}")
+            return {tx_hash: self.get_transaction_receipt(tx_hash) for tx_hash in tx_hashes}
+        
+        receipts = {}
+        for tx_hash, response in zip(tx_hashes, responses):
+            if 'error' in response:
+                raise Exception(f"Error getting transaction receipt: {response['error'].get('message')}")
+            receipt = response.get('result')
+            receipts[tx_hash] = None if receipt is None else {
+                'tx_hash': receipt['transactionHash'],
+                'block_number': int(receipt['blockNumber'], 16),
+                'gas_used': int(receipt['gasUsed'], 16),
+                'status': int(receipt['status'], 16)
+            }
+        return receipts
+    
+    def bump_transaction(self, tx_hash):
+        """Replace a pending transaction by the same one with higher fees
+        
+        The replacement reuses the nonce, so whichever of the two is mined
+        first settles it; fees are raised by at least FEE_BUMP_PERCENT or to
+        the current estimate, whichever is higher.
+        """
+        try:
+            if not self.account:
+                raise Exception("No account available for signing")
+            tx = self.w3.eth.get_transaction(tx_hash)
+            replacement = {
+                'from': self.account.address,
+                'to': tx['to'],
+                'data': tx['input'],
+                'value': tx['value'],
+                'gas': tx['gas'],
+                'nonce': tx['nonce'],
+                'chainId': self.get_chain_id(),
+                **self.fee_oracle.bumped_fields(tx)
+            }
+            signed_txn = self.w3.eth.account.sign_transaction(replacement, self.account.key)
+            new_tx_hash = self._send_raw_transaction(signed_txn)
+            return {
+                'tx_hash': new_tx_hash.hex(),
+                'nonce': tx['nonce'],
+                'replaces': tx_hash,
+                'block_number': None,
+                'gas_used': None,
+                'status': None
+            }
+        except Exception as e:
+            raise Exception(f"Error bumping transaction: {str(e)}")
+    
+    def is_transaction_known(self, tx_hash):
+        """Check whether the node still knows a transaction (mined or in its mempool)"""
+        try:
+            self.w3.eth.get_transaction(tx_hash)
+            return True
+        except TransactionNotFound:
+            return False
+    
+    def resync_nonce(self):
+        """Resync the local nonce counter with the node"""
+        if self.nonce_manager:
+            return self.nonce_manager.resync()
+        return None
+    
+    def store_credential_hash(self, user_address, credential_hash, credential_type, wait=True, on_signed=None):
+        """Store credential hash on blockchain (requires deployed contract)
+        
+        With wait=False the transaction is only broadcast; the returned
+        status is None until the receipt is fetched with get_transaction_receipt.
+        on_signed is passed to _sign_and_send.
+        """
         try:
             if not self.contract:
                 raise Exception("Smart contract not initialized")
             
             # Convert credential_hash to bytes32 if it's a string
             if isinstance(credential_hash, str):
-                hash_bytes = bytes.fromhex(credential_hash.replace('0x', ''))
-                if len(hash_bytes) < 32:
-                    hash_bytes = hash_bytes + b'\x00' * (32 - len(hash_bytes))
-                credential_hash = hash_bytes[:32]
+                credential_hash = self.to_bytes32(credential_hash)
             
             function_call = self.contract.functions.storeCredential(
                 Web3.to_checksum_address(user_address),
@@ -85,23 +341,91 @@ class BlockchainUtil:
             )
             
             # For Remix VM (no account/private key), simulate transaction
-            if not self.account or not PRIVATE_KEY:
-                # Simulate a successful transaction
-                import random
-                import hashlib
-                simulated_hash = '0x' + hashlib.sha256(str(random.random()).encode()).hexdigest()
-                return {
-                    'tx_hash': simulated_hash,
-                    'block_number': random.randint(1, 1000000),
-                    'gas_used': random.randint(50000, 150000),
-                    'status': 1,
-                    'simulated': True
-                }
+            if not self.account:
+                return self._simulate_transaction()
             
+            # Reverts (a credential that already exists) cost gas on-chain;
+            # the cached gas estimate no longer catches them
+            function_call.call({'from': self.account.address})
+            
+            if not wait:
+                return self.submit_transaction(function_call, on_signed=on_signed)
             return self.send_transaction(function_call)
         except Exception as e:
             raise Exception(f"Error storing credential: {str(e)}")
     
+    def get_credential_owner(self, credential_hash):
+        """Get the address that owns a credential on-chain (the zero address if none)"""
+        try:
+            if not self.contract:
+                raise Exception("Smart contract not initialized")
+            
+            if isinstance(credential_hash, str):
+                credential_hash = self.to_bytes32(credential_hash)
+            return self.contract.functions.getCredentialOwner(credential_hash).call()
+        except Exception as e:
+            raise Exception(f"Error getting credential owner: {str(e)}")
+    
+    def anchor_merkle_root(self, merkle_root, leaf_count, wait=True, on_signed=None):
+        """Anchor the Merkle root of a batch of credential hashes (requires deployed contract)"""
+        try:
+            if not self.contract:
+                raise Exception("Smart contract not initialized")
+            
+            function_call = self.contract.functions.anchorMerkleRoot(
+                self.to_bytes32(merkle_root),
+                leaf_count
+            )
+            
+            if not self.account:
+                return self._simulate_transaction()
+            
+            if not wait:
+                return self.submit_transaction(function_call, on_signed=on_signed)
+            return self.send_transaction(function_call)
+        except Exception as e:
+            raise Exception(f"Error anchoring merkle root: {str(e)}")
+    
+    def get_merkle_root(self, merkle_root):
+        """Get the leaf count and anchoring timestamp of a Merkle root (timestamp 0 if not anchored)"""
+        try:
+            if not self.contract:
+                raise Exception("Smart contract not initialized")
+            
+            leaf_count, timestamp = self.contract.functions.getMerkleRoot(
+                self.to_bytes32(merkle_root)
+            ).call()
+            
+            return {
+                'leaf_count': leaf_count,
+                'timestamp': timestamp,
+                'anchored': timestamp > 0
+            }
+        except Exception as e:
+            raise Exception(f"Error getting merkle root: {str(e)}")
+    
+    @staticmethod
+    def to_bytes32(hex_hash):
+        """Convert a hex hash string to bytes32"""
+        hash_bytes = bytes.fromhex(hex_hash.replace('0x', ''))
+        if len(hash_bytes) < 32:
+            hash_bytes = hash_bytes + b'\x00' * (32 - len(hash_bytes))
+        return hash_bytes[:32]
+    
+    @staticmethod
+    def _simulate_transaction():
+        """Simulate a successful transaction when no signing key is configured"""
+        import random
+        import hashlib
+        simulated_hash = '0x' + hashlib.sha256(str(random.random()).encode()).hexdigest()
+        return {
+            'tx_hash': simulated_hash,
+            'block_number': random.randint(1, 1000000),
+            'gas_used': random.randint(50000, 150000),
+            'status': 1,
+            'simulated': True
+        }
+    
     def verify_credential(self, user_address, credential_hash):
         """Verify credential on blockchain (requires deployed contract)"""
         try:
@@ -117,6 +441,76 @@ class BlockchainUtil:
         except Exception as e:
             raise Exception(f"Error verifying credential: {str(e)}")
     
+    def verify_credentials(self, user_addresses, credential_hashes):
+        """Verify many credentials with a single aggregated contract call
+        
+        Falls back to one verifyCredential call per credential when the
+        deployed contract predates verifyCredentials.
+        """
+        try:
+            if not self.contract:
+                raise Exception("Smart contract not initialized")
+            if not credential_hashes:
+                return []
+            
+            addresses = [Web3.to_checksum_address(address) for address in user_addresses]
+            hashes = [self.to_bytes32(h) if isinstance(h, str) else h for h in credential_hashes]
+            try:
+                return list(self.contract.functions.verifyCredentials(addresses, hashes).call())
+            except Exception as e:
+                print(f"Warning: Aggregated verification unavailable, verifying one by one: {str(e)}")
+                return [
+                    self.contract.functions.verifyCredential(address, credential_hash).call()
+                    for address, credential_hash in zip(addresses, hashes)
+                ]
+        except Exception as e:
+            raise Exception(f"Error verifying credentials: {str(e)}")
+    
+    def get_merkle_roots(self, merkle_roots):
+        """Get many anchored Merkle roots with a single aggregated contract call
+        
+        Returns {root: {'leaf_count', 'timestamp', 'anchored'}}.
+        """
+        try:
+            if not self.contract:
+                raise Exception("Smart contract not initialized")
+            merkle_roots = list(merkle_roots)
+            if not merkle_roots:
+                return {}
+            
+            try:
+                leaf_counts, timestamps = self.contract.functions.getMerkleRoots(
+                    [self.to_bytes32(root) for root in merkle_roots]
+                ).call()
+            except Exception as e:
+                print(f"Warning: Aggregated root lookup unavailable, reading one by one: {str(e)}")
+                return {root: self.get_merkle_root(root) for root in merkle_roots}
+            
+            return {
+                root: {'leaf_count': leaf_count, 'timestamp': timestamp, 'anchored': timestamp > 0}
+                for root, leaf_count, timestamp in zip(merkle_roots, leaf_counts, timestamps)
+            }
+        except Exception as e:
+            raise Exception(f"Error getting merkle roots: {str(e)}")
+    
+    def get_revocation_events(self, from_block, to_block):
+        """Get the CredentialRevoked events emitted in a block range"""
+        try:
+            if not self.contract:
+                raise Exception("Smart contract not initialized")
+    
+            events = self.contract.events.CredentialRevoked.get_logs(fromBlock=from_block, toBlock=to_block)
+            return [
+                {
+                    'user_address': event['args']['userAddress'],
+                    'credential_hash': Web3.to_hex(event['args']['credentialHash'])[2:],
+                    'block_number': event['blockNumber']
+                }
+                for event in events
+            ]
+        except Exception as e:
+            raise Exception(f"Error getting revocation events: {str(e)}")
+    
     def load_contract_abi(self, abi_path):
         """Load contract ABI from JSON file"""
         try:
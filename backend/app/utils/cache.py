@@ -0,0 +1,265 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from app.config import Config
+from app.models.database import verification_cache_collection, cache_invalidations_collection
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a TTL on every entry"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Get a live entry, refreshing its LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Store an entry, evicting the least recently used ones beyond max_size"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove an entry"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Get size and hit ratio"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
+
+
+class MongoCacheTier:
+    """Cache tier shared by all processes, stored in MongoDB with a TTL index"""
+
+    def __init__(self, collection, ttl):
+        self.collection = collection
+        self.ttl = ttl
+
+    def get(self, key):
+        entry = self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        return entry["value"] if entry else None
+
+    def set(self, key, value):
+        self.collection.update_one(
+            {"_id": key},
+            {"$set": {"value": value, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)}},
+            upsert=True
+        )
+
+    def delete_many(self, keys):
+        self.collection.delete_many({"_id": {"$in": list(keys)}})
+
+
+class VerificationCache:
+    """Read-through cache of verification results keyed by credential hash
+
+    Lookups hit the in-process LRU first and then the optional shared tier.
+    Entries are dropped when a credential is revoked, either through
+    Credential.revoke_credential (broadcast to other processes via the
+    cache_invalidations collection) or by a CredentialRevoked event on-chain.
+
+    A result computed from a read that started before an invalidation must
+    not be cached, so callers take read_started() before reading the
+    credential and pass it to set().
+    """
+
+    KINDS = ('verify', 'proof')
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+        self._watcher = None
+        self._stop_event = threading.Event()
+        self._invalidations_since = None
+        self._seen_invalidations = {}  # _id -> created_at of invalidations inside the overlap window
+        self._evicted_at = {}  # credential hash -> when this process last evicted it
+        self._lock = threading.Lock()
+        self._last_block = None
+
+    @staticmethod
+    def _key(kind, credential_hash):
+        return f"{kind}:{credential_hash}"
+
+    def get(self, kind, credential_hash):
+        """Get a cached result, promoting shared-tier hits into the local tier"""
+        key = self._key(kind, credential_hash)
+        value = self.local.get(key)
+        if value is None and self.shared:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    @staticmethod
+    def read_started():
+        """Mark the start of a read whose result will be passed to set()"""
+        return datetime.utcnow()
+
+    def set(self, kind, credential_hash, value, read_at=None):
+        """Cache a result in every tier, unless it was invalidated since read_at
+
+        Returns whether the result was cached.
+        """
+        key = self._key(kind, credential_hash)
+        with self._lock:
+            evicted_at = self._evicted_at.get(credential_hash)
+            if read_at is not None and evicted_at is not None and evicted_at >= read_at:
+                return False
+            self.local.set(key, value)
+        if self.shared:
+            self.shared.set(key, value)
+            # Another process may have cleared the shared tier just before
+            # this write; invalidate() records before it evicts, so checking
+            # after the write cannot miss it
+            if read_at is not None and self._invalidated_since(credential_hash, read_at):
+                self._evict(credential_hash)
+                return False
+        return True
+
+    @staticmethod
+    def _invalidated_since(credential_hash, read_at):
+        # Other processes stamp invalidations with their own clocks
+        since = read_at - timedelta(seconds=Config.VERIFICATION_CACHE_WATCH_OVERLAP)
+        return cache_invalidations_collection.find_one(
+            {"credential_hash": credential_hash, "created_at": {"$gte": since}},
+            {"_id": 1}
+        ) is not None
+
+    def _evict_local(self, credential_hash):
+        with self._lock:
+            self._evicted_at[credential_hash] = datetime.utcnow()
+            for kind in self.KINDS:
+                self.local.delete(self._key(kind, credential_hash))
+
+    def _evict(self, credential_hash):
+        self._evict_local(credential_hash)
+        if self.shared:
+            self.shared.delete_many([self._key(kind, credential_hash) for kind in self.KINDS])
+
+    def invalidate(self, credential_hash):
+        """Drop a credential's results here and tell the other processes to do the same"""
+        cache_invalidations_collection.insert_one({
+            "credential_hash": credential_hash,
+            "created_at": datetime.utcnow()
+        })
+        self._evict(credential_hash)
+
+    def start_watcher(self, interval=None):
+        """Start polling for invalidations from other processes and revocations on-chain"""
+        if self._watcher:
+            return
+        interval = interval or Config.VERIFICATION_CACHE_WATCH_INTERVAL
+        self._invalidations_since = datetime.utcnow()
+        self._seen_invalidations = {}
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=self._watch_loop, args=(interval,), daemon=True, name='cache-invalidation')
+        self._watcher.start()
+
+    def stop_watcher(self):
+        """Stop the invalidation watcher"""
+        self._stop_event.set()
+        if self._watcher:
+            self._watcher.join()
+        self._watcher = None
+
+    def _watch_loop(self, interval):
+        while not self._stop_event.is_set():
+            try:
+                self.poll_invalidations()
+                self.poll_revocation_events()
+            except Exception as e:
+                print(f"Warning: Cache invalidation watcher error: {str(e)}")
+            self._stop_event.wait(interval)
+
+    def poll_invalidations(self, overlap=None):
+        """Apply invalidations broadcast by other processes
+
+        Each poll re-reads the invalidations created in the last `overlap`
+        seconds before the previous one, since other processes stamp them
+        with their own clocks and may commit them late; ids already applied
+        are skipped.
+        """
+        overlap = timedelta(seconds=Config.VERIFICATION_CACHE_WATCH_OVERLAP if overlap is None else overlap)
+        polled_at = datetime.utcnow()
+        since = (self._invalidations_since or polled_at) - overlap
+        for entry in cache_invalidations_collection.find({"created_at": {"$gte": since}}):
+            if entry["_id"] in self._seen_invalidations:
+                continue
+            self._evict_local(entry["credential_hash"])
+            self._seen_invalidations[entry["_id"]] = entry["created_at"]
+
+        self._invalidations_since = polled_at
+        cutoff = polled_at - overlap
+        self._seen_invalidations = {
+            invalidation_id: created_at
+            for invalidation_id, created_at in self._seen_invalidations.items() if created_at >= cutoff
+        }
+        # No request still in progress started before these evictions
+        eviction_cutoff = polled_at - timedelta(seconds=Config.VERIFICATION_CACHE_TTL)
+        with self._lock:
+            self._evicted_at = {
+                credential_hash: evicted_at
+                for credential_hash, evicted_at in self._evicted_at.items() if evicted_at >= eviction_cutoff
+            }
+
+    def poll_revocation_events(self):
+        """Evict credentials revoked on-chain since the last poll"""
+        from .blockchain import blockchain
+        if not blockchain.contract:
+            return
+
+        latest_block = blockchain.w3.eth.block_number
+        if self._last_block is None:
+            self._last_block = latest_block
+            return
+        if latest_block <= self._last_block:
+            return
+
+        for event in blockchain.get_revocation_events(self._last_block + 1, latest_block):
+            self._evict(event['credential_hash'])
+        self._last_block = latest_block
+
+    def stats(self):
+        """Get local tier statistics"""
+        return self.local.stats()
+
+
+# Create singleton instance
+verification_cache = VerificationCache(
+    LRUCache(Config.VERIFICATION_CACHE_SIZE, Config.VERIFICATION_CACHE_TTL),
+    MongoCacheTier(verification_cache_collection, Config.VERIFICATION_CACHE_TTL) if Config.VERIFICATION_CACHE_SHARED else None
+)
@@ -0,0 +1,100 @@
+import unicodedata
+from decimal import Decimal
+from json.encoder import encode_basestring
+
+# Credential hash schemes, stored on each credential as hash_scheme
+HASH_SCHEME = 'jcs-sha256'  # SHA-256 of the canonical JSON below
+LEGACY_HASH_SCHEME = 'repr-sha256'  # SHA-256 of str(credential_data), credentials without hash_scheme
+FILE_HASH_SCHEME = 'sha256'  # SHA-256 of an uploaded file's bytes
+
+MAX_SAFE_INTEGER = 2 ** 53
+
+
+def _float(value):
+    """Serialize a float the way ECMAScript's Number.prototype.toString does (RFC 8785 3.2.2.3)"""
+    if value == 0:
+        return '0'  # including -0
+    text = repr(value)
+    # repr and ECMAScript agree on plain decimals, up to the trailing ".0"
+    if 'e' not in text and text not in ('nan', 'inf', '-inf'):
+        return text[:-2] if text.endswith('.0') else text
+    if value != value or value in (float('inf'), float('-inf')):
+        raise ValueError("NaN and Infinity are not valid JSON numbers")
+
+    # repr gives the shortest digits that round-trip, as ECMAScript requires
+    _, digits, exponent = Decimal(repr(abs(value))).as_tuple()
+    point = len(digits) + exponent  # value is 0.<digits> * 10**point
+    digits = ''.join(map(str, digits)).rstrip('0')
+    prefix = '-' if value < 0 else ''
+
+    if len(digits) <= point <= 21:
+        return prefix + digits + '0' * (point - len(digits))
+    if -6 < point <= 0:
+        return prefix + '0.' + '0' * -point + digits
+    mantissa = digits[0] + ('.' + digits[1:] if len(digits) > 1 else '')
+    return f"{prefix}{mantissa}e{'+' if point > 0 else '-'}{abs(point - 1)}"
+
+
+def _int(value):
+    if -MAX_SAFE_INTEGER <= value <= MAX_SAFE_INTEGER:
+        return str(value)
+    raise ValueError(f"Integer {value} cannot be represented exactly in canonical JSON")
+
+
+def _string(value):
+    if not value.isascii() and not unicodedata.is_normalized('NFC', value):
+        value = unicodedata.normalize('NFC', value)
+    # Escapes only quotes, backslashes and control characters, as RFC 8785 requires
+    return encode_basestring(value)
+
+
+def _list(value):
+    return '[' + ','.join([_serialize(item) for item in value]) + ']'
+
+
+def _dict(value):
+    members = {}
+    for key, item in value.items():
+        if type(key) is not str:
+            raise ValueError(f"Object keys must be strings, got {type(key).__name__}")
+        if not key.isascii():
+            key = unicodedata.normalize('NFC', key)
+        if key in members:
+            raise ValueError(f"Duplicate key {key!r} after Unicode normalization")
+        members[key] = item
+    keys = sorted(members)
+    # RFC 8785 orders members by UTF-16 code units, which only differs from
+    # code point order for characters outside the Basic Multilingual Plane
+    if any(not key.isascii() and max(key) > '\uffff' for key in keys):
+        keys.sort(key=lambda k: k.encode('utf-16-be'))
+    return '{' + ','.join([encode_basestring(key) + ':' + _serialize(members[key]) for key in keys]) + '}'
+
+
+_SERIALIZERS = {
+    str: _string,
+    int: _int,
+    float: _float,
+    bool: lambda value: 'true' if value else 'false',
+    type(None): lambda value: 'null',
+    list: _list,
+    tuple: _list,
+    dict: _dict
+}
+
+
+def _serialize(value):
+    serializer = _SERIALIZERS.get(type(value))
+    if serializer is None:
+        raise ValueError(f"{type(value).__name__} is not JSON serializable")
+    return serializer(value)
+
+
+def canonicalize(value):
+    """Serialize JSON data to canonical UTF-8 bytes
+
+    Follows the JSON Canonicalization Scheme (RFC 8785): no whitespace,
+    object members sorted by key, ECMAScript number formatting and minimal
+    string escaping. Strings and keys are also NFC-normalized so equivalent
+    text from different clients hashes the same.
+    """
+    return _serialize(value).encode('utf-8')
@@ -35,6 +35,62 @@ CONTRACT_ABI = [
         "outputs": [],
         "stateMutability": "nonpayable",
         "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "bytes32", "name": "_merkleRoot", "type": "bytes32"},
+            {"internalType": "uint256", "name": "_leafCount", "type": "uint256"}
+        ],
+        "name": "anchorMerkleRoot",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "bytes32", "name": "_merkleRoot", "type": "bytes32"}
+        ],
+        "name": "getMerkleRoot",
+        "outputs": [
+            {"internalType": "uint256", "name": "", "type": "uint256"},
+            {"internalType": "uint256", "name": "", "type": "uint256"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "bytes32", "name": "_merkleRoot", "type": "bytes32"},
+            {"internalType": "bytes32", "name": "_leaf", "type": "bytes32"},
+            {"internalType": "bytes32[]", "name": "_proof", "type": "bytes32[]"},
+            {"internalType": "uint256", "name": "_pathBits", "type": "uint256"}
+        ],
+        "name": "verifyMerkleProof",
+        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "address[]", "name": "_userAddresses", "type": "address[]"},
+            {"internalType": "bytes32[]", "name": "_credentialHashes", "type": "bytes32[]"}
+        ],
+        "name": "verifyCredentials",
+        "outputs": [{"internalType": "bool[]", "name": "", "type": "bool[]"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "bytes32[]", "name": "_merkleRoots", "type": "bytes32[]"}
+        ],
+        "name": "getMerkleRoots",
+        "outputs": [
+            {"internalType": "uint256[]", "name": "", "type": "uint256[]"},
+            {"internalType": "uint256[]", "name": "", "type": "uint256[]"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
     }
 ]
 
@@ -69,6 +125,13 @@ contract IdentityVerification {
     mapping(address => UserCredentials) public users;
     mapping(bytes32 => address) public credentialToUser;
     
+    struct MerkleBatch {
+        uint256 leafCount;
+        uint256 timestamp;
+    }
+    
+    mapping(bytes32 => MerkleBatch) public merkleRoots;
+    
     address public owner;
     uint256 public totalCredentials;
     
@@ -86,6 +149,17 @@ contract IdentityVerification {
         uint256 timestamp
     );
     
+    event MerkleRootAnchored(
+        bytes32 indexed merkleRoot,
+        uint256 leafCount,
+        uint256 timestamp
+    );
+    
+    modifier onlyOwner() {
+        require(msg.sender == owner, "Only owner can call this function");
+        _;
+    }
+    
     // Constructor
     constructor() {
         owner = msg.sender;
@@ -131,6 +205,20 @@ contract IdentityVerification {
         return cred.isActive && cred.credentialHash == _credentialHash;
     }
     
+    function verifyCredentials(address[] memory _userAddresses, bytes32[] memory _credentialHashes)
+        public
+        view
+        returns (bool[] memory)
+    {
+        require(_userAddresses.length == _credentialHashes.length, "Length mismatch");
+        
+        bool[] memory results = new bool[](_credentialHashes.length);
+        for (uint256 i = 0; i < _credentialHashes.length; i++) {
+            results[i] = verifyCredential(_userAddresses[i], _credentialHashes[i]);
+        }
+        return results;
+    }
+    
     function revokeCredential(address _userAddress, bytes32 _credentialHash)
         public
     {
@@ -142,6 +230,56 @@ contract IdentityVerification {
         emit CredentialRevoked(_userAddress, _credentialHash, block.timestamp);
     }
     
+    function anchorMerkleRoot(bytes32 _merkleRoot, uint256 _leafCount) public onlyOwner {
+        require(_merkleRoot != bytes32(0), "Invalid merkle root");
+        require(merkleRoots[_merkleRoot].timestamp == 0, "Merkle root already anchored");
+        
+        merkleRoots[_merkleRoot] = MerkleBatch({leafCount: _leafCount, timestamp: block.timestamp});
+        
+        emit MerkleRootAnchored(_merkleRoot, _leafCount, block.timestamp);
+    }
+    
+    function getMerkleRoot(bytes32 _merkleRoot) public view returns (uint256, uint256) {
+        MerkleBatch storage batch = merkleRoots[_merkleRoot];
+        return (batch.leafCount, batch.timestamp);
+    }
+    
+    function getMerkleRoots(bytes32[] memory _merkleRoots)
+        public
+        view
+        returns (uint256[] memory, uint256[] memory)
+    {
+        uint256[] memory leafCounts = new uint256[](_merkleRoots.length);
+        uint256[] memory timestamps = new uint256[](_merkleRoots.length);
+        for (uint256 i = 0; i < _merkleRoots.length; i++) {
+            leafCounts[i] = merkleRoots[_merkleRoots[i]].leafCount;
+            timestamps[i] = merkleRoots[_merkleRoots[i]].timestamp;
+        }
+        return (leafCounts, timestamps);
+    }
+    
+    function verifyMerkleProof(
+        bytes32 _merkleRoot,
+        bytes32 _leaf,
+        bytes32[] memory _proof,
+        uint256 _pathBits
+    ) public view returns (bool) {
+        if (merkleRoots[_merkleRoot].timestamp == 0) {
+            return false;
+        }
+        
+        // RFC 6962 domain separation: 0x00 prefixes the leaf, 0x01 every parent
+        bytes32 node = sha256(abi.encodePacked(bytes1(0x00), _leaf));
+        for (uint256 i = 0; i < _proof.length; i++) {
+            if ((_pathBits >> i) & 1 == 1) {
+                node = sha256(abi.encodePacked(bytes1(0x01), _proof[i], node));
+            } else {
+                node = sha256(abi.encodePacked(bytes1(0x01), node, _proof[i]));
+            }
+        }
+        return node == _merkleRoot;
+    }
+    
     function getTotalCredentials() public view returns (uint256) {
         return totalCredentials;
     }
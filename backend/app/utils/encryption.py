@@ -3,6 +3,8 @@ import secrets
 from cryptography.fernet import Fernet
 import os
 from dotenv import load_dotenv
+from .merkle import MerkleTree, verify_proof, MERKLE_SCHEME
+from .canonical import canonicalize, HASH_SCHEME, LEGACY_HASH_SCHEME
 
 load_dotenv()
 
@@ -45,25 +47,63 @@ class HashUtil:
     """Utilities for generating hashes for blockchain"""
     
     @staticmethod
-    def hash_credential(credential_data):
-        """Create a hash of credential data for blockchain storage"""
-        data_str = str(credential_data)
-        return hashlib.sha256(data_str.encode()).hexdigest()
+    def hash_credential(credential_data, scheme=HASH_SCHEME):
+        """Create a hash of credential data for blockchain storage
+        
+        New credentials hash their canonical JSON; LEGACY_HASH_SCHEME
+        reproduces the str() hashes of credentials created before it.
+        """
+        if scheme == LEGACY_HASH_SCHEME:
+            return hashlib.sha256(str(credential_data).encode()).hexdigest()
+        if scheme != HASH_SCHEME:
+            raise ValueError(f"Unknown hash scheme {scheme}")
+        return HashUtil.hash_canonical(canonicalize(credential_data))
+    
+    @staticmethod
+    def hash_canonical(canonical_data):
+        """Hash credential data already serialized by canonicalize()"""
+        return hashlib.sha256(canonical_data).hexdigest()
     
     @staticmethod
     def create_merkle_hash(hashes_list):
         """Create a Merkle root hash from a list of hashes"""
+        leaves = [bytes.fromhex(h.replace('0x', '')) for h in hashes_list]
+        return MerkleTree(leaves).root().hex()
+    
+    @staticmethod
+    def create_merkle_proofs(hashes_list):
+        """Create a Merkle root and an inclusion proof for every hash
+        
+        Each proof lists the sibling hashes from the leaf up to the root as
+        {'hash': ..., 'position': 'left'|'right'}; see app.utils.merkle for
+        the tree layout.
+        """
         if not hashes_list:
-            return hashlib.sha256(b"").hexdigest()
+            raise ValueError("Cannot build a Merkle tree without leaves")
         
-        while len(hashes_list) > 1:
-            new_hashes = []
-            for i in range(0, len(hashes_list), 2):
-                if i + 1 < len(hashes_list):
-                    combined = hashes_list[i] + hashes_list[i + 1]
-                else:
-                    combined = hashes_list[i] + hashes_list[i]
-                new_hashes.append(hashlib.sha256(combined.encode()).hexdigest())
-            hashes_list = new_hashes
+        tree = MerkleTree([bytes.fromhex(h.replace('0x', '')) for h in hashes_list])
+        proofs = []
+        for index in range(len(tree)):
+            siblings, path_bits = tree.proof(index)
+            proofs.append([
+                {'hash': sibling.hex(), 'position': 'left' if (path_bits >> i) & 1 else 'right'}
+                for i, sibling in enumerate(siblings)
+            ])
+        return tree.root().hex(), proofs
+    
+    @staticmethod
+    def verify_merkle_proof(leaf_hash, proof, merkle_root, scheme=MERKLE_SCHEME):
+        """Check that a proof from create_merkle_proofs leads from the leaf to the root
         
-        return hashes_list[0]
+        Proofs stored without a scheme were built before domain separation
+        and are checked with LEGACY_MERKLE_SCHEME.
+        """
+        siblings = [bytes.fromhex(step['hash'].replace('0x', '')) for step in proof]
+        path_bits = sum(1 << i for i, step in enumerate(proof) if step['position'] == 'left')
+        return verify_proof(
+            bytes.fromhex(leaf_hash.replace('0x', '')),
+            siblings,
+            path_bits,
+            bytes.fromhex(merkle_root.replace('0x', '')),
+            scheme
+        )
@@ -0,0 +1,178 @@
+import base64
+import hashlib
+import os
+from bson.objectid import ObjectId
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from app.config import Config
+from app.models.keys import DataKey
+from .cache import LRUCache
+from .encryption import EncryptionUtil
+
+SCHEME = 'aes-256-gcm'
+STREAM_SCHEME = 'aes-256-gcm-segmented'
+NONCE_SIZE = 12
+NONCE_PREFIX_SIZE = 7
+TAG_SIZE = 16
+# Publicly known, so it protects nothing; only used in development without MASTER_KEYS
+DEV_MASTER_KEY_ID = 'dev-insecure'
+DEV_MASTER_KEY = hashlib.sha256(b'identity-verification development master key').digest()
+
+
+def _load_master_keys():
+    """Decode the configured master keys ({id: base64 32-byte key})
+
+    Without MASTER_KEYS the process refuses to start, unless
+    ALLOW_DEV_MASTER_KEY=true or FLASK_ENV=development selects the
+    development key.
+    """
+    master_keys = {key_id: base64.b64decode(key) for key_id, key in Config.MASTER_KEYS.items()}
+    if master_keys:
+        return master_keys
+    if not (Config.ALLOW_DEV_MASTER_KEY or os.getenv('FLASK_ENV') == 'development'):
+        raise Exception("MASTER_KEYS not configured; set MASTER_KEYS and MASTER_KEY_ID (or ALLOW_DEV_MASTER_KEY=true in development)")
+    print("Warning: MASTER_KEYS not configured, using the publicly known development master key")
+    return {DEV_MASTER_KEY_ID: DEV_MASTER_KEY}
+
+
+class SegmentCipher:
+    """Segmented AES-GCM for data too large to encrypt in one call
+
+    Every segment is sealed on its own under a nonce made of a random
+    per-stream prefix, the segment index and a last-segment flag, so
+    segments cannot be reordered, dropped or truncated without failing
+    authentication, and only one segment needs to be in memory at a time.
+    """
+
+    def __init__(self, cipher, nonce_prefix, associated_data):
+        self.cipher = cipher
+        self.nonce_prefix = nonce_prefix
+        self.associated_data = associated_data
+
+    def _nonce(self, index, last):
+        return self.nonce_prefix + index.to_bytes(4, 'big') + (b'\x01' if last else b'\x00')
+
+    def encrypt(self, index, segment, last):
+        """Seal one plaintext segment"""
+        return self.cipher.encrypt(self._nonce(index, last), segment, self.associated_data)
+
+    def decrypt(self, index, segment, last):
+        """Open one sealed segment"""
+        return self.cipher.decrypt(self._nonce(index, last), segment, self.associated_data)
+
+
+class EnvelopeEncryption:
+    """Envelope encryption of credential data
+
+    Every user has one random 256-bit data key, stored in data_keys wrapped
+    by the active master key with AES-GCM; credential documents only carry
+    the data key id next to their AES-GCM ciphertext. Unwrapped data keys
+    are kept in a bounded LRU as ready-to-use ciphers, so repeated encrypts
+    and decrypts skip both the key lookup and the key setup.
+    """
+
+    def __init__(self, master_keys=None, active_master_key_id=None, cache_size=None, cache_ttl=None):
+        master_keys = master_keys or _load_master_keys()
+        self.active_master_key_id = active_master_key_id or Config.MASTER_KEY_ID or next(iter(master_keys))
+        if self.active_master_key_id not in master_keys:
+            raise Exception(f"Master key {self.active_master_key_id} not configured")
+        self._master_ciphers = {key_id: AESGCM(key) for key_id, key in master_keys.items()}
+        self._ciphers = LRUCache(cache_size or Config.DATA_KEY_CACHE_SIZE, cache_ttl or Config.DATA_KEY_CACHE_TTL)
+        self._user_keys = LRUCache(cache_size or Config.DATA_KEY_CACHE_SIZE, cache_ttl or Config.DATA_KEY_CACHE_TTL)
+
+    def _wrap(self, key_id, data_key):
+        """Encrypt a data key under the active master key, bound to its key id"""
+        nonce = os.urandom(NONCE_SIZE)
+        return nonce + self._master_ciphers[self.active_master_key_id].encrypt(nonce, data_key, key_id.encode())
+
+    def _unwrap(self, key_doc):
+        """Decrypt a stored data key with the master key that wrapped it"""
+        master_cipher = self._master_ciphers.get(key_doc['master_key_id'])
+        if master_cipher is None:
+            raise Exception(f"Master key {key_doc['master_key_id']} not configured")
+        wrapped_key = bytes(key_doc['wrapped_key'])
+        return master_cipher.decrypt(wrapped_key[:NONCE_SIZE], wrapped_key[NONCE_SIZE:], str(key_doc['_id']).encode())
+
+    def _cipher(self, key_doc):
+        key_id = str(key_doc['_id'])
+        cipher = self._ciphers.get(key_id)
+        if cipher is None:
+            cipher = AESGCM(self._unwrap(key_doc))
+            self._ciphers.set(key_id, cipher)
+        return cipher
+
+    def _user_cipher(self, user_id):
+        """Get (key id, cipher) of a user's data key, creating the key on first use"""
+        key_id = self._user_keys.get(user_id)
+        cipher = self._ciphers.get(key_id) if key_id else None
+        if cipher is not None:
+            return key_id, cipher
+
+        key_doc = DataKey.get_user_key(user_id)
+        if key_doc is None:
+            key_id = str(ObjectId())
+            key_doc = DataKey.create_user_key(user_id, key_id, self._wrap(key_id, AESGCM.generate_key(256)), self.active_master_key_id)
+        self._user_keys.set(user_id, str(key_doc['_id']))
+        return str(key_doc['_id']), self._cipher(key_doc)
+
+    def _key_cipher(self, key_id):
+        cipher = self._ciphers.get(key_id)
+        if cipher is not None:
+            return cipher
+        key_doc = DataKey.get_key(key_id)
+        if key_doc is None:
+            raise Exception("Data key not found")
+        return self._cipher(key_doc)
+
+    def encrypt(self, user_id, data):
+        """Encrypt data for a user; returns the fields stored as the credential's data"""
+        key_id, cipher = self._user_cipher(str(user_id))
+        nonce = os.urandom(NONCE_SIZE)
+        ciphertext = cipher.encrypt(nonce, data.encode() if isinstance(data, str) else data, str(user_id).encode())
+        return {
+            'encrypted_data': base64.b64encode(nonce + ciphertext).decode(),
+            'scheme': SCHEME,
+            'key_id': key_id
+        }
+
+    def decrypt(self, user_id, data):
+        """Decrypt a credential's data, including documents that still carry their own Fernet key"""
+        if data.get('scheme') != SCHEME:
+            return EncryptionUtil.decrypt_data(data['encrypted_data'], data['encryption_key'])
+        encrypted = base64.b64decode(data['encrypted_data'])
+        cipher = self._key_cipher(data['key_id'])
+        return cipher.decrypt(encrypted[:NONCE_SIZE], encrypted[NONCE_SIZE:], str(user_id).encode()).decode()
+
+    def stream_cipher(self, user_id):
+        """Get (key id, nonce prefix, SegmentCipher) to encrypt a new stream for a user"""
+        key_id, cipher = self._user_cipher(str(user_id))
+        nonce_prefix = os.urandom(NONCE_PREFIX_SIZE)
+        return key_id, nonce_prefix, SegmentCipher(cipher, nonce_prefix, str(user_id).encode())
+
+    def open_stream_cipher(self, user_id, key_id, nonce_prefix):
+        """Get the SegmentCipher that decrypts a stream encrypted by stream_cipher"""
+        return SegmentCipher(self._key_cipher(key_id), bytes(nonce_prefix), str(user_id).encode())
+
+    def rewrap_keys(self, batch_size=1000):
+        """Re-wrap every data key under the active master key; returns how many were re-wrapped
+
+        Only the wrapped data keys change, so no credential needs to be
+        re-encrypted; once this returns, retired master keys can be removed
+        from MASTER_KEYS.
+        """
+        total = 0
+        while True:
+            key_docs = DataKey.get_keys_not_wrapped_by(self.active_master_key_id, batch_size)
+            if not key_docs:
+                return total
+            total += DataKey.set_wrapped_keys([
+                (str(key_doc['_id']), key_doc['master_key_id'], self._wrap(str(key_doc['_id']), self._unwrap(key_doc)))
+                for key_doc in key_docs
+            ], self.active_master_key_id)
+
+    def stats(self):
+        """Get the unwrapped data key cache statistics"""
+        return self._ciphers.stats()
+
+
+# Create singleton instance
+envelope = EnvelopeEncryption()
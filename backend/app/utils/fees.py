@@ -0,0 +1,90 @@
+import math
+import statistics
+import threading
+import time
+from app.config import Config
+
+
+class FeeOracle:
+    """EIP-1559 fee estimates for outgoing transactions
+
+    One eth_feeHistory call gives the next block's base fee and the
+    priority fees recently paid; the result is cached for
+    GAS_PRICE_CACHE_TTL seconds (about one block), so a burst of
+    submissions costs a single RPC. Nodes without eth_feeHistory are priced
+    from the latest block's base fee, and nodes without EIP-1559 support
+    fall back to a cached legacy gas price.
+    """
+
+    def __init__(self, w3, ttl=None, history_blocks=None, percentile=None, min_priority_fee=None, bump_percent=None):
+        self.w3 = w3
+        self.ttl = ttl if ttl is not None else Config.GAS_PRICE_CACHE_TTL
+        self.history_blocks = history_blocks or Config.FEE_HISTORY_BLOCKS
+        self.percentile = percentile if percentile is not None else Config.FEE_PRIORITY_PERCENTILE
+        self.min_priority_fee = min_priority_fee if min_priority_fee is not None else Config.FEE_MIN_PRIORITY_FEE
+        self.bump_percent = bump_percent if bump_percent is not None else Config.FEE_BUMP_PERCENT
+        self._fees = None
+        self._expires = 0
+        self._lock = threading.Lock()
+
+    def _fetch(self):
+        try:
+            history = self.w3.eth.fee_history(self.history_blocks, 'latest', [self.percentile])
+            base_fee = history['baseFeePerGas'][-1]  # the next block's
+            block = history['oldestBlock'] + len(history['baseFeePerGas']) - 1
+            rewards = [reward[0] for reward in history.get('reward') or [] if reward]
+        except Exception:
+            # Nodes without eth_feeHistory: the latest block still carries the base fee
+            latest = self.w3.eth.get_block('latest')
+            base_fee = latest.get('baseFeePerGas')
+            block = latest['number']
+            rewards = []
+        if not base_fee:
+            return {'type2': False, 'gas_price': self.w3.eth.gas_price}
+
+        priority_fee = max(self.min_priority_fee, int(statistics.median(rewards)) if rewards else 0)
+        return {
+            'type2': True,
+            'base_fee': base_fee,
+            'max_priority_fee_per_gas': priority_fee,
+            # Room for the base fee to rise for a few full blocks before the transaction is priced out
+            'max_fee_per_gas': 2 * base_fee + priority_fee,
+            'block': block
+        }
+
+    def get_fees(self):
+        """Get the current fee estimate, refreshed at most once per GAS_PRICE_CACHE_TTL"""
+        with self._lock:
+            if self._fees is None or time.monotonic() >= self._expires:
+                self._fees = self._fetch()
+                self._expires = time.monotonic() + self.ttl
+            return self._fees
+
+    def tx_fields(self):
+        """Get the fee fields of a new transaction"""
+        fees = self.get_fees()
+        if not fees['type2']:
+            return {'gasPrice': fees['gas_price']}
+        return {
+            'maxFeePerGas': fees['max_fee_per_gas'],
+            'maxPriorityFeePerGas': fees['max_priority_fee_per_gas']
+        }
+
+    def _bump(self, old_fee, current_fee):
+        # Nodes only accept a replacement that raises every fee by their minimum bump
+        return max(current_fee, math.ceil(old_fee * (100 + self.bump_percent) / 100))
+
+    def bumped_fields(self, tx):
+        """Get fee fields for a transaction replacing tx (as returned by eth_getTransactionByHash)"""
+        fields = self.tx_fields()
+        if 'maxFeePerGas' in tx:
+            old_max_fee, old_priority_fee = tx['maxFeePerGas'], tx['maxPriorityFeePerGas']
+        else:
+            old_max_fee = old_priority_fee = tx['gasPrice']
+        if 'gasPrice' in fields:
+            return {'gasPrice': self._bump(old_max_fee, fields['gasPrice'])}
+        priority_fee = self._bump(old_priority_fee, fields['maxPriorityFeePerGas'])
+        return {
+            'maxFeePerGas': max(self._bump(old_max_fee, fields['maxFeePerGas']), priority_fee),
+            'maxPriorityFeePerGas': priority_fee
+        }
@@ -0,0 +1,175 @@
+import re
+import threading
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+from app.config import Config
+from app.models.onchain import OnchainIndex
+from .blockchain import blockchain
+
+INDEXED_EVENTS = ('CredentialStored', 'CredentialRevoked', 'CredentialVerified', 'MerkleRootAnchored')
+
+# Node error messages that mean an eth_getLogs range or its result is over the node's limit
+RANGE_ERROR_MARKERS = (
+    'query returned more than',
+    'response size exceeded',
+    'response size should not',
+    'exceeds max results',
+    'too many results',
+    'too many blocks',
+    'block range',
+    'range too large',
+    'range is too large',
+    'is limited to',
+)
+
+
+def _snake_case(name):
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', name).lower()
+
+
+def is_range_error(error):
+    """Check whether eth_getLogs failed because the range was too large"""
+    message = str(error).lower()
+    return any(marker in message for marker in RANGE_ERROR_MARKERS)
+
+
+def _normalize_value(value):
+    """Store bytes32 values as hex without 0x, like Credential.blockchain_hash"""
+    if isinstance(value, (bytes, bytearray)):
+        return Web3.to_hex(value)[2:]
+    return value
+
+
+class ContractIndexer:
+    """Mirrors the contract's events into MongoDB
+
+    Pages through eth_getLogs for the contract address, one request per
+    block range, and checkpoints the last indexed block and its hash.
+    Only blocks at least INDEXER_CONFIRMATIONS deep are indexed; if the
+    checkpointed block has nonetheless been replaced by a reorg, the last
+    INDEXER_REORG_REWIND blocks are rolled back and indexed again.
+    """
+
+    def __init__(self, confirmations=None, page_size=None, poll_interval=None, start_block=None):
+        self.confirmations = Config.INDEXER_CONFIRMATIONS if confirmations is None else confirmations
+        self.page_size = page_size or Config.INDEXER_PAGE_SIZE
+        self.poll_interval = poll_interval or Config.INDEXER_POLL_INTERVAL
+        self.start_block = Config.INDEXER_START_BLOCK if start_block is None else start_block
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._events = None
+
+    def start(self):
+        """Start indexing in a background thread"""
+        if self._thread:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name='contract-indexer')
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the background thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                # Catch up completely before sleeping again
+                while not self._stop_event.is_set() and self.run_once():
+                    pass
+            except Exception as e:
+                print(f"Warning: Contract indexer error: {str(e)}")
+            self._stop_event.wait(self.poll_interval)
+
+    def _event_types(self):
+        """Map each indexed event's topic to its contract event"""
+        if self._events is None:
+            self._events = {
+                event_abi_to_log_topic(abi): getattr(blockchain.contract.events, abi['name'])()
+                for abi in blockchain.contract.abi
+                if abi.get('type') == 'event' and abi['name'] in INDEXED_EVENTS
+            }
+        return self._events
+
+    def fetch_events(self, from_block, to_block):
+        """Get the decoded contract events of a block range with a single eth_getLogs call"""
+        event_types = self._event_types()
+        logs = blockchain.w3.eth.get_logs({
+            'address': blockchain.contract.address,
+            'fromBlock': from_block,
+            'toBlock': to_block
+        })
+
+        events = []
+        for log in logs:
+            event_type = event_types.get(bytes(log['topics'][0])) if log['topics'] else None
+            if event_type is None:
+                continue
+            event = event_type.process_log(log)
+            events.append({
+                'event': event['event'],
+                'block_number': event['blockNumber'],
+                'log_index': event['logIndex'],
+                'tx_hash': Web3.to_hex(event['transactionHash']),
+                'args': {_snake_case(name): _normalize_value(value) for name, value in event['args'].items()}
+            })
+        events.sort(key=lambda event: (event['block_number'], event['log_index']))
+        return events
+
+    def _fetch_page(self, from_block, to_block):
+        """Fetch a range, halving it (for this and later pages) while the node refuses it as too large
+
+        Other errors, such as timeouts, are left to the polling loop to retry.
+        """
+        while True:
+            try:
+                events = self.fetch_events(from_block, to_block)
+                self.page_size = min(self.page_size, to_block - from_block + 1)
+                return to_block, events
+            except Exception as e:
+                if to_block == from_block or not is_range_error(e):
+                    raise
+                to_block = from_block + (to_block - from_block) // 2
+
+    def _block_hash(self, block_number):
+        if block_number < 0:
+            return None
+        return Web3.to_hex(blockchain.w3.eth.get_block(block_number)['hash'])
+
+    def _resume_block(self, address):
+        """Get the last indexed block, rolling back first if it was reorganized away"""
+        checkpoint = OnchainIndex.get_checkpoint(address)
+        if not checkpoint:
+            return self.start_block - 1
+
+        last_block = checkpoint['last_block']
+        if checkpoint.get('last_block_hash') and self._block_hash(last_block) != checkpoint['last_block_hash']:
+            rewind_to = max(self.start_block - 1, last_block - Config.INDEXER_REORG_REWIND)
+            print(f"Warning: Block {last_block} was reorganized, re-indexing from block {rewind_to + 1}")
+            OnchainIndex.rollback(rewind_to)
+            OnchainIndex.set_checkpoint(address, rewind_to, self._block_hash(rewind_to))
+            return rewind_to
+        return last_block
+
+    def run_once(self):
+        """Index one page of confirmed blocks; returns False when caught up"""
+        if not blockchain.contract:
+            raise Exception("Smart contract not initialized")
+
+        address = blockchain.contract.address
+        last_block = self._resume_block(address)
+        confirmed_block = blockchain.w3.eth.block_number - self.confirmations
+        if last_block >= confirmed_block:
+            return False
+
+        to_block, events = self._fetch_page(last_block + 1, min(last_block + self.page_size, confirmed_block))
+        OnchainIndex.apply_events(events)
+        OnchainIndex.set_checkpoint(address, to_block, self._block_hash(to_block))
+        return True
+
+
+# Create singleton instance
+contract_indexer = ContractIndexer()
@@ -0,0 +1,136 @@
+import os
+import threading
+import rlp
+from eth_account import Account
+from eth_utils import keccak, to_canonical_address
+from web3 import Web3, EthereumTesterProvider
+from web3.providers.eth_tester import AsyncEthereumTesterProvider
+from app.config import Config
+
+INPROC_SCHEME = 'inproc://'
+CONTRACTS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'smart-contracts')
+# eth-tester pre-funds the accounts whose private keys are 1, 2, 3...; the first deploys and signs
+DEPLOYER_KEY = '0x' + '01'.rjust(64, '0')
+
+
+def is_inproc(provider_uri):
+    """Check whether a WEB3_PROVIDER_URI selects the in-process chain"""
+    return provider_uri.startswith(INPROC_SCHEME)
+
+
+def load_contract_bytecode(bytecode_path=None):
+    """Get the deployment bytecode of IdentityVerification
+
+    Reads CONTRACT_BYTECODE_PATH (smart-contracts/IdentityVerification.bin by
+    default, written by compile_contract.py), or compiles the contract with
+    an already installed solc SOLC_VERSION when no bytecode file exists.
+    """
+    bytecode_path = bytecode_path or Config.CONTRACT_BYTECODE_PATH or os.path.join(CONTRACTS_DIR, 'IdentityVerification.bin')
+    if os.path.exists(bytecode_path):
+        with open(bytecode_path, 'r') as f:
+            return f.read().strip()
+    try:
+        import solcx
+        compiled = solcx.compile_files(
+            [os.path.join(CONTRACTS_DIR, 'IdentityVerification.sol')],
+            output_values=['bin'],
+            solc_version=Config.SOLC_VERSION,
+            evm_version='paris'
+        )
+    except Exception as e:
+        raise Exception(
+            f"No contract bytecode at {bytecode_path} and compiling failed ({str(e)}); "
+            "run python compile_contract.py --install"
+        )
+    return next(output['bin'] for name, output in compiled.items() if name.endswith(':IdentityVerification'))
+
+
+class InProcessProvider(EthereumTesterProvider):
+    """eth-tester provider that serializes calls from many threads on one chain"""
+
+    def __init__(self, chain):
+        # Skip the parent constructor, which would start a chain of its own;
+        # ours is started by the first request
+        super(EthereumTesterProvider, self).__init__()
+        from web3.providers.eth_tester.defaults import API_ENDPOINTS
+        self.api_endpoints = API_ENDPOINTS
+        self.chain = chain
+        self.endpoint_uri = INPROC_SCHEME
+
+    def make_request(self, method, params):
+        self.ethereum_tester = self.chain.start().tester
+        with self.chain.lock:
+            return super().make_request(method, params)
+
+
+class AsyncInProcessProvider(AsyncEthereumTesterProvider):
+    """Async provider for the same in-process chain"""
+
+    def __init__(self, chain):
+        # Skip the parent constructor, which would start a chain of its own
+        super(AsyncEthereumTesterProvider, self).__init__()
+        from web3.providers.eth_tester.defaults import API_ENDPOINTS
+        self.api_endpoints = API_ENDPOINTS
+        self.chain = chain
+        self.endpoint_uri = INPROC_SCHEME
+
+    async def make_request(self, method, params):
+        self.ethereum_tester = self.chain.start().tester
+        # eth-tester answers synchronously, so the lock is never held across an await
+        with self.chain.lock:
+            return await super().make_request(method, params)
+
+
+class InProcessChain:
+    """Deterministic py-evm chain running the real contract inside this process
+
+    Selected with WEB3_PROVIDER_URI=inproc://. Every transaction is mined
+    instantly into its own block, and the contract is deployed from the
+    first of eth-tester's fixed, pre-funded accounts, which is also used as
+    the signing key, so the contract address and the sequence of hashes are
+    the same on every run and known before the chain exists. The chain
+    lives in memory: it is started by the first request, starts empty with
+    each process and is not shared between processes.
+    """
+
+    def __init__(self):
+        self.tester = None
+        self.private_key = DEPLOYER_KEY
+        deployer = Account.from_key(DEPLOYER_KEY).address
+        # Address of the deployer's first contract creation (nonce 0)
+        self.contract_address = Web3.to_checksum_address(keccak(rlp.encode([to_canonical_address(deployer), 0]))[12:])
+        self.lock = threading.RLock()
+
+    def start(self):
+        """Create the chain and deploy the contract, once per process"""
+        if self.tester is not None:
+            return self
+        with self.lock:
+            if self.tester is not None:
+                return self
+            try:
+                from eth_tester import EthereumTester, PyEVMBackend
+            except ImportError:
+                raise Exception("WEB3_PROVIDER_URI=inproc:// requires eth-tester: pip install -r requirements-dev.txt")
+
+            bytecode = load_contract_bytecode()
+            tester = EthereumTester(PyEVMBackend())
+            deployer = Account.from_key(self.private_key).address
+            tx_hash = tester.send_transaction({'from': deployer, 'data': '0x' + bytecode.removeprefix('0x'), 'gas': 10_000_000})
+            receipt = tester.get_transaction_receipt(tx_hash)
+            if not receipt['status'] or receipt['contract_address'].lower() != self.contract_address.lower():
+                raise Exception(f"Deploying the contract on the in-process chain failed: {receipt}")
+            self.tester = tester
+            return self
+
+    def provider(self):
+        """Get a provider for BlockchainUtil"""
+        return InProcessProvider(self)
+
+    def async_provider(self):
+        """Get a provider for AsyncBlockchainUtil"""
+        return AsyncInProcessProvider(self)
+
+
+# Create singleton instance
+inproc_chain = InProcessChain()
@@ -0,0 +1,186 @@
+import hashlib
+
+HASH_SIZE = 32
+# RFC 6962 domain separation, so an internal node can never pass as a leaf
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+MERKLE_SCHEME = 'rfc6962-sha256'
+# Batches anchored before domain separation hashed raw leaves and sha256(left || right)
+LEGACY_MERKLE_SCHEME = 'sha256'
+
+
+def _hash_leaf(leaf):
+    return hashlib.sha256(LEAF_PREFIX + leaf).digest()
+
+
+def _hash_pair(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def _legacy_hash_pair(left, right):
+    return hashlib.sha256(left + right).digest()
+
+
+def _as_digest(leaf):
+    if not isinstance(leaf, (bytes, bytearray)) or len(leaf) != HASH_SIZE:
+        raise ValueError("Merkle leaves must be 32-byte digests")
+    return bytes(leaf)
+
+
+class MerkleTree:
+    """Append-only Merkle tree over 32-byte SHA-256 digests
+
+    Hashed as in RFC 6962: leaf nodes are sha256(0x00 || leaf), parents
+    are sha256(0x01 || left || right), and an unpaired right-most node is
+    promoted unchanged to the next level. This matches verifyMerkleProof in
+    the contract and gives the same tree shape as RFC 6962, so appends only
+    touch the right-most path.
+
+    Every level is stored as one bytearray of concatenated 32-byte nodes,
+    level 0 holding the leaf nodes, which keeps a tree of n leaves at
+    roughly 64 * n bytes with no per-node Python objects.
+    """
+
+    def __init__(self, leaves=None):
+        self._levels = [bytearray()]
+        if leaves:
+            self.extend(leaves)
+
+    def __len__(self):
+        return len(self._levels[0]) // HASH_SIZE
+
+    def _level_size(self, level):
+        return len(self._levels[level]) // HASH_SIZE
+
+    def _node(self, level, index):
+        offset = index * HASH_SIZE
+        return bytes(self._levels[level][offset:offset + HASH_SIZE])
+
+    def append(self, leaf):
+        """Append one leaf in O(log n); returns its index"""
+        node = _hash_leaf(_as_digest(leaf))
+        leaf_index = index = len(self)
+        self._levels[0] += node
+
+        # Only the right-most path changes; a node without a left sibling is promoted
+        level = 0
+        while self._level_size(level) > 1:
+            if index % 2:
+                node = _hash_pair(self._node(level, index - 1), node)
+            if level + 1 == len(self._levels):
+                self._levels.append(bytearray())
+            offset = (index // 2) * HASH_SIZE
+            self._levels[level + 1][offset:offset + HASH_SIZE] = node
+            index //= 2
+            level += 1
+        return leaf_index
+
+    def extend(self, leaves):
+        """Append many leaves, rehashing each affected node once"""
+        digests = [_hash_leaf(_as_digest(leaf)) for leaf in leaves]
+        if not digests:
+            return
+
+        first_changed = len(self)
+        self._levels[0] += b''.join(digests)
+
+        level = 0
+        while self._level_size(level) > 1:
+            if level + 1 == len(self._levels):
+                self._levels.append(bytearray())
+            source = memoryview(self._levels[level])
+            size = self._level_size(level)
+
+            # Parents left of first_changed // 2 are unaffected
+            parent_start = first_changed // 2
+            parents = self._levels[level + 1]
+            del parents[parent_start * HASH_SIZE:]
+            for i in range(parent_start * 2, size - 1, 2):
+                parents += hashlib.sha256(NODE_PREFIX + source[i * HASH_SIZE:(i + 2) * HASH_SIZE]).digest()
+            if size % 2:
+                parents += source[(size - 1) * HASH_SIZE:]
+            source.release()
+
+            first_changed = parent_start
+            level += 1
+
+    def leaf(self, index):
+        """Get the leaf node at index, sha256(0x00 || leaf)"""
+        if not 0 <= index < len(self):
+            raise IndexError("Leaf index out of range")
+        return self._node(0, index)
+
+    def root(self):
+        """Get the Merkle root (SHA-256 of the empty string for an empty tree)"""
+        if not len(self):
+            return hashlib.sha256(b"").digest()
+        return self._node(len(self._levels) - 1, 0)
+
+    def proof(self, index):
+        """Get the inclusion proof of a leaf in O(log n)
+
+        Returns (siblings, path_bits): the sibling nodes from the leaf node
+        up to the root, and a bitmask whose bit i is set when siblings[i] is
+        the left-hand node.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError("Leaf index out of range")
+
+        siblings = []
+        path_bits = 0
+        for level in range(len(self._levels) - 1):
+            sibling = index ^ 1
+            if sibling < self._level_size(level):
+                if sibling < index:
+                    path_bits |= 1 << len(siblings)
+                siblings.append(self._node(level, sibling))
+            index //= 2
+        return siblings, path_bits
+
+
+def compute_root(leaf, siblings, path_bits, scheme=MERKLE_SCHEME):
+    """Fold a leaf and its proof up to the root it commits to"""
+    if scheme == LEGACY_MERKLE_SCHEME:
+        node, hash_pair = leaf, _legacy_hash_pair
+    else:
+        node, hash_pair = _hash_leaf(leaf), _hash_pair
+    for i, sibling in enumerate(siblings):
+        if (path_bits >> i) & 1:
+            node = hash_pair(sibling, node)
+        else:
+            node = hash_pair(node, sibling)
+    return node
+
+
+def verify_proof(leaf, siblings, path_bits, root, scheme=MERKLE_SCHEME):
+    """Verify a single inclusion proof"""
+    return compute_root(leaf, siblings, path_bits, scheme) == root
+
+
+def verify_proofs(proofs, root):
+    """Verify many (leaf, siblings, path_bits) proofs against one root
+
+    Nodes on the path of an accepted proof are remembered, so later proofs
+    stop hashing as soon as they meet a node already known to lead to the
+    root; a proof is accepted when it shows its leaf is included under the
+    root. Returns one boolean per proof, in order.
+    """
+    known = {root}
+    results = []
+    for leaf, siblings, path_bits in proofs:
+        node = _hash_leaf(leaf)
+        path = []
+        for i, sibling in enumerate(siblings):
+            if node in known:
+                break
+            path.append(node)
+            if (path_bits >> i) & 1:
+                node = _hash_pair(sibling, node)
+            else:
+                node = _hash_pair(node, sibling)
+
+        is_valid = node in known
+        if is_valid:
+            known.update(path)
+        results.append(is_valid)
+    return results
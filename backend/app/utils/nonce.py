@@ -0,0 +1,132 @@
+from app.models.database import nonces_collection
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+
+# Node error messages that mean our view of the account nonce is out of date
+NONCE_ERROR_MARKERS = (
+    'nonce too low',
+    'nonce too high',
+    'replacement transaction underpriced',
+    "doesn't have the correct nonce",
+    'invalid nonce',
+    'invalid transaction nonce',
+)
+
+
+def is_nonce_error(error):
+    """Check whether a node error was caused by a stale nonce"""
+    message = str(error).lower()
+    return any(marker in message for marker in NONCE_ERROR_MARKERS)
+
+
+class NonceManager:
+    """Hands out transaction nonces for a signing account
+
+    The next free nonce lives in MongoDB and is advanced with an atomic $inc,
+    so threads and processes sharing one PRIVATE_KEY never receive the same
+    nonce and no RPC round-trip is needed per transaction. The counter is
+    seeded from (and can be resynced to) the node's pending transaction count.
+    With reset=True the counter is taken from the node instead, for chains
+    that start over with the process.
+
+    The counter also tracks how many allocated nonces are in flight (not
+    yet broadcast or released), so a resync never moves it back below a
+    nonce that is about to be used.
+    """
+
+    def __init__(self, w3, address, reset=False, resync_grace=30):
+        self.w3 = w3
+        self.address = address
+        self.reset = reset
+        self.resync_grace = resync_grace
+        self._initialized = False
+
+    def _chain_nonce(self):
+        return self.w3.eth.get_transaction_count(self.address, 'pending')
+
+    def _ensure_initialized(self):
+        if self._initialized:
+            return
+        if self.reset:
+            # Nothing of ours can be in flight on a chain that just started
+            nonces_collection.update_one(
+                {"_id": self.address},
+                {"$set": {"next_nonce": self._chain_nonce(), "in_flight": 0, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+            self._initialized = True
+            return
+        # $max keeps a counter that is already ahead of the node (in-flight
+        # transactions from other processes) and seeds a missing one
+        nonces_collection.update_one(
+            {"_id": self.address},
+            {"$max": {"next_nonce": self._chain_nonce()}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        self._initialized = True
+
+    def allocate(self):
+        """Reserve the next nonce"""
+        self._ensure_initialized()
+        now = datetime.utcnow()
+        doc = nonces_collection.find_one_and_update(
+            {"_id": self.address},
+            {"$inc": {"next_nonce": 1, "in_flight": 1}, "$set": {"allocated_at": now, "updated_at": now}},
+            return_document=ReturnDocument.BEFORE
+        )
+        return doc["next_nonce"]
+
+    def settle(self):
+        """Record that an allocated nonce was broadcast (or rejected by the node)"""
+        nonces_collection.update_one({"_id": self.address}, {"$inc": {"in_flight": -1}})
+
+    def release(self, nonce):
+        """Give back a nonce whose transaction was never broadcast
+
+        Only the most recently allocated nonce can be returned. Returns
+        False otherwise, and the caller must fill the gap with a
+        transaction of its own.
+        """
+        result = nonces_collection.update_one(
+            {"_id": self.address, "next_nonce": nonce + 1},
+            {"$set": {"next_nonce": nonce, "updated_at": datetime.utcnow()}, "$inc": {"in_flight": -1}}
+        )
+        if result.modified_count:
+            return True
+        self.settle()
+        return False
+
+    def resync(self):
+        """Move the counter to the node's pending nonce after a drop or rejection
+
+        The counter only moves if no nonce was allocated since it was read,
+        and only moves back while no allocation is in flight (or the last
+        one is older than resync_grace seconds, from a process that died
+        before settling it). Returns the new counter, or None when it was
+        left alone.
+        """
+        self._initialized = True
+        doc = nonces_collection.find_one({"_id": self.address})
+        chain_nonce = self._chain_nonce()
+        now = datetime.utcnow()
+        if doc is None:
+            nonces_collection.update_one(
+                {"_id": self.address},
+                {"$max": {"next_nonce": chain_nonce}, "$set": {"updated_at": now}},
+                upsert=True
+            )
+            return chain_nonce
+
+        seen = doc["next_nonce"]
+        if chain_nonce < seen and doc.get("in_flight", 0) > 0 and \
+                doc.get("allocated_at") and doc["allocated_at"] > now - timedelta(seconds=self.resync_grace):
+            return None
+        update = {"next_nonce": chain_nonce, "updated_at": now}
+        if chain_nonce < seen:
+            # Whatever is still counted as in flight was never settled
+            update["in_flight"] = 0
+        result = nonces_collection.update_one(
+            {"_id": self.address, "next_nonce": seen},
+            {"$set": update}
+        )
+        return chain_nonce if result.modified_count else None
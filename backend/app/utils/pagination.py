@@ -0,0 +1,27 @@
+import base64
+import json
+from datetime import datetime
+from bson.objectid import ObjectId
+
+
+def encode_cursor(document, timestamp_field=None):
+    """Build an opaque keyset cursor pointing after a document
+
+    The cursor holds the document's _id and, for lists sorted by time, its
+    timestamp, so the next page is a range scan on the sort index instead
+    of a skip over every earlier entry.
+    """
+    position = {'id': str(document['_id'])}
+    if timestamp_field:
+        position['ts'] = document[timestamp_field].isoformat()
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor into (ObjectId, timestamp or None)"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        timestamp = datetime.fromisoformat(position['ts']) if 'ts' in position else None
+        return ObjectId(position['id']), timestamp
+    except Exception:
+        raise ValueError('Invalid cursor')
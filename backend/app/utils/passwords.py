@@ -0,0 +1,108 @@
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from app.config import Config
+from app.bcrypt_worker import hash_password as _hash_password, check_password as _check_password
+
+
+class HashingBusy(Exception):
+    """Raised when the password hashing pool has no free slot"""
+
+    def __init__(self, retry_after):
+        super().__init__("Authentication service busy, retry later")
+        self.retry_after = retry_after
+
+
+def hash_rounds(password_hash):
+    """Get the cost factor of a bcrypt hash ($2b$<rounds>$...)"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded process pool
+
+    At most PASSWORD_HASH_WORKERS hashes run at once and at most
+    PASSWORD_HASH_QUEUE_DEPTH more wait for a worker; a request that finds
+    every slot taken for PASSWORD_HASH_ADMISSION_TIMEOUT seconds gets
+    HashingBusy, so a login burst is shed instead of starving the request
+    threads. With PASSWORD_HASH_WORKERS=0 hashing runs inline.
+    """
+
+    def __init__(self, workers=None, queue_depth=None, rounds=None, admission_timeout=None):
+        self.workers = Config.PASSWORD_HASH_WORKERS if workers is None else workers
+        self.queue_depth = Config.PASSWORD_HASH_QUEUE_DEPTH if queue_depth is None else queue_depth
+        self.rounds = rounds or Config.BCRYPT_ROUNDS
+        self.admission_timeout = Config.PASSWORD_HASH_ADMISSION_TIMEOUT if admission_timeout is None else admission_timeout
+        self._slots = threading.BoundedSemaphore(max(1, self.workers) + self.queue_depth)
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self._avg_duration = 0.25  # seconds per hash, refined as calls complete
+
+    def _get_pool(self):
+        # A pool inherited through fork (e.g. gunicorn preload) has no live workers
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('forkserver')
+                    )
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def _retry_after(self):
+        """Estimate the seconds until the queue ahead has drained"""
+        return max(1, math.ceil(self._avg_duration * (self.workers + self.queue_depth) / max(1, self.workers)))
+
+    def _run(self, function, *args):
+        if not self._slots.acquire(timeout=self.admission_timeout):
+            raise HashingBusy(self._retry_after())
+        try:
+            start = time.monotonic()
+            if self.workers:
+                result = self._get_pool().submit(function, *args).result()
+            else:
+                result = function(*args)
+            self._avg_duration = 0.9 * self._avg_duration + 0.1 * (time.monotonic() - start)
+            return result
+        finally:
+            self._slots.release()
+
+    def hash_password(self, password):
+        """Hash a password with the configured cost factor"""
+        return self._run(_hash_password, password, self.rounds)
+
+    def verify_password(self, password, password_hash):
+        """Verify a password against a bcrypt hash"""
+        return self._run(_check_password, password, password_hash)
+
+    def needs_rehash(self, password_hash):
+        """Check whether a hash was made with a different cost factor than the configured one"""
+        return hash_rounds(password_hash) != self.rounds
+
+    def stats(self):
+        """Get pool size and how many hashes are running or waiting"""
+        capacity = max(1, self.workers) + self.queue_depth
+        return {
+            'workers': self.workers,
+            'capacity': capacity,
+            'in_use': capacity - self._slots._value,
+            'avg_duration': self._avg_duration
+        }
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+# Create singleton instance
+password_hasher = PasswordHasher()
@@ -0,0 +1,127 @@
+import json
+import threading
+from concurrent.futures import Future
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from web3 import HTTPProvider
+from app.config import Config
+
+# Reads whose result only depends on their params (and the current head), so
+# concurrent identical requests can share one round-trip
+COALESCED_METHODS = (
+    'web3_clientVersion',
+    'net_version',
+    'eth_chainId',
+    'eth_gasPrice',
+    'eth_blockNumber',
+    'eth_getBalance',
+    'eth_call'
+)
+
+# Calls that must reach the node at most once: a retry after a lost response
+# would broadcast the transaction again
+SEND_METHODS = ('eth_sendRawTransaction', 'eth_sendTransaction')
+
+
+class PooledHTTPProvider(HTTPProvider):
+    """HTTP JSON-RPC provider with a shared connection pool
+
+    All threads share one requests session whose adapter keeps up to
+    RPC_POOL_SIZE keep-alive connections and retries connection errors and
+    gateway failures. Transactions are sent through a second session that
+    only retries failed connections, since the node may have accepted a
+    transaction whose response was lost. Concurrent identical reads are
+    coalesced into a single in-flight request, and make_batch_request sends
+    many calls as JSON-RPC batches.
+    """
+
+    def __init__(self, endpoint_uri, pool_size=None, timeout=None, retries=None, backoff=None, batch_size=None):
+        super().__init__(endpoint_uri)
+        self.timeout = timeout or Config.RPC_TIMEOUT
+        self.batch_size = batch_size or Config.RPC_BATCH_SIZE
+        retries = Config.RPC_RETRIES if retries is None else retries
+        backoff = Config.RPC_RETRY_BACKOFF if backoff is None else backoff
+        pool_size = pool_size or Config.RPC_POOL_SIZE
+        self.session = self._session(pool_size, Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['POST'])
+        ))
+        self.send_session = self._session(pool_size, Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=backoff
+        ))
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    @staticmethod
+    def _session(pool_size, retry):
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _post(self, request_data, session=None):
+        response = (session or self.session).post(
+            self.endpoint_uri,
+            data=request_data,
+            headers=self.get_request_headers(),
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.content
+
+    def _send(self, method, params):
+        session = self.send_session if method in SEND_METHODS else self.session
+        return self.decode_rpc_response(self._post(self.encode_rpc_request(method, params), session))
+
+    def make_request(self, method, params):
+        """Send a JSON-RPC request, sharing the result of an identical read already in flight"""
+        if method not in COALESCED_METHODS:
+            return self._send(method, params)
+
+        key = (method, json.dumps(params, sort_keys=True, default=str))
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._inflight[key] = Future()
+        if not is_leader:
+            return future.result()
+
+        try:
+            future.set_result(self._send(method, params))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+        return future.result()
+
+    def make_batch_request(self, calls):
+        """Send (method, params) calls as JSON-RPC batches of at most batch_size
+
+        Returns the raw responses ({'result': ...} or {'error': ...}) in call
+        order. Raises if the node does not answer batches.
+        """
+        responses = []
+        for start in range(0, len(calls), self.batch_size):
+            chunk = calls[start:start + self.batch_size]
+            requests_data = [json.loads(self.encode_rpc_request(method, params)) for method, params in chunk]
+            batch_response = json.loads(self._post(json.dumps(requests_data)))
+            if not isinstance(batch_response, list):
+                raise Exception(batch_response.get('error', {}).get('message', 'Batch requests not supported'))
+
+            by_id = {response.get('id'): response for response in batch_response}
+            responses.extend(
+                by_id.get(request_data['id'], {'error': {'message': 'Missing response'}})
+                for request_data in requests_data
+            )
+        return responses
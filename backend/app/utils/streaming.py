@@ -0,0 +1,102 @@
+import hashlib
+from bson.binary import Binary
+from app.config import Config
+from app.models.files import CredentialFile
+from .envelope import envelope, STREAM_SCHEME, TAG_SIZE
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds UPLOAD_MAX_BYTES"""
+
+
+def _read_exact(stream, size):
+    """Read size bytes from a stream, fewer only at the end of the stream"""
+    chunks, remaining = [], size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def _segments(stream, size):
+    """Yield (index, segment, is_last) for fixed-size segments of a stream
+
+    One segment is read ahead so the last one can be flagged; an empty
+    stream yields a single empty last segment.
+    """
+    index = 0
+    segment = _read_exact(stream, size)
+    while True:
+        next_segment = _read_exact(stream, size) if len(segment) == size else b''
+        is_last = not next_segment
+        yield index, segment, is_last
+        if is_last:
+            return
+        index, segment = index + 1, next_segment
+
+
+def store_encrypted_stream(user_id, stream, filename, content_type, max_bytes=None, segment_size=None):
+    """Hash and encrypt a stream into GridFS with constant memory
+
+    The stream is read in UPLOAD_SEGMENT_SIZE segments; each one updates the
+    SHA-256 of the plaintext and is sealed with the user's data key before
+    being written to GridFS. Returns (file info, hex SHA-256 of the
+    plaintext), where file info is stored as the credential's data.
+    """
+    max_bytes = max_bytes or Config.UPLOAD_MAX_BYTES
+    segment_size = segment_size or Config.UPLOAD_SEGMENT_SIZE
+    key_id, nonce_prefix, cipher = envelope.stream_cipher(user_id)
+    digest = hashlib.sha256()
+    size = 0
+
+    upload = CredentialFile.open_upload(filename, {
+        'user_id': str(user_id),
+        'scheme': STREAM_SCHEME,
+        'key_id': key_id,
+        'nonce_prefix': Binary(nonce_prefix),
+        'segment_size': segment_size
+    })
+    try:
+        for index, segment, is_last in _segments(stream, segment_size):
+            size += len(segment)
+            if size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+            digest.update(segment)
+            upload.write(cipher.encrypt(index, segment, is_last))
+        upload.close()
+    except BaseException:
+        upload.abort()
+        raise
+
+    return {
+        'storage': 'gridfs',
+        'file_id': upload._id,
+        'filename': filename,
+        'content_type': content_type,
+        'size': size,
+        'scheme': STREAM_SCHEME,
+        'key_id': key_id
+    }, digest.hexdigest()
+
+
+def open_decrypted_stream(user_id, data):
+    """Open a stored credential file; returns a generator of plaintext segments
+
+    The file and its data key are looked up before returning, so missing
+    files or keys raise here rather than halfway through a response.
+    """
+    download = CredentialFile.open_download(data['file_id'])
+    metadata = download.metadata
+    cipher = envelope.open_stream_cipher(user_id, metadata['key_id'], metadata['nonce_prefix'])
+
+    def generate():
+        try:
+            for index, segment, is_last in _segments(download, metadata['segment_size'] + TAG_SIZE):
+                yield cipher.decrypt(index, segment, is_last)
+        finally:
+            download.close()
+
+    return generate()
@@ -0,0 +1,6 @@
+# Benchmarks package init
+# Run from the backend directory, e.g. python -m benchmarks.bench_merkle
+import os
+
+# Benchmarks bring their own keys or need none; let the app start without MASTER_KEYS
+os.environ.setdefault('ALLOW_DEV_MASTER_KEY', 'true')
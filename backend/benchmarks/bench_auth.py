@@ -0,0 +1,63 @@
+"""Per-request JWT authentication overhead benchmark
+
+Usage: python -m benchmarks.bench_auth [--requests 100000] [--users 100]
+"""
+import argparse
+import time
+from flask import Flask
+from app.utils import auth
+from app.utils.auth import AuthUtil, require_auth
+
+
+def _us_per_request(function, count):
+    start = time.perf_counter()
+    for i in range(count):
+        function(i)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=100)
+    args = parser.parse_args()
+
+    tokens = [
+        AuthUtil.generate_jwt_token(f"{i:024x}", f"user{i}@example.com", f"0x{i:040x}")
+        for i in range(args.users)
+    ]
+    app = Flask(__name__)
+
+    @require_auth
+    def view():
+        return 'ok'
+
+    def request_context(i):
+        return app.test_request_context(headers={'Authorization': f"Bearer {tokens[i % args.users]}"})
+
+    def empty(i):
+        with request_context(i):
+            pass
+
+    def uncached(i):
+        with request_context(i):
+            auth._token_cache.clear()
+            view()
+
+    def cached(i):
+        with request_context(i):
+            view()
+
+    context_only = _us_per_request(empty, args.requests)
+    without_cache = _us_per_request(uncached, args.requests)
+    auth._token_cache.clear()
+    with_cache = _us_per_request(cached, args.requests)
+
+    print(f"request context only:  {context_only:8.2f} us/request")
+    print(f"require_auth, no cache: {without_cache - context_only:8.2f} us/request")
+    print(f"require_auth, cached:   {with_cache - context_only:8.2f} us/request")
+    print(f"token cache: {auth._token_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Password verification (login) throughput benchmark
+
+Usage: python -m benchmarks.bench_bcrypt [--rounds 10 12] [--workers 4] [--logins 200]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.bcrypt_worker import check_password, hash_password
+from app.utils.passwords import PasswordHasher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 11, 12])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--logins', type=int, default=200)
+    args = parser.parse_args()
+
+    for rounds in args.rounds:
+        password_hash = hash_password('correct horse battery staple', rounds)
+
+        # One core: bcrypt inline in the calling thread
+        count = max(5, args.logins // args.workers)
+        start = time.perf_counter()
+        for _ in range(count):
+            assert check_password('correct horse battery staple', password_hash)
+        per_core = count / (time.perf_counter() - start)
+
+        # Pool: as many concurrent logins as the pool admits
+        hasher = PasswordHasher(workers=args.workers, queue_depth=args.workers * 4, rounds=rounds, admission_timeout=60)
+        hasher.verify_password('warm up', password_hash)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers * 4) as clients:
+            results = list(clients.map(
+                lambda _: hasher.verify_password('correct horse battery staple', password_hash),
+                range(args.logins)
+            ))
+        pooled = args.logins / (time.perf_counter() - start)
+        hasher.shutdown()
+        assert all(results)
+
+        print(f"rounds={rounds}: {per_core:,.1f} logins/s per core, "
+              f"{pooled:,.1f} logins/s with {args.workers} workers ({pooled / args.workers:,.1f}/worker)")
+
+
+if __name__ == '__main__':
+    main()
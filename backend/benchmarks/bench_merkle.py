@@ -0,0 +1,56 @@
+"""Merkle tree throughput benchmark
+
+Usage: python -m benchmarks.bench_merkle [--leaves 1000000]
+"""
+import argparse
+import hashlib
+import os
+import time
+from app.utils.merkle import MerkleTree, verify_proof, verify_proofs
+
+
+def _rate(count, seconds):
+    return f"{count / seconds * 60:,.0f}/min ({seconds:.3f}s for {count:,})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--leaves', type=int, default=1_000_000)
+    parser.add_argument('--appends', type=int, default=100_000)
+    parser.add_argument('--proofs', type=int, default=100_000)
+    args = parser.parse_args()
+
+    seed = os.urandom(32)
+    leaves = [hashlib.sha256(seed + i.to_bytes(8, 'big')).digest() for i in range(args.leaves)]
+
+    start = time.perf_counter()
+    tree = MerkleTree(leaves)
+    root = tree.root()
+    print(f"bulk build:          {_rate(args.leaves, time.perf_counter() - start)}")
+
+    appended = MerkleTree()
+    start = time.perf_counter()
+    for leaf in leaves[:args.appends]:
+        appended.append(leaf)
+    print(f"incremental append:  {_rate(args.appends, time.perf_counter() - start)}")
+
+    indexes = range(0, args.leaves, max(1, args.leaves // args.proofs))
+    start = time.perf_counter()
+    proofs = [(leaves[i],) + tree.proof(i) for i in indexes]
+    print(f"proof generation:    {_rate(len(proofs), time.perf_counter() - start)}")
+
+    start = time.perf_counter()
+    assert all(verify_proof(leaf, siblings, bits, root) for leaf, siblings, bits in proofs)
+    print(f"single verification: {_rate(len(proofs), time.perf_counter() - start)}")
+
+    # Batch verification pays off when proofs share subtrees, e.g. a whole batch
+    batch = [(leaves[i],) + tree.proof(i) for i in range(min(args.proofs, args.leaves))]
+    start = time.perf_counter()
+    assert all(verify_proofs(batch, root))
+    print(f"batch verification:  {_rate(len(batch), time.perf_counter() - start)}")
+
+    print(f"node store:          {sum(len(level) for level in tree._levels) / 2 ** 20:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
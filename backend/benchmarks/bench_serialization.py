@@ -0,0 +1,57 @@
+"""Credential serialization benchmark: str() hash + json.dumps vs one canonical serialization
+
+Usage: python -m benchmarks.bench_serialization [--sizes 10 100 1000] [--iterations 2000]
+"""
+import argparse
+import hashlib
+import json
+import time
+from app.utils.canonical import canonicalize
+
+
+def _credential(fields):
+    """Build a nested credential document with about `fields` leaf values"""
+    return {
+        'holder': {'name': 'Zoë Müller', 'date_of_birth': '1990-01-01', 'nationality': 'DE'},
+        'document': {'number': 'C01X00T47', 'issued': 1577836800, 'expires': 1893456000, 'score': 0.987},
+        'attributes': [
+            {'key': f'attribute_{i}', 'value': f'value {i}', 'weight': i / 7, 'verified': i % 2 == 0}
+            for i in range(fields // 4)
+        ]
+    }
+
+
+def _legacy(credential_data):
+    return hashlib.sha256(str(credential_data).encode()).hexdigest(), json.dumps(credential_data).encode()
+
+
+def _canonical(credential_data):
+    canonical_data = canonicalize(credential_data)
+    return hashlib.sha256(canonical_data).hexdigest(), canonical_data
+
+
+def _us_per_call(function, credential_data, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function(credential_data)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    for fields in args.sizes:
+        credential_data = _credential(fields)
+        iterations = max(10, args.iterations * 10 // max(fields, 10))
+        legacy = _us_per_call(_legacy, credential_data, iterations)
+        canonical = _us_per_call(_canonical, credential_data, iterations)
+        size = len(canonicalize(credential_data))
+        print(f"{fields:>6} fields ({size:,} bytes): str()+json.dumps {legacy:9.1f} us, "
+              f"canonical once {canonical:9.1f} us ({canonical / legacy:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""End-to-end load test: latency percentiles and throughput per route
+
+Boots create_app() in this process against local stand-ins (an in-process
+chain running the real contract, and mongomock or MongoDB at MONGODB_URI),
+seeds users with anchored credentials, then drives a weighted mix of
+register, login, create, list, verify and proof requests from concurrent
+clients. Results are printed and can be written as JSON (--output) and
+compared against an earlier run (--baseline); the exit status is 1 when a
+route's p95 latency or throughput regresses by more than --tolerance.
+
+Usage: python -m benchmarks.loadtest [--requests 2000] [--concurrency 8]
+           [--mix register=1,login=1,create=2,list=3,verify=8,proof=3]
+           [--mongo mock|uri] [--chain inproc|env] [--output results.json]
+           [--baseline baseline.json] [--tolerance 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROUTES = ('register', 'login', 'create', 'list', 'verify', 'proof')
+DEFAULT_MIX = 'register=1,login=1,create=2,list=3,verify=8,proof=3'
+PASSWORD = 'correct horse battery staple'
+
+
+def _parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        route, _, weight = part.partition('=')
+        if route not in ROUTES:
+            raise SystemExit(f"Unknown route {route!r} in --mix (choose from {', '.join(ROUTES)})")
+        weights[route] = float(weight or 1)
+    return weights
+
+
+def _configure(args):
+    """Point the app at the stand-ins; must run before the app is imported"""
+    if args.chain == 'inproc':
+        os.environ['WEB3_PROVIDER_URI'] = 'inproc://'
+    os.environ['ANCHOR_WORKER_ENABLED'] = 'true'
+    os.environ.setdefault('ANCHOR_POLL_INTERVAL', '0.2')
+    os.environ.setdefault('DB_NAME', 'identity_verification_loadtest')
+    if args.bcrypt_rounds:
+        os.environ['BCRYPT_ROUNDS'] = str(args.bcrypt_rounds)
+    if args.mongo == 'mock':
+        try:
+            import mongomock
+            import mongomock.gridfs
+        except ImportError:
+            raise SystemExit("--mongo mock requires mongomock: pip install -r requirements-dev.txt")
+        import pymongo
+        pymongo.MongoClient = mongomock.MongoClient
+        mongomock.gridfs.enable_gridfs_integration()
+
+
+def _percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class LoadTest:
+    """Seeded users and credentials plus the request functions of each route"""
+
+    def __init__(self, app, run_id):
+        self.app = app
+        self.run_id = run_id
+        self.users = []  # (email, headers)
+        self.credential_hashes = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def client(self):
+        # Test clients keep cookies, so each thread gets its own
+        if not hasattr(self._local, 'client'):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    def _next(self):
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def register(self):
+        n = self._next()
+        response = self.client().post('/api/auth/register', json={
+            'email': f"load-{self.run_id}-{n}@example.com",
+            'password': PASSWORD,
+            'wallet_address': '0x' + uuid.uuid4().hex + f"{n:08x}",
+            'full_name': f"Load Test {n}"
+        })
+        if response.status_code == 201:
+            with self._lock:
+                self.users.append((response.get_json()['user']['email'], {'Authorization': f"Bearer {response.get_json()['token']}"}))
+        return response.status_code
+
+    def login(self):
+        email, _ = random.choice(self.users)
+        return self.client().post('/api/auth/login', json={'email': email, 'password': PASSWORD}).status_code
+
+    def create(self):
+        _, headers = random.choice(self.users)
+        response = self.client().post('/api/credentials/create', headers=headers, json={
+            'credential_type': random.choice(['passport', 'driver_license', 'national_id', 'diploma']),
+            'credential_data': {
+                'document_number': uuid.uuid4().hex[:12].upper(),
+                'holder': {'name': 'Load Test', 'date_of_birth': '1990-01-01'},
+                'issued': int(time.time())
+            }
+        })
+        if response.status_code in (201, 202):
+            with self._lock:
+                self.credential_hashes.append(response.get_json()['credential_hash'])
+        return response.status_code
+
+    def list(self):
+        _, headers = random.choice(self.users)
+        return self.client().get('/api/credentials/list', headers=headers).status_code
+
+    def verify(self):
+        return self.client().get(f"/api/credentials/verify/{random.choice(self.credential_hashes)}").status_code
+
+    def proof(self):
+        return self.client().get(f"/api/credentials/{random.choice(self.credential_hashes)}/blockchain-proof").status_code
+
+    def seed(self, users, credentials_per_user, anchor_timeout):
+        """Register users and create credentials, then wait for them to be anchored"""
+        for _ in range(users):
+            self.register()
+        if not self.users:
+            raise SystemExit("Could not register seed users; is MongoDB reachable?")
+        for _ in range(users * credentials_per_user):
+            self.create()
+
+        from app.models.anchor import AnchorJob
+        deadline = time.monotonic() + anchor_timeout
+        while time.monotonic() < deadline and AnchorJob.count_open_jobs():
+            time.sleep(0.2)
+
+
+def run(load_test, weights, total, concurrency):
+    """Send `total` requests drawn from the mix over `concurrency` clients"""
+    routes = list(weights)
+    plan = random.choices(routes, weights=[weights[route] for route in routes], k=total)
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+
+    def send(route):
+        start = time.perf_counter()
+        try:
+            status = getattr(load_test, route)()
+        except Exception:
+            status = 'exception'
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies[route].append(elapsed)
+            statuses[route][status] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        list(clients.map(send, plan))
+    duration = time.perf_counter() - start
+    return latencies, statuses, duration
+
+
+def summarize(latencies, statuses, duration):
+    """Per-route and overall latency percentiles (ms) and throughput (requests/s)"""
+    def stats(values, status_counts):
+        values = sorted(values)
+        errors = sum(count for status, count in status_counts.items() if status == 'exception' or status >= 400)
+        return {
+            'count': len(values),
+            'errors': errors,
+            'rps': round(len(values) / duration, 2),
+            'mean_ms': round(sum(values) / len(values) * 1000, 3) if values else None,
+            'p50_ms': round(_percentile(values, 50) * 1000, 3) if values else None,
+            'p95_ms': round(_percentile(values, 95) * 1000, 3) if values else None,
+            'p99_ms': round(_percentile(values, 99) * 1000, 3) if values else None,
+            'statuses': {str(status): count for status, count in status_counts.items()}
+        }
+
+    routes = {route: stats(latencies[route], statuses[route]) for route in ROUTES if route in latencies}
+    all_statuses = defaultdict(int)
+    for status_counts in statuses.values():
+        for status, count in status_counts.items():
+            all_statuses[status] += count
+    return {
+        'duration_s': round(duration, 3),
+        'routes': routes,
+        'total': stats([value for values in latencies.values() for value in values], all_statuses)
+    }
+
+
+def compare(results, baseline, tolerance):
+    """List the routes whose p95 latency rose or throughput fell by more than tolerance"""
+    regressions = []
+    for route, current in dict(results['routes'], total=results['total']).items():
+        previous = baseline['routes'].get(route) if route != 'total' else baseline.get('total')
+        if not previous or not previous.get('count') or not current['count']:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if current['rps'] < previous['rps'] * (1 - tolerance):
+            regressions.append(f"{route}: throughput {previous['rps']:.1f} -> {current['rps']:.1f} req/s")
+    return regressions
+
+
+def _print_table(results, baseline=None):
+    print(f"{'route':<10}{'count':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'p95 vs base':>13}")
+    for route, row in dict(results['routes'], total=results['total']).items():
+        previous = (baseline.get('total') if route == 'total' else baseline['routes'].get(route)) if baseline else None
+        change = f"{(row['p95_ms'] / previous['p95_ms'] - 1) * 100:+.1f}%" if previous and previous.get('p95_ms') else ''
+        print(f"{route:<10}{row['count']:>8}{row['errors']:>8}{row['rps']:>10.1f}"
+              f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{change:>13}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='route=weight pairs')
+    parser.add_argument('--users', type=int, default=20, help='users registered before the run')
+    parser.add_argument('--credentials', type=int, default=5, help='credentials created per seeded user')
+    parser.add_argument('--anchor-timeout', type=float, default=60, help='seconds to wait for seeded credentials to anchor')
+    parser.add_argument('--mongo', choices=('mock', 'uri'), default='mock', help='mongomock or MONGODB_URI (DB_NAME defaults to identity_verification_loadtest)')
+    parser.add_argument('--chain', choices=('inproc', 'env'), default='inproc', help='in-process chain or WEB3_PROVIDER_URI from the environment')
+    parser.add_argument('--bcrypt-rounds', type=int, help='override BCRYPT_ROUNDS for register/login')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the request mix')
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression of p95 and throughput')
+    args = parser.parse_args()
+    weights = _parse_mix(args.mix)
+
+    _configure(args)
+    import run as backend
+    app = backend.create_app()
+
+    random.seed(args.seed)
+    load_test = LoadTest(app, uuid.uuid4().hex[:8])
+    load_test.seed(args.users, args.credentials, args.anchor_timeout)
+    if not load_test.credential_hashes and ({'verify', 'proof'} & set(weights)):
+        raise SystemExit("No seeded credentials to verify; check the create route")
+
+    latencies, statuses, duration = run(load_test, weights, args.requests, args.concurrency)
+    results = summarize(latencies, statuses, duration)
+    results['config'] = {
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'mix': weights,
+        'users': args.users,
+        'credentials_per_user': args.credentials,
+        'mongo': args.mongo,
+        'chain': args.chain,
+        'bcrypt_rounds': backend.Config.BCRYPT_ROUNDS,
+        'python': platform.python_version(),
+        'machine': platform.machine()
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+    _print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    backend.anchor_worker.stop()
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""Microbenchmarks of the crypto and hashing primitives on the write and auth paths
+
+Covers HashUtil.hash_credential (canonical and legacy) and
+EncryptionUtil/envelope encryption for 1 KB to 10 MB credentials,
+HashUtil.create_merkle_hash for 1 to 1M leaves, AuthUtil password hashing
+and JWT encode/decode. Each case is timed in --repeat runs of enough
+iterations to last --min-time seconds; the median is reported.
+
+Results can be written as JSON (--output) and compared with an earlier run,
+either while running (--baseline) or offline (--compare OLD NEW); the exit
+status is 1 when a case got slower by more than --tolerance.
+
+Usage: python -m benchmarks.microbench [--groups hash encrypt merkle password jwt]
+           [--quick] [--output results.json] [--baseline baseline.json]
+       python -m benchmarks.microbench --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from app.config import Config
+from app.utils import auth
+from app.utils.auth import AuthUtil
+from app.utils.canonical import canonicalize, LEGACY_HASH_SCHEME
+from app.utils.encryption import EncryptionUtil, HashUtil
+from app.utils.envelope import EnvelopeEncryption
+
+GROUPS = ('hash', 'encrypt', 'merkle', 'password', 'jwt')
+PAYLOAD_SIZES = [1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024]
+LEAF_COUNTS = [1, 10, 100, 1_000, 10_000, 100_000, 1_000_000]
+QUICK_PAYLOAD_SIZES = PAYLOAD_SIZES[:4]
+QUICK_LEAF_COUNTS = LEAF_COUNTS[:6]
+
+
+def _size_label(size):
+    return f"{size // (1024 * 1024)}MB" if size >= 1024 * 1024 else f"{size // 1024}KB"
+
+
+def _credential(size):
+    """Build a credential whose canonical JSON is about `size` bytes"""
+    attribute = {'key': 'attribute_000000', 'value': 'v' * 48, 'weight': 0.5, 'verified': True}
+    count = max(1, (size - 120) // len(canonicalize(attribute)))
+    return {
+        'holder': {'name': 'Zoë Müller', 'date_of_birth': '1990-01-01', 'nationality': 'DE'},
+        'attributes': [
+            dict(attribute, key=f'attribute_{i:06d}', weight=i / 7, verified=i % 2 == 0)
+            for i in range(count)
+        ]
+    }
+
+
+def _bench_envelope():
+    """Envelope encryption with its data key already unwrapped, as for a returning user"""
+    envelope = EnvelopeEncryption(master_keys={'bench': os.urandom(32)}, active_master_key_id='bench')
+    key_id = 'bench-key'
+    envelope._user_keys.set('bench-user', key_id)
+    envelope._ciphers.set(key_id, envelope._master_ciphers['bench'])
+    return envelope
+
+
+def cases(groups, quick):
+    """Yield (name, bytes processed per call, setup) for the selected groups
+
+    setup() builds the inputs and returns the function to time.
+    """
+    payload_sizes = QUICK_PAYLOAD_SIZES if quick else PAYLOAD_SIZES
+    leaf_counts = QUICK_LEAF_COUNTS if quick else LEAF_COUNTS
+
+    if 'hash' in groups:
+        for size in payload_sizes:
+            def canonical(size=size):
+                credential_data = _credential(size)
+                return lambda: HashUtil.hash_credential(credential_data)
+
+            def legacy(size=size):
+                credential_data = _credential(size)
+                return lambda: HashUtil.hash_credential(credential_data, LEGACY_HASH_SCHEME)
+            yield f"hash_credential/{_size_label(size)}", size, canonical
+            yield f"hash_credential_legacy/{_size_label(size)}", size, legacy
+
+    if 'encrypt' in groups:
+        for size in payload_sizes:
+            def fernet_encrypt(size=size):
+                data, key = canonicalize(_credential(size)), EncryptionUtil.generate_encryption_key()
+                return lambda: EncryptionUtil.encrypt_data(data, key)
+
+            def fernet_decrypt(size=size):
+                key = EncryptionUtil.generate_encryption_key()
+                encrypted = EncryptionUtil.encrypt_data(canonicalize(_credential(size)), key)
+                return lambda: EncryptionUtil.decrypt_data(encrypted, key)
+
+            def envelope_encrypt(size=size):
+                data, envelope = canonicalize(_credential(size)), _bench_envelope()
+                return lambda: envelope.encrypt('bench-user', data)
+
+            def envelope_decrypt(size=size):
+                envelope = _bench_envelope()
+                encrypted = envelope.encrypt('bench-user', canonicalize(_credential(size)))
+                return lambda: envelope.decrypt('bench-user', encrypted)
+            yield f"encrypt_data/{_size_label(size)}", size, fernet_encrypt
+            yield f"decrypt_data/{_size_label(size)}", size, fernet_decrypt
+            yield f"envelope_encrypt/{_size_label(size)}", size, envelope_encrypt
+            yield f"envelope_decrypt/{_size_label(size)}", size, envelope_decrypt
+
+    if 'merkle' in groups:
+        for count in leaf_counts:
+            def merkle(count=count):
+                hashes = [os.urandom(32).hex() for _ in range(count)]
+                return lambda: HashUtil.create_merkle_hash(hashes)
+            yield f"create_merkle_hash/{count}", None, merkle
+
+    if 'password' in groups:
+        def hash_password():
+            return lambda: AuthUtil.hash_password('correct horse battery staple')
+
+        def verify_password():
+            password_hash = AuthUtil.hash_password('correct horse battery staple')
+            return lambda: AuthUtil.verify_password('correct horse battery staple', password_hash)
+        yield f"hash_password/rounds={Config.BCRYPT_ROUNDS}", None, hash_password
+        yield f"verify_password/rounds={Config.BCRYPT_ROUNDS}", None, verify_password
+
+    if 'jwt' in groups:
+        def encode():
+            return lambda: AuthUtil.generate_jwt_token('0' * 24, 'user@example.com', '0x' + '0' * 40)
+
+        def decode():
+            token = AuthUtil.generate_jwt_token('0' * 24, 'user@example.com', '0x' + '0' * 40)
+            return lambda: AuthUtil.verify_jwt_token(token)
+
+        def decode_cached():
+            token = AuthUtil.generate_jwt_token('0' * 24, 'user@example.com', '0x' + '0' * 40)
+            auth._token_cache.clear()
+            return lambda: AuthUtil.verify_jwt_token_cached(token)
+        yield "generate_jwt_token", None, encode
+        yield "verify_jwt_token", None, decode
+        yield "verify_jwt_token_cached", None, decode_cached
+
+
+def _run(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return time.perf_counter() - start
+
+
+def measure(function, min_time, repeat):
+    """Time a function; returns (median seconds per call, fastest, iterations per run)"""
+    # Double the iterations until a run is long enough to extrapolate from
+    iterations, elapsed = 1, _run(function, 1)
+    while elapsed < min_time / 10:
+        iterations *= 2
+        elapsed = _run(function, iterations)
+    iterations = max(1, round(iterations * min_time / elapsed))
+    samples = [_run(function, iterations) / iterations for _ in range(repeat)]
+    return statistics.median(samples), min(samples), iterations
+
+
+def compare(results, baseline, tolerance):
+    """List the cases whose median time per call grew by more than tolerance"""
+    regressions = []
+    for name, current in results['results'].items():
+        previous = baseline['results'].get(name)
+        if previous and current['median_us'] > previous['median_us'] * (1 + tolerance):
+            regressions.append(f"{name}: {previous['median_us']:.2f} -> {current['median_us']:.2f} us "
+                               f"({(current['median_us'] / previous['median_us'] - 1) * 100:+.1f}%)")
+    return regressions
+
+
+def _print_comparison(results, baseline):
+    print(f"{'case':<36}{'baseline us':>14}{'current us':>14}{'change':>10}")
+    for name, current in results['results'].items():
+        previous = baseline['results'].get(name)
+        if previous:
+            print(f"{name:<36}{previous['median_us']:>14.2f}{current['median_us']:>14.2f}"
+                  f"{(current['median_us'] / previous['median_us'] - 1) * 100:>+9.1f}%")
+
+
+def _load(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _report(regressions):
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--groups', nargs='+', choices=GROUPS, default=list(GROUPS))
+    parser.add_argument('--quick', action='store_true', help='stop at 1 MB payloads and 100k leaves')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per timed run')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per case')
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='only compare two result files')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed relative slowdown per case')
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, results = _load(args.compare[0]), _load(args.compare[1])
+        _print_comparison(results, baseline)
+        _report(compare(results, baseline, args.tolerance))
+        return
+
+    results = {
+        'config': {
+            'groups': args.groups,
+            'min_time': args.min_time,
+            'repeat': args.repeat,
+            'bcrypt_rounds': Config.BCRYPT_ROUNDS,
+            'python': platform.python_version(),
+            'machine': platform.machine()
+        },
+        'results': {}
+    }
+    print(f"{'case':<36}{'median us':>14}{'min us':>14}{'ops/s':>12}{'MB/s':>10}")
+    for name, size, setup in cases(args.groups, args.quick):
+        median, fastest, iterations = measure(setup(), args.min_time, args.repeat)
+        result = {
+            'median_us': round(median * 1e6, 3),
+            'min_us': round(fastest * 1e6, 3),
+            'iterations': iterations,
+            'ops_per_s': round(1 / median, 1)
+        }
+        if size:
+            result['bytes'] = size
+            result['mb_per_s'] = round(size / median / 2 ** 20, 1)
+        results['results'][name] = result
+        print(f"{name:<36}{result['median_us']:>14.2f}{result['min_us']:>14.2f}"
+              f"{result['ops_per_s']:>12,.0f}{result.get('mb_per_s', ''):>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        baseline = _load(args.baseline)
+        _print_comparison(results, baseline)
+        _report(compare(results, baseline, args.tolerance))
+
+
+if __name__ == '__main__':
+    main()
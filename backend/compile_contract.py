@@ -0,0 +1,60 @@
+"""Contract compiler
+
+Compiles smart-contracts/IdentityVerification.sol with py-solc-x and writes
+the deployment bytecode next to it (IdentityVerification.bin), which the
+in-process chain (WEB3_PROVIDER_URI=inproc://) deploys on startup. With
+--abi it also refreshes IdentityVerification.abi.json. --check only
+compares the committed bytecode with a fresh build.
+
+The source is compiled by its path relative to the repository root, since
+the path ends up in the metadata hash at the end of the bytecode; the same
+compiler release and settings then give the same bytes on every checkout.
+
+Usage: python compile_contract.py [--solc-version 0.8.19] [--evm-version paris] [--install] [--abi] [--check]
+"""
+import argparse
+import json
+import os
+import solcx
+from app.config import Config
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+CONTRACTS_DIR = os.path.join(REPO_DIR, 'smart-contracts')
+SOURCE_PATH = 'smart-contracts/IdentityVerification.sol'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--solc-version', default=Config.SOLC_VERSION)
+    parser.add_argument('--evm-version', default='paris', help='oldest hard fork the bytecode must run on')
+    parser.add_argument('--install', action='store_true', help='download the solc version first')
+    parser.add_argument('--abi', action='store_true')
+    parser.add_argument('--check', action='store_true', help='exit 1 if IdentityVerification.bin differs from a fresh build')
+    args = parser.parse_args()
+
+    if args.install:
+        solcx.install_solc(args.solc_version)
+    os.chdir(REPO_DIR)
+    compiled = solcx.compile_files(
+        [SOURCE_PATH],
+        output_values=['abi', 'bin'],
+        solc_version=args.solc_version,
+        evm_version=args.evm_version
+    )
+    output = next(output for name, output in compiled.items() if name.endswith(':IdentityVerification'))
+    bin_path = os.path.join(CONTRACTS_DIR, 'IdentityVerification.bin')
+
+    if args.check:
+        with open(bin_path, 'r') as f:
+            committed = f.read().strip()
+        if committed != output['bin']:
+            raise SystemExit(f"IdentityVerification.bin does not match solc {args.solc_version}; run python compile_contract.py")
+        print(f"IdentityVerification.bin matches solc {args.solc_version}")
+    else:
+        with open(bin_path, 'w') as f:
+            f.write(output['bin'] + '\n')
+        print(f"Wrote {len(output['bin']) // 2} bytes of bytecode to IdentityVerification.bin")
+    if args.abi and not args.check:
+        with open(os.path.join(CONTRACTS_DIR, 'IdentityVerification.abi.json'), 'w') as f:
+            json.dump(output['abi'], f, indent=2)
+        print("Wrote IdentityVerification.abi.json")
@@ -0,0 +1,30 @@
+"""Standalone contract event indexer
+
+Mirrors the CredentialStored, CredentialRevoked, CredentialVerified and
+MerkleRootAnchored events of the contract into MongoDB. With
+VERIFY_FROM_INDEX=true the verification endpoints answer from this index
+instead of calling the node.
+"""
+from app.models.database import create_indexes
+from app.utils import blockchain, contract_indexer
+import os
+import json
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+if __name__ == '__main__':
+    create_indexes()
+    abi_path = os.path.join(os.path.dirname(__file__), '..', 'smart-contracts', 'IdentityVerification.abi.json')
+    with open(abi_path, 'r') as f:
+        abi = json.load(f)
+    blockchain.initialize_contract(abi)
+    print(f"Indexing events of contract at {blockchain.contract_address}")
+    
+    contract_indexer.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        contract_indexer.stop()
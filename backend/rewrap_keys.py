@@ -0,0 +1,40 @@
+"""Master key rotation tool
+
+Re-wraps every data key under MASTER_KEY_ID. Rotate by adding the new key
+to MASTER_KEYS, pointing MASTER_KEY_ID at it, running this script, and
+then removing the old key. With --migrate-legacy it also moves credentials
+that still store their own Fernet key to envelope encryption.
+
+Usage: python rewrap_keys.py [--batch-size 1000] [--migrate-legacy]
+"""
+import argparse
+from app.models import Credential
+from app.utils import envelope
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def migrate_legacy(batch_size):
+    """Re-encrypt credentials that carry their own key under their owner's data key"""
+    total = 0
+    while True:
+        credentials = Credential.get_credentials_with_embedded_keys(batch_size)
+        if not credentials:
+            return total
+        Credential.set_encrypted_data([
+            (credential['_id'], envelope.encrypt(credential['user_id'], envelope.decrypt(credential['user_id'], credential['data'])))
+            for credential in credentials
+        ])
+        total += len(credentials)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--migrate-legacy', action='store_true')
+    args = parser.parse_args()
+    
+    print(f"Re-wrapped {envelope.rewrap_keys(args.batch_size)} data keys under master key {envelope.active_master_key_id}")
+    if args.migrate_legacy:
+        print(f"Moved {migrate_legacy(args.batch_size)} credentials to envelope encryption")
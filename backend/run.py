@@ -1,14 +1,94 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request, g, Response
 from flask_cors import CORS
-from app.models.database import create_indexes
+from app.models.database import create_indexes, mongo
+from app.models.anchor import AnchorJob
 from app.routes import auth_bp, credential_bp, user_bp
-from app.utils import blockchain
+from app.utils import (
+    blockchain, async_blockchain, anchor_worker, verification_cache, audit_buffer, access_counter,
+    envelope, password_hasher, AuthUtil
+)
+from app.metrics import registry, http_request_duration, Gauge
+from app.config import Config
 import os
+import time
 from dotenv import load_dotenv
 import json
 
 load_dotenv()
 
+def _cache_stats():
+    return {
+        'verification': verification_cache.stats(),
+        'jwt': AuthUtil.token_cache_stats(),
+        'data_key': envelope.stats()
+    }
+
+def _mongo_servers():
+    return mongo.pool_listener.stats()
+
+def register_metrics(app):
+    """Time every request and serve /metrics
+    
+    Requests, model methods and RPC calls are recorded as they happen (a
+    clock read and a bucket increment each); queue depths, cache ratios and
+    pool usage are only read when /metrics is scraped. Metrics are per
+    process.
+    """
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+    
+    @app.after_request
+    def record_duration(response):
+        start = g.pop('request_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            http_request_duration.observe(time.perf_counter() - start, request.method, route, str(response.status_code))
+        return response
+    
+    for name, documentation, stat in (
+        ('cache_hits_total', 'Cache lookups that found a live entry', 'hits'),
+        ('cache_misses_total', 'Cache lookups that found nothing', 'misses'),
+    ):
+        registry.register(Gauge(name, documentation, lambda stat=stat: {
+            cache: stats[stat] for cache, stats in _cache_stats().items()
+        }, ('cache',), kind='counter'))
+    registry.register(Gauge('cache_hit_ratio', 'Hits per lookup since start', lambda: {
+        cache: stats['hit_ratio'] for cache, stats in _cache_stats().items()
+    }, ('cache',)))
+    registry.register(Gauge('cache_entries', 'Entries held', lambda: {
+        cache: stats['size'] for cache, stats in _cache_stats().items()
+    }, ('cache',)))
+    
+    registry.register(Gauge('mongo_pool_max_size', 'Connections allowed per server', lambda: Config.MONGO_MAX_POOL_SIZE))
+    registry.register(Gauge('mongo_pool_connections', 'Open and checked-out connections per server', lambda: {
+        (server, state): stats[state] for server, stats in _mongo_servers().items() for state in ('open', 'in_use')
+    }, ('server', 'state')))
+    registry.register(Gauge('mongo_pool_utilization', 'Checked-out connections per allowed connection', lambda: {
+        server: stats['in_use'] / Config.MONGO_MAX_POOL_SIZE for server, stats in _mongo_servers().items()
+    }, ('server',)))
+    registry.register(Gauge('mongo_pool_checkout_wait_seconds_total', 'Time spent waiting for a connection', lambda: {
+        server: stats['checkout_wait_total'] for server, stats in _mongo_servers().items()
+    }, ('server',), kind='counter'))
+    registry.register(Gauge('mongo_pool_checkout_timeouts_total', 'Waits for a connection that timed out', lambda: {
+        server: stats['checkout_timeouts'] for server, stats in _mongo_servers().items()
+    }, ('server',), kind='counter'))
+    
+    registry.register(Gauge('password_hash_slots_in_use', 'Password hashes running or waiting for a worker', lambda: password_hasher.stats()['in_use']))
+    registry.register(Gauge('password_hash_slots', 'Password hashes admitted at once', lambda: password_hasher.stats()['capacity']))
+    
+    registry.register(Gauge('audit_queue_depth', 'Access log entries waiting to be written', lambda: audit_buffer.stats()['queued']))
+    registry.register(Gauge('audit_logs_total', 'Access log entries by outcome', lambda: {
+        outcome: audit_buffer.stats()[outcome] for outcome in ('written', 'dropped', 'spilled', 'replayed')
+    }, ('outcome',), kind='counter'))
+    
+    registry.register(Gauge('anchor_pending_transactions', 'Broadcast anchoring transactions not yet mined', lambda: len(AnchorJob.get_submitted_transactions())))
+    registry.register(Gauge('anchor_jobs', 'Anchoring jobs by status', AnchorJob.count_by_status, ('status',)))
+    
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 def create_app():
     """Create and configure Flask application"""
     app = Flask(__name__)
@@ -33,6 +113,7 @@ def create_app():
         with open(abi_path, 'r') as f:
             abi = json.load(f)
         blockchain.initialize_contract(abi)
+        async_blockchain.initialize_contract(abi)
         if blockchain.contract:
             print(f"Smart contract initialized at {blockchain.contract_address}")
         else:
@@ -40,6 +121,22 @@ def create_app():
     except Exception as e:
         print(f"Warning: Could not initialize smart contract: {str(e)}")
     
+    # Start background anchoring of queued credential hashes
+    if Config.ANCHOR_WORKER_ENABLED:
+        anchor_worker.start()
+        print("Anchor worker started")
+    
+    # Batch access log writes and coalesce access counts in the background
+    if Config.AUDIT_ENABLED:
+        audit_buffer.start()
+    access_counter.start()
+    
+    # Evict cached verifications revoked by other processes or on-chain
+    verification_cache.start_watcher()
+    
+    if Config.METRICS_ENABLED:
+        register_metrics(app)
+    
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(credential_bp)
@@ -66,6 +163,13 @@ def create_app():
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/api/database/status', methods=['GET'])
+    def database_status():
+        try:
+            return jsonify(dict(mongo.pool_stats(), audit=audit_buffer.stats())), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
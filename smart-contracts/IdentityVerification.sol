@@ -27,8 +27,17 @@ contract IdentityVerification {
     mapping(address => UserCredentials) public users;
     mapping(bytes32 => address) public credentialToUser;
     
+    // Merkle roots of batch-anchored credential hashes
+    struct MerkleBatch {
+        uint256 leafCount;
+        uint256 timestamp;
+    }
+    
+    mapping(bytes32 => MerkleBatch) public merkleRoots;
+    
     address public owner;
     uint256 public totalCredentials;
+    uint256 public totalMerkleRoots;
     
     // Events
     event CredentialStored(
@@ -50,6 +59,12 @@ contract IdentityVerification {
         bool isValid
     );
     
+    event MerkleRootAnchored(
+        bytes32 indexed merkleRoot,
+        uint256 leafCount,
+        uint256 timestamp
+    );
+    
     // Modifiers
     modifier onlyOwner() {
         require(msg.sender == owner, "Only owner can call this function");
@@ -127,6 +142,32 @@ contract IdentityVerification {
         return isValid;
     }
     
+    /**
+     * @dev Verify many credentials in one call (read-only, emits no events)
+     * @param _userAddresses Address of the owner of each credential
+     * @param _credentialHashes Hash of each credential
+     * @return bool[] Validity of each credential, in input order
+     */
+    function verifyCredentials(address[] memory _userAddresses, bytes32[] memory _credentialHashes)
+        public
+        view
+        returns (bool[] memory)
+    {
+        require(_userAddresses.length == _credentialHashes.length, "Length mismatch");
+        
+        bool[] memory results = new bool[](_credentialHashes.length);
+        for (uint256 i = 0; i < _credentialHashes.length; i++) {
+            bytes32 credentialHash = _credentialHashes[i];
+            address userAddress = _userAddresses[i];
+            if (userAddress == address(0) || credentialToUser[credentialHash] != userAddress) {
+                continue;
+            }
+            Credential storage cred = users[userAddress].credentials[credentialHash];
+            results[i] = cred.isActive && cred.credentialHash == credentialHash;
+        }
+        return results;
+    }
+    
     /**
      * @dev Revoke a credential
      * @param _userAddress Address of the user
@@ -202,6 +243,90 @@ contract IdentityVerification {
         return credentialToUser[_credentialHash];
     }
     
+    /**
+     * @dev Anchor the Merkle root of a batch of credential hashes
+     * @param _merkleRoot Root of the Merkle tree built over the credential hashes
+     * @param _leafCount Number of credential hashes in the batch
+     */
+    function anchorMerkleRoot(bytes32 _merkleRoot, uint256 _leafCount) public onlyOwner {
+        require(_merkleRoot != bytes32(0), "Invalid merkle root");
+        require(_leafCount > 0, "Empty batch");
+        require(merkleRoots[_merkleRoot].timestamp == 0, "Merkle root already anchored");
+        
+        merkleRoots[_merkleRoot] = MerkleBatch({
+            leafCount: _leafCount,
+            timestamp: block.timestamp
+        });
+        totalMerkleRoots++;
+        
+        emit MerkleRootAnchored(_merkleRoot, _leafCount, block.timestamp);
+    }
+    
+    /**
+     * @dev Get an anchored Merkle root
+     * @param _merkleRoot Root of the batch
+     * @return Number of leaves and anchoring timestamp (0 if not anchored)
+     */
+    function getMerkleRoot(bytes32 _merkleRoot)
+        public
+        view
+        returns (uint256, uint256)
+    {
+        MerkleBatch storage batch = merkleRoots[_merkleRoot];
+        return (batch.leafCount, batch.timestamp);
+    }
+    
+    /**
+     * @dev Get many anchored Merkle roots in one call
+     * @param _merkleRoots Roots to look up
+     * @return Leaf counts and anchoring timestamps (0 if not anchored), in input order
+     */
+    function getMerkleRoots(bytes32[] memory _merkleRoots)
+        public
+        view
+        returns (uint256[] memory, uint256[] memory)
+    {
+        uint256[] memory leafCounts = new uint256[](_merkleRoots.length);
+        uint256[] memory timestamps = new uint256[](_merkleRoots.length);
+        for (uint256 i = 0; i < _merkleRoots.length; i++) {
+            MerkleBatch storage batch = merkleRoots[_merkleRoots[i]];
+            leafCounts[i] = batch.leafCount;
+            timestamps[i] = batch.timestamp;
+        }
+        return (leafCounts, timestamps);
+    }
+    
+    /**
+     * @dev Verify that a credential hash is included in an anchored batch
+     * @param _merkleRoot Root of the batch
+     * @param _leaf Credential hash
+     * @param _proof Sibling nodes from the leaf node up to the root
+     * @param _pathBits Bit i is set when _proof[i] is the left-hand sibling
+     * Nodes are hashed as in RFC 6962: sha256(0x00 || leaf) for the leaf and
+     * sha256(0x01 || left || right) for parents.
+     * @return bool True if the root is anchored and the proof leads to it
+     */
+    function verifyMerkleProof(
+        bytes32 _merkleRoot,
+        bytes32 _leaf,
+        bytes32[] memory _proof,
+        uint256 _pathBits
+    ) public view returns (bool) {
+        if (merkleRoots[_merkleRoot].timestamp == 0) {
+            return false;
+        }
+        
+        bytes32 node = sha256(abi.encodePacked(bytes1(0x00), _leaf));
+        for (uint256 i = 0; i < _proof.length; i++) {
+            if ((_pathBits >> i) & 1 == 1) {
+                node = sha256(abi.encodePacked(bytes1(0x01), _proof[i], node));
+            } else {
+                node = sha256(abi.encodePacked(bytes1(0x01), node, _proof[i]));
+            }
+        }
+        return node == _merkleRoot;
+    }
+    
     /**
      * @dev Get total credentials on blockchain
      * @return Total number of credentials